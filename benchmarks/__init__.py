@@ -0,0 +1,4 @@
+"""Benchmarks of the client against a local SOAP stand-in.
+
+Run with `python -m benchmarks`; see `python -m benchmarks --help`.
+"""
@@ -0,0 +1,156 @@
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .baseline import compare, flatten, load_baseline, save_baseline
+from .importtime import IMPORT_BUDGET_MS, check_import_budget, measure_import_time
+from .scenarios import MB, measure_latency, measure_memory, measure_startup, run_isolated
+from .standin import SoapStandIn
+
+WSDL_DIR = Path(__file__).resolve().parent.parent / "wsdl"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+SUITES = ("imports", "startup", "latency", "memory")
+MEMORY_OPERATIONS = ("create_message", "download_message")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the client against a local SOAP stand-in and "
+        "compare the results with a stored baseline.",
+    )
+    parser.add_argument(
+        "--suites", default=",".join(SUITES), help="Suites to run (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--concurrency", type=_int_list, default=[1, 4, 16],
+        help="Concurrency levels of the latency suite (default: 1,4,16)",
+    )
+    parser.add_argument(
+        "--calls", type=int, default=200,
+        help="Calls per operation and concurrency level (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--sizes", type=_int_list, default=[1, 10, 100],
+        help="Attachment sizes in MB of the memory suite (default: 1,10,100)",
+    )
+    parser.add_argument("--fast-codec", action="store_true", help="Use a FastCodec")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument(
+        "--baseline", type=Path, default=DEFAULT_BASELINE,
+        help="Baseline to compare with (default: benchmarks/baseline.json)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Store the results as the baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Allowed relative regression (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--import-budget", type=float, default=IMPORT_BUDGET_MS,
+        help="Allowed import time of isds_client in ms (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    args.suites = [suite for suite in args.suites.split(",") if suite]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+    return args
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the selected suites against a new stand-in."""
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fast_codec": args.fast_codec,
+        }
+    }
+    if "imports" in args.suites:
+        print("Measuring imports...", file=sys.stderr)
+        results["imports"] = measure_import_time()
+    with SoapStandIn(WSDL_DIR) as stand_in:
+        if "startup" in args.suites:
+            print("Measuring start-up...", file=sys.stderr)
+            results["startup"] = run_isolated(measure_startup, stand_in.url, args.fast_codec)
+        if "latency" in args.suites:
+            print("Measuring latency...", file=sys.stderr)
+            results["latency"] = measure_latency(
+                stand_in, args.concurrency, args.calls, args.fast_codec
+            )
+        if "memory" in args.suites:
+            results["memory"] = {}
+            for operation in MEMORY_OPERATIONS:
+                for size in args.sizes:
+                    print(f"Measuring memory of {operation} ({size} MB)...", file=sys.stderr)
+                    try:
+                        result = run_isolated(
+                            measure_memory, stand_in.url, operation, size * MB, args.fast_codec
+                        )
+                    except Exception as e:
+                        # Errors of the client may include the whole response
+                        message = str(e).splitlines()[0] if str(e) else type(e).__name__
+                        result = {"error": message[:200]}
+                    results["memory"][f"{operation}.{size}MB"] = result
+    return results
+
+
+def main(argv: List[str]) -> int:
+    args = _parse_args(argv)
+    results = run(args)
+
+    for metric, value in flatten(results).items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"{metric:<50} {value}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    # Failed measurements and the start-up budget fail the run regardless
+    # of the baseline
+    errors = [metric for metric, value in flatten(results).items() if metric.endswith(".error")]
+    failed = bool(errors)
+    if errors:
+        print(f"\n{len(errors)} measurements failed:")
+        for metric in errors:
+            print(f"  {metric.removesuffix('.error')}")
+    if "imports" in results:
+        problems = check_import_budget(results["imports"], budget_ms=args.import_budget)
+        if problems:
+            print("\nStart-up budget exceeded:")
+            for problem in problems:
+                print(f"  {problem}")
+            failed = True
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return int(failed)
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline to store one")
+        return int(failed)
+    regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return int(failed)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
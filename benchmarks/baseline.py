@@ -0,0 +1,111 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Metrics for which higher values are better; lower is better for the others
+HIGHER_IS_BETTER = ("throughput_per_s",)
+
+# Differences below these, by unit suffix of the metric, are treated as noise
+MIN_DIFFERENCES = {"_s": 0.005, "_ms": 1.0, "_mb": 2.0}
+
+
+@dataclass
+class Regression:
+    """A metric that got worse than its baseline.
+
+    Attributes:
+        metric: Name of the metric, e.g. "latency.check_data_box.c1.p50_ms"
+        baseline: Value in the baseline
+        current: Value measured now, or None if the measurement failed
+    """
+
+    metric: str
+    baseline: float
+    current: Optional[float]
+
+    def __str__(self) -> str:
+        if self.current is None:
+            return f"{self.metric}: failed (baseline {self.baseline:.3f})"
+        change = (self.current - self.baseline) / self.baseline * 100
+        return (
+            f"{self.metric}: {self.current:.3f} vs baseline {self.baseline:.3f} "
+            f"({change:+.0f}%)"
+        )
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested results into metrics named by their dotted path.
+
+    The "meta" section describing the run is left out.
+    """
+    metrics: Dict[str, Any] = {}
+    for name, value in results.items():
+        if not prefix and name == "meta":
+            continue
+        path = f"{prefix}{name}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{path}."))
+        else:
+            metrics[path] = value
+    return metrics
+
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    """Load stored benchmark results."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: Dict[str, Any]) -> None:
+    """Store benchmark results as the baseline."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25
+) -> List[Regression]:
+    """Find the metrics that got worse than the baseline.
+
+    Only metrics present in both results are compared, so a partial run can
+    be checked against a full baseline. A metric regresses if it is worse by
+    more than tolerance (relative) and by more than the noise threshold of
+    its unit. A measurement that failed regresses if it succeeded in the
+    baseline.
+
+    Args:
+        results: Results of the current run
+        baseline: Stored results
+        tolerance: Allowed relative change, e.g. 0.25 for 25%
+
+    Returns:
+        The regressed metrics
+    """
+    current = flatten(results)
+    regressions: List[Regression] = []
+    failed = set()
+    for metric, expected in flatten(baseline).items():
+        if not isinstance(expected, (int, float)):
+            continue
+        case = metric.rpartition(".")[0]
+        if f"{case}.error" in current:
+            if case not in failed:
+                failed.add(case)
+                regressions.append(Regression(metric, expected, None))
+            continue
+        value = current.get(metric)
+        if not isinstance(value, (int, float)):
+            continue
+        if metric.endswith(HIGHER_IS_BETTER):
+            worse = expected - value
+        else:
+            worse = value - expected
+        floor = next(
+            (m for suffix, m in MIN_DIFFERENCES.items() if metric.endswith(suffix)), 0.0
+        )
+        if worse > abs(expected) * tolerance and worse > floor:
+            regressions.append(Regression(metric, expected, value))
+    return regressions
@@ -0,0 +1,83 @@
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+# Dependencies that importing the client must not load; they are imported
+# when a service is first used
+HEAVY_MODULES = ("zeep", "lxml", "requests", "httpx", "pydantic")
+
+# Import time of the client allowed by the start-up budget
+IMPORT_BUDGET_MS = 50.0
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_IMPORT_TIME = re.compile(r"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)\s*$")
+
+
+def measure_import_time(module: str = "isds_client", runs: int = 5) -> Dict[str, Any]:
+    """Measure importing a module with `python -X importtime`.
+
+    Each run imports the module in a new interpreter started in the root of
+    the repository.
+
+    Args:
+        module: Name of the imported module
+        runs: Number of runs; the median time is reported
+
+    Returns:
+        Median cumulative import time of the module in milliseconds, and the
+        heavy dependencies it imported
+    """
+    times: List[float] = []
+    imported: Set[str] = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = parse_import_time(result.stderr)
+        times.append(modules[module] / 1000)
+        imported.update(name.split(".")[0] for name in modules)
+    return {
+        f"{module}_ms": statistics.median(times),
+        "heavy_modules": sorted(imported & set(HEAVY_MODULES)),
+    }
+
+
+def parse_import_time(output: str) -> Dict[str, int]:
+    """Parse the output of `python -X importtime`.
+
+    Returns:
+        Cumulative import time in microseconds, keyed by module name
+    """
+    modules: Dict[str, int] = {}
+    for line in output.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match:
+            modules[match.group(2)] = int(match.group(1))
+    return modules
+
+
+def check_import_budget(
+    result: Dict[str, Any], module: str = "isds_client", budget_ms: float = IMPORT_BUDGET_MS
+) -> List[str]:
+    """Check a measurement of measure_import_time against the start-up budget.
+
+    Returns:
+        Descriptions of the exceeded limits
+    """
+    problems = []
+    elapsed = result[f"{module}_ms"]
+    if elapsed > budget_ms:
+        problems.append(
+            f"importing {module} took {elapsed:.1f} ms, over the budget of {budget_ms:.1f} ms"
+        )
+    if result["heavy_modules"]:
+        problems.append(f"importing {module} loads {', '.join(result['heavy_modules'])}")
+    return problems
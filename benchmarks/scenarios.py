@@ -0,0 +1,273 @@
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence
+
+# The stand-in imports zeep, so it is not imported by the measuring processes
+# before the client
+if TYPE_CHECKING:
+    from .standin import SoapStandIn
+
+MB = 1024 * 1024
+
+# Operations measured for latency and throughput: the call and the size of
+# the stand-in's responses
+OPERATIONS: Dict[str, Dict[str, Any]] = {
+    "check_data_box": {
+        "call": lambda client: client.check_data_box("abc1234"),
+    },
+    "get_received_messages": {
+        "call": lambda client: client.get_received_messages(),
+        "records": 100,
+    },
+    "get_message_envelope": {
+        "call": lambda client: client.get_message_envelope("123456789"),
+    },
+    "mark_message_as_downloaded": {
+        "call": lambda client: client.mark_message_as_downloaded("123456789"),
+    },
+    "download_message": {
+        "call": lambda client: client.download_message("123456789"),
+        "attachment_size": 100 * 1024,
+    },
+}
+
+
+def create_client(url: str, fast_codec: bool = False) -> Any:
+    """Create a client of the stand-in.
+
+    The client is imported here, so measuring the start-up of a fresh
+    process includes importing it.
+    """
+    from isds_client import ISDSClient
+    from services import FastCodec
+
+    return ISDSClient(
+        "benchmark",
+        "benchmark",
+        base_url=url,
+        fast_codec=FastCodec() if fast_codec else None,
+    )
+
+
+def run_isolated(func: Callable[..., Dict[str, float]], *args: Any) -> Dict[str, float]:
+    """Run a measurement in a new process, so nothing is imported or cached yet."""
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
+
+
+def measure_startup(url: str, fast_codec: bool = False) -> Dict[str, float]:
+    """Measure importing the client, constructing it and the first calls.
+
+    Meant to be run in a new process (see run_isolated).
+
+    Returns:
+        Times in seconds, including the total time of a job making a single
+        call
+    """
+    started = time.perf_counter()
+    import isds_client  # noqa: F401
+
+    imported = time.perf_counter()
+    client = create_client(url, fast_codec)
+    constructed = time.perf_counter()
+    client.check_data_box("abc1234")
+    first_call = time.perf_counter()
+    client.check_data_box("abc1234")
+    second_call = time.perf_counter()
+    client.close()
+    return {
+        "import_s": imported - started,
+        "construct_s": constructed - imported,
+        "first_call_s": first_call - constructed,
+        "second_call_s": second_call - first_call,
+        "total_s": first_call - started,
+    }
+
+
+def measure_latency(
+    stand_in: "SoapStandIn",
+    concurrency: Sequence[int] = (1, 4, 16),
+    calls: int = 200,
+    fast_codec: bool = False,
+    operations: Sequence[str] = tuple(OPERATIONS),
+) -> Dict[str, Dict[str, float]]:
+    """Measure the latency and throughput of operations.
+
+    Each operation is called `calls` times (at least once per worker) at
+    each concurrency level, from that many threads sharing one client.
+
+    Returns:
+        Median and 95th percentile latency in milliseconds and calls per
+        second, keyed by "<operation>.c<concurrency>"
+    """
+    client = create_client(stand_in.url, fast_codec)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        for name in operations:
+            operation = OPERATIONS[name]
+            stand_in.configure(
+                records=operation.get("records", 100),
+                attachment_size=operation.get("attachment_size", 0),
+            )
+            call = operation["call"]
+            for _ in range(5):
+                call(client)
+            for workers in concurrency:
+                results[f"{name}.c{workers}"] = _measure_calls(
+                    client, call, workers, max(calls, workers)
+                )
+    finally:
+        client.close()
+    return results
+
+
+def _measure_calls(
+    client: Any, call: Callable[[Any], Any], workers: int, calls: int
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+    remaining = [calls]
+
+    def worker() -> None:
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            call(client)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        for future in [executor.submit(worker) for _ in range(workers)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "throughput_per_s": len(latencies) / elapsed,
+    }
+
+
+def measure_memory(url: str, operation: str, size: int, fast_codec: bool = False) -> Dict[str, float]:
+    """Measure the peak memory of sending or downloading a message.
+
+    Meant to be run in a new process (see run_isolated). The stand-in is
+    configured for the attachment size after a first call with a small
+    attachment set up the client, so only the message itself is measured.
+
+    Args:
+        url: Base URL of the stand-in
+        operation: "create_message" or "download_message"
+        size: Size of the attachment in bytes
+        fast_codec: If True, use a FastCodec
+
+    Returns:
+        Growth of the peak resident set size and peak of memory allocated by
+        Python during the call in MB, and the duration of the call in
+        seconds
+    """
+    from schemas import DmFile
+
+    from .standin import configure
+
+    client = create_client(url, fast_codec)
+    with tempfile.TemporaryDirectory() as directory:
+        if operation == "create_message":
+            small = _write_file(Path(directory) / "small.bin", 1)
+            large = _write_file(Path(directory) / "attachment.bin", size)
+            warm_up = [DmFile(file_path=str(small))]
+            files = [DmFile(file_path=str(large))]
+
+            def call(files: List[Any]) -> Any:
+                return client.create_message("xyz9876", "Benchmark", files)
+
+        elif operation == "download_message":
+            warm_up = files = []
+
+            def call(files: List[Any]) -> Any:
+                return client.download_message("123456789")
+
+        else:
+            raise ValueError(f"Unknown operation {operation}")
+
+        # Set up the client with a small message first
+        configure(url, attachment_size=1)
+        call(warm_up)
+        configure(url, attachment_size=size)
+
+        gc.collect()
+        rss_before = _current_rss()
+        _reset_peak_rss()
+        tracemalloc.start()
+        started = time.perf_counter()
+        call(files)
+        duration = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rss_peak = _peak_rss()
+    client.close()
+    return {
+        "peak_rss_mb": max(0, rss_peak - rss_before) / MB,
+        "python_peak_mb": traced_peak / MB,
+        "duration_s": duration,
+    }
+
+
+def _write_file(path: Path, size: int) -> Path:
+    with open(path, "wb") as f:
+        for offset in range(0, size, MB):
+            f.write(os.urandom(min(MB, size - offset)))
+    return path
+
+
+def _current_rss() -> int:
+    """Resident set size of the process in bytes."""
+    return _proc_status("VmRSS") or _peak_rss()
+
+
+def _reset_peak_rss() -> None:
+    """Reset the peak resident set size of the process, where supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        # The peak since the start of the process is measured instead
+        pass
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of the process in bytes."""
+    peak = _proc_status("VmHWM")
+    if peak:
+        return peak
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes, except on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _proc_status(field: str) -> int:
+    """Read a memory size in bytes from /proc/self/status (Linux only)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
@@ -0,0 +1,358 @@
+import base64
+import json
+import os
+import re
+import threading
+import urllib.request
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import zeep
+from zeep.wsdl.utils import etree_to_string
+from zeep.xsd import AnySimpleType
+from zeep.xsd.elements import All, Any as AnyElement, Choice, Element, Group, Sequence
+from zeep.xsd.types import builtins
+
+# Written in place of the encoded attachment content of canned responses
+CONTENT_MARKER = "isds-benchmark-content"
+
+# Attachment contents are sent as repeated blocks of this many random bytes,
+# a multiple of 3 so the encoded blocks can be concatenated
+CONTENT_BLOCK_SIZE = 3 * 256 * 1024
+
+# Values of elements that the client inspects, by element name
+SAMPLE_VALUES: Dict[str, Any] = {
+    "dmStatusCode": "0000",
+    "dmStatusMessage": "Provedeno úspěšně.",
+    "dbStatusCode": "0000",
+    "dbStatusMessage": "Provedeno úspěšně.",
+    "dmID": "123456789",
+    "dbID": "abc1234",
+    "dbIDSender": "abc1234",
+    "dbIDRecipient": "xyz9876",
+    "dmSender": "Odesílatel s.r.o.",
+    "dmRecipient": "Příjemce a.s.",
+    "dmAnnotation": "Benchmark message",
+    "dmMimeType": "application/pdf",
+    "dmFileMetaType": "main",
+    "dmFileDescr": "document.pdf",
+    "dmType": "V",
+    # Left empty, as the DmEnvelope model expects strings where the schema
+    # has a boolean and integers
+    "dmAmbiguousRecipient": None,
+    "dmSenderOrgUnitNum": None,
+    "dmRecipientOrgUnitNum": None,
+}
+
+_OPERATION = re.compile(rb"<(?:[\w.-]+:)?Body[^>]*>\s*<(?:[\w.-]+:)?([\w.-]+)")
+_READ_CHUNK_SIZE = 256 * 1024
+
+
+class ResponseFactory:
+    """Canned responses of the operations of the bundled WSDL files.
+
+    Responses are generated from the output message of each operation, with
+    every element filled in with a sample value, so they parse like real
+    responses. Message lists contain `records` records and downloaded files
+    an attachment of `attachment_size` random bytes.
+    """
+
+    def __init__(self, wsdl_dir: Path, records: int = 100, attachment_size: int = 0):
+        """Load the WSDL files.
+
+        Args:
+            wsdl_dir: Directory containing the WSDL files
+            records: Number of records of message lists
+            attachment_size: Size in bytes of the attachment of downloaded
+                messages
+        """
+        self._operations: Dict[str, Tuple[Any, Any]] = {}
+        for path in sorted(Path(wsdl_dir).glob("*.wsdl")):
+            client = zeep.Client(str(path))
+            for service in client.wsdl.services.values():
+                for port in service.ports.values():
+                    for operation in port.binding._operations.values():
+                        name = operation.input.body.qname.localname
+                        self._operations.setdefault(name, (port.binding, operation))
+        self._rendered: Dict[str, Tuple[bytes, bytes]] = {}
+        self._lock = threading.Lock()
+        self.configure(records=records, attachment_size=attachment_size)
+
+    def configure(self, records: Optional[int] = None, attachment_size: Optional[int] = None) -> None:
+        """Change the size of the responses."""
+        with self._lock:
+            if records is not None:
+                self.records = records
+            if attachment_size is not None:
+                self.attachment_size = attachment_size
+                self._block = base64.b64encode(
+                    os.urandom(CONTENT_BLOCK_SIZE)
+                    if attachment_size >= CONTENT_BLOCK_SIZE
+                    else b""
+                )
+                self._tail = base64.b64encode(
+                    os.urandom(attachment_size % CONTENT_BLOCK_SIZE)
+                )
+            self._rendered.clear()
+
+    def render(self, request_name: str) -> Optional[Tuple[bytes, bytes]]:
+        """Render the response to a request.
+
+        Args:
+            request_name: Local name of the request's body element
+
+        Returns:
+            The envelope before and after the attachment content, or None if
+            the operation is unknown
+        """
+        with self._lock:
+            rendered = self._rendered.get(request_name)
+            if rendered is None:
+                if request_name not in self._operations:
+                    return None
+                binding, operation = self._operations[request_name]
+                body = operation.output.body
+                envelope = operation.output.serialize(
+                    **self._sample(body.type, 0)
+                ).content
+                head, _, tail = etree_to_string(envelope).partition(
+                    CONTENT_MARKER.encode()
+                )
+                rendered = self._rendered[request_name] = (head, tail)
+            return rendered
+
+    def content_length(self, rendered: Tuple[bytes, bytes]) -> int:
+        """Length of the encoded attachment content of a rendered response."""
+        if not rendered[1]:
+            return 0
+        return 4 * ((self.attachment_size + 2) // 3)
+
+    def iter_content(self):
+        """Iterate over the encoded attachment content in blocks."""
+        for _ in range(self.attachment_size // CONTENT_BLOCK_SIZE):
+            yield self._block
+        if self._tail:
+            yield self._tail
+
+    def _sample(self, xsd_type: Any, depth: int) -> Any:
+        if isinstance(xsd_type, AnySimpleType):
+            return _simple_sample(xsd_type)
+        values: Dict[str, Any] = {}
+        for name, attribute in xsd_type.attributes:
+            if getattr(attribute, "name", None) and isinstance(attribute.type, AnySimpleType):
+                values[name] = SAMPLE_VALUES.get(name, _simple_sample(attribute.type))
+        for name, particle in xsd_type.elements_nested:
+            self._sample_particle(name, particle, values, depth)
+        return values
+
+    def _sample_particle(self, name: str, particle: Any, values: Dict[str, Any], depth: int) -> None:
+        if isinstance(particle, Element):
+            if name == "dmEncodedContent":
+                value = CONTENT_MARKER
+            elif name in SAMPLE_VALUES:
+                value = SAMPLE_VALUES[name]
+            elif depth > 16:
+                # Recursive types end with an empty element
+                value = None
+            else:
+                value = self._sample(particle.type, depth + 1)
+            if particle.accepts_multiple:
+                value = [value] * self._repeat(name)
+            values[name] = value
+        elif isinstance(particle, Choice):
+            option_name, option = particle.elements_nested[0]
+            self._sample_particle(option_name, option, values, depth)
+        elif isinstance(particle, (Sequence, All)):
+            if particle.accepts_multiple:
+                item: Dict[str, Any] = {}
+                for child_name, child in particle.elements_nested:
+                    self._sample_particle(child_name, child, item, depth)
+                values[name] = [item] * max(map(self._repeat, item), default=1)
+            else:
+                for child_name, child in particle.elements_nested:
+                    self._sample_particle(child_name, child, values, depth)
+        elif isinstance(particle, Group):
+            self._sample_particle(name, particle.child, values, depth)
+        elif not isinstance(particle, AnyElement):
+            raise TypeError(f"Unsupported particle {particle!r}")
+
+    def _repeat(self, name: str) -> int:
+        return self.records if name == "dmRecord" else 1
+
+
+def _simple_sample(xsd_type: AnySimpleType) -> Any:
+    if isinstance(xsd_type, builtins.Boolean):
+        return False
+    if isinstance(xsd_type, (builtins.Integer, builtins.Decimal, builtins.Float, builtins.Double)):
+        return 1
+    if isinstance(xsd_type, builtins.DateTime):
+        return datetime(2025, 1, 2, 10, 0, tzinfo=timezone.utc)
+    if isinstance(xsd_type, builtins.Date):
+        return date(2025, 1, 2)
+    if isinstance(xsd_type, builtins.Base64Binary):
+        return b"sample"
+    return "sample"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and the parts of a response are written separately
+    disable_nagle_algorithm = True
+    factory: ResponseFactory
+
+    def do_POST(self) -> None:
+        if self.path.endswith("/_configure"):
+            settings = json.loads(b"".join(self._iter_body()))
+            self.factory.configure(**settings)
+            self._respond(200, [b"{}"], 2, "application/json")
+            return
+        match = None
+        head = b""
+        for chunk in self._iter_body():
+            # The operation is named by the first element of the body
+            if match is None and len(head) < _READ_CHUNK_SIZE:
+                head += chunk
+                match = _OPERATION.search(head)
+        rendered = self.factory.render(match.group(1).decode()) if match else None
+        if rendered is None:
+            fault = (
+                b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+                b"<soap:Body><soap:Fault><faultcode>soap:Client</faultcode>"
+                b"<faultstring>Unknown operation</faultstring></soap:Fault>"
+                b"</soap:Body></soap:Envelope>"
+            )
+            self._respond(500, [fault], len(fault))
+            return
+        prefix, suffix = rendered
+        content_length = self.factory.content_length(rendered)
+        parts = [prefix, *(self.factory.iter_content() if content_length else ()), suffix]
+        self._respond(200, parts, len(prefix) + content_length + len(suffix))
+
+    def _iter_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    # Trailer and the final empty line
+                    while self.rfile.readline().strip():
+                        pass
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, _READ_CHUNK_SIZE))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def _respond(self, status: int, parts, length: int, content_type: str = "text/xml; charset=utf-8") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+        for part in parts:
+            self.wfile.write(part)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(wsdl_dir: Path, host: str = "127.0.0.1", port: int = 0, ready=None) -> None:
+    """Serve canned responses until the process is stopped.
+
+    Args:
+        wsdl_dir: Directory containing the WSDL files
+        host: Address to listen on
+        port: Port to listen on; a free port is chosen if 0
+        ready: Queue the bound port is put into once serving
+    """
+    handler = type("Handler", (_Handler,), {"factory": ResponseFactory(wsdl_dir)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def configure(
+    url: str, records: Optional[int] = None, attachment_size: Optional[int] = None
+) -> None:
+    """Change the size of the responses of a running stand-in.
+
+    Args:
+        url: Base URL of the stand-in's services
+        records: Number of records of message lists
+        attachment_size: Size in bytes of the attachment of downloaded
+            messages
+    """
+    settings = {"records": records, "attachment_size": attachment_size}
+    request = urllib.request.Request(
+        f"{url}/_configure", data=json.dumps(settings).encode(), method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=60):
+        pass
+
+
+class SoapStandIn:
+    """Local stand-in of the ISDS SOAP services for benchmarks.
+
+    Serves canned responses of every operation of the bundled WSDL files on
+    all service paths from a separate process, so the stand-in does not
+    take CPU time or memory from the measured client.
+
+    Example:
+        with SoapStandIn(Path("wsdl")) as stand_in:
+            stand_in.configure(attachment_size=10 * 1024 * 1024)
+            client = ISDSClient("user", "pass", base_url=stand_in.url)
+    """
+
+    def __init__(self, wsdl_dir: Path, host: str = "127.0.0.1"):
+        """Initialize the stand-in.
+
+        Args:
+            wsdl_dir: Directory containing the WSDL files
+            host: Address to listen on
+        """
+        self.wsdl_dir = Path(wsdl_dir)
+        self.host = host
+        self.port: Optional[int] = None
+        self._process: Optional[BaseProcess] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the services, to be passed to the client."""
+        return f"http://{self.host}:{self.port}/DS"
+
+    def start(self) -> None:
+        """Start serving in a separate process."""
+        context = get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(
+            target=serve, args=(self.wsdl_dir, self.host, 0, ready), daemon=True
+        )
+        self._process.start()
+        self.port = ready.get(timeout=60)
+
+    def configure(self, records: Optional[int] = None, attachment_size: Optional[int] = None) -> None:
+        """Change the size of the responses (see configure)."""
+        configure(self.url, records, attachment_size)
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "SoapStandIn":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -1,15 +1,51 @@
+from __future__ import annotations
+
+import threading
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    List,
+    Optional,
+    Dict,
+    Any,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Type,
+    TypeVar,
+    Union,
+)
 from datetime import datetime
 
-from schemas.base import DmFile
-from schemas.responses import DownloadMessageResponse
-from services import (
-    MessageOperationsService,
-    MessageInfoService,
-    DataBoxSearchService,
-    DataBoxAccessService,
-)
+# The services and schemas packages load their modules on first use, so
+# importing the client does not import zeep, lxml, requests or pydantic
+import services
+
+if TYPE_CHECKING:
+    from schemas.base import DmFile
+    from schemas.responses import DownloadMessageResponse
+    from services import (
+        BaseService,
+        MessageOperationsService,
+        MessageInfoService,
+        DataBoxSearchService,
+        DataBoxAccessService,
+        DataBoxManipulationsService,
+        BigMessageService,
+        CaptureConfig,
+        EnvelopeStore,
+        FastCodec,
+        FlowControlConfig,
+        MessageTable,
+        ResponseCache,
+        TransportConfig,
+    )
+    from services.batch import BatchResult
+    from services.instrumentation import CallObserver
+
+S = TypeVar("S", bound="BaseService")
 
 
 class ISDSClient:
@@ -22,6 +58,16 @@ class ISDSClient:
         production: bool = False,
         wsdl_dir: Optional[Path] = None,
         debug: bool = False,
+        cache_dir: Optional[Path] = None,
+        transport_config: Optional[TransportConfig] = None,
+        response_cache: Optional[ResponseCache] = None,
+        flow_control: Optional[FlowControlConfig] = None,
+        observers: Optional[List[CallObserver]] = None,
+        capture: Optional[CaptureConfig] = None,
+        lazy_responses: bool = False,
+        fast_codec: Optional[FastCodec] = None,
+        base_url: Optional[str] = None,
+        big_message_base_url: Optional[str] = None,
     ):
         """Initialize ISDS client.
 
@@ -31,6 +77,32 @@ class ISDSClient:
             production: If True, use production environment, otherwise test
             wsdl_dir: Directory containing WSDL files (defaults to ./wsdl)
             debug: If True, enable debug logging
+            cache_dir: Directory for the parsed-WSDL cache shared by all
+                processes on the host (disabled if not set)
+            transport_config: Connection pool, keep-alive and timeout settings
+                of the HTTP transport shared by all services
+            response_cache: Cache of data box lookups (check_data_box,
+                find_data_box, ...); lookups are not cached if not set
+            flow_control: Per-endpoint rate limits, adaptive concurrency,
+                retries of read operations and circuit breaker settings;
+                calls are made directly, without limits or retries, if not
+                set
+            observers: Hooks receiving the metrics of each call, such as a
+                MetricsCollector or TracingObserver; calls are not measured
+                if not set
+            capture: Settings of the capture of SOAP requests and responses
+                in memory or a rotating file; nothing is captured if not set,
+                except that debug logs the messages
+            lazy_responses: If True, responses are returned as read-only
+                LazyResponse mappings converting only the accessed parts,
+                instead of dicts; to_dict converts a whole response
+            fast_codec: Precompiled encoding and decoding of the most
+                frequent operations (message downloads and lists, data box
+                checks), bypassing zeep; all calls go through zeep if not set
+            base_url: Base URL of the services, overriding the one of the
+                environment (e.g., to use a local stand-in)
+            big_message_base_url: Base URL of the high-volume message
+                service; defaults to base_url if that is set
         """
         self.username = username
         self.password = password
@@ -39,41 +111,113 @@ class ISDSClient:
         # Set base URLs based on environment
         if production:
             self.base_url = "https://ws1.mojedatovaschranka.cz/DS"
+            self.big_message_base_url = "https://ws2.mojedatovaschranka.cz/DS"
         else:
             self.base_url = "https://ws1.czebox.cz/DS"
+            self.big_message_base_url = "https://ws2.czebox.cz/DS"
+        if base_url is not None:
+            self.base_url = self.big_message_base_url = base_url
+        if big_message_base_url is not None:
+            self.big_message_base_url = big_message_base_url
 
         # Set WSDL directory
         self.wsdl_dir = wsdl_dir or Path(__file__).parent / "wsdl"
 
-        # Initialize services
-        self._message_operations = MessageOperationsService(
-            username=username,
-            password=password,
-            base_url=self.base_url,
-            wsdl_dir=self.wsdl_dir,
-            debug=debug,
-        )
-        self._message_info = MessageInfoService(
-            username=username,
-            password=password,
-            base_url=self.base_url,
-            wsdl_dir=self.wsdl_dir,
-            debug=debug,
-        )
-        self._data_box_search = DataBoxSearchService(
-            username=username,
-            password=password,
-            base_url=self.base_url,
-            wsdl_dir=self.wsdl_dir,
-            debug=debug,
-        )
-        self._data_box_access = DataBoxAccessService(
-            username=username,
-            password=password,
-            base_url=self.base_url,
-            wsdl_dir=self.wsdl_dir,
-            debug=debug,
+        # All services share one pooled HTTP session
+        self.transport_config = transport_config or services.TransportConfig()
+        self.session = self._create_session()
+        self.response_cache = response_cache
+        self.flow_control = (
+            services.FlowControl(flow_control) if flow_control is not None else None
         )
+        self.capture = services.Capture(capture) if capture is not None else None
+
+        # Services are created on first use
+        self._service_options: Dict[str, Any] = {
+            "username": username,
+            "password": password,
+            "base_url": self.base_url,
+            "wsdl_dir": self.wsdl_dir,
+            "debug": debug,
+            "cache_dir": cache_dir,
+            "session": self.session,
+            "transport_config": self.transport_config,
+            "response_cache": response_cache,
+            "flow_control": self.flow_control,
+            "instrumentation": (
+                services.Instrumentation(observers) if observers else None
+            ),
+            "capture": self.capture,
+            "lazy_responses": lazy_responses,
+            "fast_codec": fast_codec,
+        }
+        self._services: Dict[Type[BaseService], BaseService] = {}
+        self._services_lock = threading.Lock()
+
+    def _create_session(self) -> Any:
+        """Create the HTTP session shared by all services."""
+        from services.transport import create_session
+
+        return create_session(self.transport_config)
+
+    def close(self) -> None:
+        """Close the pooled connections and the capture file of the client."""
+        self.session.close()
+        if self.capture is not None:
+            self.capture.close()
+
+    def __enter__(self) -> "ISDSClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _get_service(self, service_class: Type[S], **options) -> S:
+        """Get the service instance, creating it on first use.
+
+        Args:
+            service_class: Class of the service
+            **options: Options overriding the client defaults for the service
+
+        Returns:
+            The shared service instance
+        """
+        service = self._services.get(service_class)
+        if service is None:
+            with self._services_lock:
+                service = self._services.get(service_class)
+                if service is None:
+                    service = service_class(**{**self._service_options, **options})
+                    self._services[service_class] = service
+        return service
+
+    @property
+    def _message_operations(self) -> MessageOperationsService:
+        return self._get_service(services.MessageOperationsService)
+
+    @property
+    def _message_info(self) -> MessageInfoService:
+        return self._get_service(services.MessageInfoService)
+
+    @property
+    def _data_box_search(self) -> DataBoxSearchService:
+        return self._get_service(services.DataBoxSearchService)
+
+    @property
+    def _data_box_access(self) -> DataBoxAccessService:
+        return self._get_service(services.DataBoxAccessService)
+
+    @property
+    def big_messages(self) -> BigMessageService:
+        """Service for high-volume messages (dm_VoDZ.wsdl)."""
+        return self._get_service(
+            services.BigMessageService, base_url=self.big_message_base_url
+        )
+
+    @property
+    def data_box_manipulations(self) -> DataBoxManipulationsService:
+        """Service for data box manipulations (db_manipulations.wsdl)."""
+        return self._get_service(services.DataBoxManipulationsService)
 
     # Message Operations methods
     def create_message(
@@ -84,10 +228,105 @@ class ISDSClient:
             recipient_id=recipient_id, subject=subject, files=files, **kwargs
         )
 
+    def send_mass_message(
+        self,
+        recipients: Iterable[Union[str, Dict[str, Any]]],
+        subject: str,
+        files: List[DmFile],
+        batch_size: Optional[int] = None,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> List[BatchResult[str, str]]:
+        """Send a message with shared attachments to many recipients.
+
+        Recipients are sent in concurrent CreateMultipleMessage batches; the
+        attachments are encoded once if DmFile.cache is set. Failures are
+        reported per recipient.
+
+        Args:
+            recipients: Recipient data box IDs, or recipient structures with
+                dbIDRecipient and optionally dmRecipientOrgUnit,
+                dmRecipientOrgUnitNum and dmToHands
+            subject: Subject of the message
+            files: Files to attach to each message
+            batch_size: Maximum number of recipients per request; the most
+                ISDS accepts in one request (50) if not set
+            max_workers: Maximum number of concurrent requests
+            **kwargs: Additional message parameters
+
+        Returns:
+            One result per recipient in input order, with the ID of the
+            created message
+        """
+        if batch_size is not None:
+            kwargs["batch_size"] = batch_size
+        return self._message_operations.send_mass_message(
+            recipients, subject, files, max_workers=max_workers, **kwargs
+        )
+
     def download_message(self, message_id: str) -> DownloadMessageResponse:
         """Download a message."""
         return self._message_operations.download_message(message_id)
 
+    def download_message_to(
+        self,
+        message_id: str,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> DownloadMessageResponse:
+        """Download a message, streaming its attachments to files."""
+        return self._message_operations.download_message_to(
+            message_id, target_dir=target_dir, open_sink=open_sink
+        )
+
+    def download_messages(
+        self,
+        message_ids: Iterable[str],
+        max_workers: int = 8,
+        ordered: bool = False,
+        on_result: Optional[Callable[[BatchResult], None]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[BatchResult[str, DownloadMessageResponse]]:
+        """Download many messages concurrently.
+
+        A failure of one message is recorded in its result and does not
+        abort the batch.
+
+        Args:
+            message_ids: IDs of the messages to download
+            max_workers: Maximum number of concurrent downloads
+            ordered: If True, deliver results in input order, otherwise as
+                they complete
+            on_result: Called with each result as it is delivered
+            on_progress: Called with the number of finished and total messages
+
+        Returns:
+            Results of all downloads in delivery order
+        """
+        from services.batch import run_batch
+
+        return run_batch(
+            self.download_message,
+            message_ids,
+            max_workers=max_workers,
+            ordered=ordered,
+            on_result=on_result,
+            on_progress=on_progress,
+        )
+
+    def iter_download_messages(
+        self, message_ids: Iterable[str], max_workers: int = 8, ordered: bool = False
+    ) -> Iterator[BatchResult[str, DownloadMessageResponse]]:
+        """Download many messages concurrently, yielding results as they finish.
+
+        Unlike download_messages, finished results are not kept in memory.
+        """
+        from services.batch import iter_batch
+
+        return iter_batch(
+            self.download_message, message_ids, max_workers=max_workers, ordered=ordered
+        )
+
     def download_signed_message(self, message_id: str) -> Dict[str, Any]:
         """Download a signed message."""
         return self._message_operations.download_signed_message(message_id)
@@ -133,6 +372,82 @@ class ISDSClient:
             **kwargs,
         )
 
+    def iter_sent_messages(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        prefetch: bool = False,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over sent messages, fetching the list page by page."""
+        return self._message_info.iter_sent_messages(
+            from_time=from_time,
+            to_time=to_time,
+            page_size=page_size,
+            prefetch=prefetch,
+            **kwargs,
+        )
+
+    def iter_received_messages(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        prefetch: bool = False,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over received messages, fetching the list page by page."""
+        return self._message_info.iter_received_messages(
+            from_time=from_time,
+            to_time=to_time,
+            page_size=page_size,
+            prefetch=prefetch,
+            **kwargs,
+        )
+
+    def get_sent_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of sent messages as a compact MessageTable."""
+        return self._message_info.get_sent_message_table(
+            from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+        )
+
+    def get_received_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of received messages as a compact MessageTable."""
+        return self._message_info.get_received_message_table(
+            from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+        )
+
+    def sync_envelopes(
+        self,
+        store: EnvelopeStore,
+        box_id: str,
+        initial_from: Optional[datetime] = None,
+    ) -> int:
+        """Synchronize the local envelope store of a data box with ISDS.
+
+        Args:
+            store: Local envelope store
+            box_id: ID of the data box the client is logged in to
+            initial_from: Start of the first synchronization
+
+        Returns:
+            Number of stored or updated envelopes
+        """
+        return store.sync(self._message_info, box_id, initial_from=initial_from)
+
     def mark_message_as_downloaded(self, message_id: str) -> Dict[str, Any]:
         """Mark a message as downloaded/read."""
         return self._message_info.mark_message_as_downloaded(message_id)
@@ -170,6 +485,67 @@ class ISDSClient:
         """Check if a data box exists and get its status."""
         return self._data_box_search.check_data_box(data_box_id)
 
+    def check_data_boxes(
+        self,
+        data_box_ids: Iterable[str],
+        max_workers: int = 16,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, BatchResult[str, Dict[str, Any]]]:
+        """Check many data boxes concurrently, e.g. before a mass send.
+
+        Duplicate IDs are checked once. A failure of one check is recorded in
+        its result and does not abort the batch.
+
+        Args:
+            data_box_ids: IDs of the data boxes to check
+            max_workers: Maximum number of concurrent checks
+            on_progress: Called with the number of finished and total checks
+
+        Returns:
+            Results keyed by data box ID, in input order
+        """
+        return self._lookup_data_boxes(
+            self.check_data_box, data_box_ids, max_workers, on_progress
+        )
+
+    def get_activity_status(self, data_box_id: str) -> Dict[str, Any]:
+        """Get activity status of a data box."""
+        return self._data_box_search.get_activity_status(data_box_id)
+
+    def get_activity_statuses(
+        self,
+        data_box_ids: Iterable[str],
+        max_workers: int = 16,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, BatchResult[str, Dict[str, Any]]]:
+        """Get the activity status of many data boxes concurrently.
+
+        Duplicate IDs are looked up once and failures are isolated per ID,
+        as in check_data_boxes.
+
+        Returns:
+            Results keyed by data box ID, in input order
+        """
+        return self._lookup_data_boxes(
+            self.get_activity_status, data_box_ids, max_workers, on_progress
+        )
+
+    def _lookup_data_boxes(
+        self,
+        lookup: Callable[[str], Dict[str, Any]],
+        data_box_ids: Iterable[str],
+        max_workers: int,
+        on_progress: Optional[Callable[[int, int], None]],
+    ) -> Dict[str, BatchResult[str, Dict[str, Any]]]:
+        from services.batch import run_batch
+
+        unique_ids = list(dict.fromkeys(data_box_ids))
+        results = run_batch(
+            lookup, unique_ids, max_workers=max_workers, on_progress=on_progress
+        )
+        by_id = {result.key: result for result in results}
+        return {data_box_id: by_id[data_box_id] for data_box_id in unique_ids}
+
     def data_box_fulltext_search(self, search_text: str, **kwargs) -> Dict[str, Any]:
         """Get a list of data boxes based on criteria."""
         return self._data_box_search.isds_search_3(search_text, **kwargs)
@@ -178,6 +554,10 @@ class ISDSClient:
         """Get credit information for a data box."""
         return self._data_box_search.get_credit_info(data_box_id)
 
+    def invalidate_data_box(self, data_box_id: str) -> None:
+        """Drop the cached status of a data box."""
+        self._data_box_search.invalidate_data_box(data_box_id)
+
     # Data Box Access methods
     def get_owner_info(self) -> Dict[str, Any]:
         """Get information about a data box owner."""
@@ -194,3 +574,146 @@ class ISDSClient:
     def get_password_info(self) -> Dict[str, Any]:
         """Get information about the current password."""
         return self._data_box_access.get_password_info()
+
+
+class AsyncISDSClient(ISDSClient):
+    """Asynchronous client for Czech Data Box Information System (ISDS).
+
+    Provides the same methods as ISDSClient, each returning an awaitable. All
+    services share one pooled httpx.AsyncClient, so a single event loop can
+    keep many SOAP calls in flight without a thread per call. Requires the
+    httpx package.
+    """
+
+    # Names of the asynchronous variants of the services
+    _async_services: Dict[str, str] = {
+        "MessageOperationsService": "AsyncMessageOperationsService",
+        "MessageInfoService": "AsyncMessageInfoService",
+        "DataBoxSearchService": "AsyncDataBoxSearchService",
+        "DataBoxAccessService": "AsyncDataBoxAccessService",
+        "DataBoxManipulationsService": "AsyncDataBoxManipulationsService",
+        "BigMessageService": "AsyncBigMessageService",
+    }
+
+    def _create_session(self) -> Any:
+        """Create the asynchronous HTTP client shared by all services.
+
+        The synchronous client zeep uses for remote WSDL imports is created
+        and shared as well.
+        """
+        from services.async_services import create_async_session, create_wsdl_session
+
+        session = create_async_session(self.transport_config)
+        self.wsdl_session = create_wsdl_session()
+        return session
+
+    def _get_service(self, service_class: Type[S], **options) -> S:
+        """Get the asynchronous variant of the service, creating it on first use.
+
+        Args:
+            service_class: Class of the synchronous service
+            **options: Options overriding the client defaults for the service
+
+        Returns:
+            The shared service instance
+        """
+        async_class = getattr(services, self._async_services[service_class.__name__])
+        return super()._get_service(
+            async_class, wsdl_session=self.wsdl_session, **options
+        )
+
+    async def download_messages(
+        self,
+        message_ids: Iterable[str],
+        max_workers: int = 8,
+        ordered: bool = False,
+        on_result: Optional[Callable[[BatchResult], None]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[BatchResult[str, DownloadMessageResponse]]:
+        """Download many messages concurrently.
+
+        A failure of one message is recorded in its result and does not
+        abort the batch.
+
+        Args:
+            message_ids: IDs of the messages to download
+            max_workers: Maximum number of concurrent downloads
+            ordered: If True, deliver results in input order, otherwise as
+                they complete
+            on_result: Called with each result as it is delivered
+            on_progress: Called with the number of finished and total messages
+
+        Returns:
+            Results of all downloads in delivery order
+        """
+        from services.batch import run_batch_async
+
+        return await run_batch_async(
+            self.download_message,
+            message_ids,
+            max_workers=max_workers,
+            ordered=ordered,
+            on_result=on_result,
+            on_progress=on_progress,
+        )
+
+    def iter_download_messages(self, *args, **kwargs):
+        raise TypeError("Use download_messages with AsyncISDSClient")
+
+    async def _lookup_data_boxes(
+        self,
+        lookup: Callable[[str], Awaitable[Dict[str, Any]]],
+        data_box_ids: Iterable[str],
+        max_workers: int,
+        on_progress: Optional[Callable[[int, int], None]],
+    ) -> Dict[str, BatchResult[str, Dict[str, Any]]]:
+        from services.batch import run_batch_async
+
+        unique_ids = list(dict.fromkeys(data_box_ids))
+        results = await run_batch_async(
+            lookup, unique_ids, max_workers=max_workers, on_progress=on_progress
+        )
+        by_id = {result.key: result for result in results}
+        return {data_box_id: by_id[data_box_id] for data_box_id in unique_ids}
+
+    async def sync_envelopes(
+        self,
+        store: EnvelopeStore,
+        box_id: str,
+        initial_from: Optional[datetime] = None,
+    ) -> int:
+        """Synchronize the local envelope store of a data box with ISDS.
+
+        Args:
+            store: Local envelope store
+            box_id: ID of the data box the client is logged in to
+            initial_from: Start of the first synchronization
+
+        Returns:
+            Number of stored or updated envelopes
+        """
+        return await store.sync_async(
+            self._message_info, box_id, initial_from=initial_from
+        )
+
+    def close(self) -> None:
+        raise TypeError("Use 'await client.aclose()' to close AsyncISDSClient")
+
+    async def aclose(self) -> None:
+        """Close the pooled connections and the capture file of the client."""
+        await self.session.aclose()
+        self.wsdl_session.close()
+        if self.capture is not None:
+            self.capture.close()
+
+    def __enter__(self) -> "AsyncISDSClient":
+        raise TypeError("Use 'async with AsyncISDSClient(...)' instead of 'with'")
+
+    def __exit__(self, *exc_info) -> None:
+        raise TypeError("Use 'async with AsyncISDSClient(...)' instead of 'with'")
+
+    async def __aenter__(self) -> "AsyncISDSClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -1,11 +1,37 @@
-from .base import DmFile
-from .message import DmEnvelope, DmMessage
-from .responses import DmStatus, DownloadMessageResponse
-
-__all__ = [
-    "DmFile",
-    "DmEnvelope",
-    "DmMessage",
-    "DmStatus",
-    "DownloadMessageResponse",
-]
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .attachment_cache import AttachmentCache
+    from .base import DmFile
+    from .encoded_content import EncodedContent
+    from .message import DmEnvelope, DmMessage
+    from .responses import DmStatus, DownloadMessageResponse
+
+# Modules of the exported names, imported on first access so that pydantic
+# is not loaded until a model is used
+_EXPORTS = {
+    "AttachmentCache": ".attachment_cache",
+    "DmFile": ".base",
+    "EncodedContent": ".encoded_content",
+    "DmEnvelope": ".message",
+    "DmMessage": ".message",
+    "DmStatus": ".responses",
+    "DownloadMessageResponse": ".responses",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    # Later lookups find the name without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,224 @@
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Multiple of 3, so chunks encode to base64 without padding
+ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+
+# Identity of a file version: absolute path, modification time and size
+_FileKey = Tuple[str, int, int]
+
+
+class AttachmentCache:
+    """Content-addressed cache of base64-encoded attachments.
+
+    Files are identified by their path, modification time and size, which map
+    to the SHA-256 digest of their content. Encoded contents are stored by
+    digest, so attachments with the same content share one entry no matter
+    which path they are read from, and modifying a file invalidates it.
+
+    Encoded contents are kept in memory up to max_memory bytes, evicting the
+    least recently used ones. If spill_dir is set, evicted contents and
+    contents larger than max_entry_size are written there instead of being
+    dropped. Entries on disk are reused by other processes sharing the
+    directory.
+    """
+
+    def __init__(
+        self,
+        max_memory: int = 64 * 1024 * 1024,
+        max_entry_size: int = 8 * 1024 * 1024,
+        spill_dir: Optional[Path] = None,
+        max_files: int = 4096,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_memory: Maximum total size in bytes of encoded contents kept
+                in memory
+            max_entry_size: Maximum size in bytes of an encoded content kept
+                in memory
+            spill_dir: Directory for encoded contents evicted from memory;
+                evicted contents are dropped if not set
+            max_files: Maximum number of file versions whose digest is
+                remembered
+        """
+        self.max_memory = max_memory
+        self.max_entry_size = max_entry_size
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.max_files = max_files
+        self.logger = logging.getLogger(__name__)
+        self._digests: "OrderedDict[_FileKey, str]" = OrderedDict()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def encoded(self, file_path: str) -> bytes:
+        """Get the base64-encoded content of a file.
+
+        Args:
+            file_path: Path of the file
+
+        Returns:
+            The encoded content
+        """
+        return b"".join(self.iter_encoded(file_path))
+
+    def iter_encoded(
+        self, file_path: str, chunk_size: int = ENCODE_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """Iterate over the base64-encoded content of a file in chunks.
+
+        The content is encoded and cached on first use. Contents larger than
+        max_entry_size or max_memory are only cached in the spill directory, or encoded from
+        the file on each use if there is none.
+
+        Args:
+            file_path: Path of the file
+            chunk_size: Number of file bytes per chunk, a multiple of 3
+
+        Returns:
+            Iterator over the encoded content
+        """
+        stat = os.stat(file_path)
+        in_memory = self._fits_memory(stat.st_size)
+        if not in_memory and self.spill_dir is None:
+            yield from encode_file_chunks(file_path, chunk_size)
+            return
+
+        digest = self._digest(file_path, stat)
+        encoded = self._get_memory(digest)
+        if encoded is not None:
+            encoded_chunk_size = chunk_size // 3 * 4
+            for start in range(0, len(encoded), encoded_chunk_size):
+                yield encoded[start : start + encoded_chunk_size]
+            return
+
+        path = self._spill_path(digest)
+        if path is None or not path.exists():
+            if in_memory:
+                chunks = []
+                for chunk in encode_file_chunks(file_path, chunk_size):
+                    chunks.append(chunk)
+                    yield chunk
+                self._put_memory(digest, b"".join(chunks))
+                return
+            self._write_spill(digest, encode_file_chunks(file_path, chunk_size))
+            if not path.exists():
+                yield from encode_file_chunks(file_path, chunk_size)
+                return
+
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size // 3 * 4):
+                yield chunk
+
+    def warm(self, file_path: str) -> None:
+        """Encode and cache a file ahead of concurrent uses.
+
+        Does nothing if the file is too large to be cached in memory and
+        there is no spill directory.
+
+        Args:
+            file_path: Path of the file
+        """
+        if self.spill_dir is not None or self._fits_memory(os.path.getsize(file_path)):
+            for _ in self.iter_encoded(file_path):
+                pass
+
+    def clear(self) -> None:
+        """Drop all contents kept in memory (spilled contents are kept)."""
+        with self._lock:
+            self._digests.clear()
+            self._memory.clear()
+            self._memory_size = 0
+
+    def _fits_memory(self, size: int) -> bool:
+        """Whether the encoded content of a file of this size can be kept in memory."""
+        return 4 * ((size + 2) // 3) <= min(self.max_entry_size, self.max_memory)
+
+    def _digest(self, file_path: str, stat: os.stat_result) -> str:
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(ENCODE_CHUNK_SIZE):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        with self._lock:
+            self._digests[key] = digest
+            if len(self._digests) > self.max_files:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _get_memory(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            encoded = self._memory.get(digest)
+            if encoded is not None:
+                self._memory.move_to_end(digest)
+            return encoded
+
+    def _spill_path(self, digest: str) -> Optional[Path]:
+        if self.spill_dir is None:
+            return None
+        return self.spill_dir / f"{digest}.b64"
+
+    def _put_memory(self, digest: str, encoded: bytes) -> None:
+        with self._lock:
+            if digest not in self._memory:
+                self._memory[digest] = encoded
+                self._memory_size += len(encoded)
+            evicted = []
+            while self._memory_size > self.max_memory:
+                evicted_digest, evicted_content = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted_content)
+                evicted.append((evicted_digest, evicted_content))
+        for evicted_digest, evicted_content in evicted:
+            path = self._spill_path(evicted_digest)
+            if path is not None and not path.exists():
+                self._write_spill(evicted_digest, [evicted_content])
+
+    def _write_spill(self, digest: str, chunks: Iterable[bytes]) -> None:
+        path = self._spill_path(digest)
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial data
+            fd, tmp_name = tempfile.mkstemp(dir=self.spill_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except Exception as e:
+            self.logger.warning(f"Failed to write attachment cache entry {path}: {e}")
+
+
+def encode_file_chunks(
+    file_path: str, chunk_size: int = ENCODE_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Encode a file to base64 chunk by chunk, without caching.
+
+    Args:
+        file_path: Path of the file
+        chunk_size: Number of file bytes per chunk, a multiple of 3
+
+    Returns:
+        Iterator over the encoded content
+    """
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield base64.b64encode(chunk)
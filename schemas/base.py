@@ -1,14 +1,23 @@
-import base64
 import mimetypes
-from typing import Optional
+from typing import ClassVar, Iterator, Optional
 import uuid
-from pydantic import BaseModel, Field, computed_field
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
 import os
 
+from .attachment_cache import ENCODE_CHUNK_SIZE, AttachmentCache, encode_file_chunks
+
 
 class DmFile(BaseModel):
     file_path: str = Field(..., description="File path")
 
+    # Encoded contents shared by all instances, so sending the same file many
+    # times reads and encodes it only once. Off by default: files are encoded
+    # from disk on each use unless an AttachmentCache is set here
+    cache: ClassVar[Optional[AttachmentCache]] = None
+
+    _file_guid: str = PrivateAttr(default_factory=lambda: str(uuid.uuid4()))
+    _up_file_guid: str = PrivateAttr(default_factory=lambda: str(uuid.uuid4()))
+
     @computed_field
     def dmEncodedContent(self) -> str | None:
         return self._encode_file()
@@ -33,16 +42,33 @@ class DmFile(BaseModel):
     def dmFileGuid(self) -> str | None:
         if not self.file_path:
             return None
-        return str(uuid.uuid4())
+        return self._file_guid
 
     @computed_field
     def dmUpFileGuid(self) -> str | None:
         if not self.file_path:
             return None
-        return str(uuid.uuid4())
+        return self._up_file_guid
 
     def _encode_file(self):
         if not self.file_path:
             return None
-        with open(self.file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return b"".join(self.iter_encoded()).decode("utf-8")
+
+    def encoded_size(self) -> int:
+        """Length of the base64-encoded file content in bytes."""
+        size = os.path.getsize(self.file_path)
+        return 4 * ((size + 2) // 3)
+
+    def iter_encoded(self, chunk_size: int = ENCODE_CHUNK_SIZE) -> Iterator[bytes]:
+        """Iterate over the base64-encoded file content chunk by chunk.
+
+        Args:
+            chunk_size: Number of file bytes per chunk, a multiple of 3
+
+        Returns:
+            Iterator over the encoded content
+        """
+        if self.cache is None:
+            return encode_file_chunks(self.file_path, chunk_size)
+        return self.cache.iter_encoded(self.file_path, chunk_size)
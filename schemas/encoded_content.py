@@ -0,0 +1,75 @@
+import base64
+from typing import Any, Dict, Optional, Union
+
+
+class EncodedContent:
+    """Base64-encoded binary content of a downloaded file, decoded on access.
+
+    Decoding a large attachment costs far more than parsing and validating
+    the rest of a message, so a FastCodec created with lazy_content returns
+    file contents as EncodedContent and the decoding is only done when the
+    content is used. The decoded bytes are then kept and the base64 text is
+    dropped.
+
+    bytes(content) returns the decoded content. The content can also be
+    written to binary files, hashed and compared with bytes directly, as it
+    supports the buffer protocol.
+    """
+
+    __slots__ = ("_encoded", "_decoded")
+
+    def __init__(self, encoded: Union[str, bytes]):
+        """Initialize the content.
+
+        Args:
+            encoded: Base64-encoded content
+        """
+        self._encoded: Optional[Union[str, bytes]] = encoded
+        self._decoded: Optional[bytes] = None
+
+    @property
+    def value(self) -> bytes:
+        """Decoded content."""
+        decoded = self._decoded
+        if decoded is None:
+            encoded = self._encoded
+            # Another thread may have decoded it meanwhile
+            decoded = self._decoded if encoded is None else base64.b64decode(encoded)
+            self._decoded = decoded
+            self._encoded = None
+        return decoded
+
+    @property
+    def is_decoded(self) -> bool:
+        """True if the content was decoded."""
+        return self._decoded is not None
+
+    def __bytes__(self) -> bytes:
+        return self.value
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return memoryview(self.value)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, EncodedContent):
+            return self.value == other.value
+        if isinstance(other, (bytes, bytearray, memoryview)):
+            return self.value == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+    def __repr__(self) -> str:
+        if self._decoded is None:
+            return f"EncodedContent({len(self._encoded)} encoded characters)"
+        return f"EncodedContent({len(self._decoded)} bytes)"
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "EncodedContent":
+        return self
+
+    def __reduce__(self):
+        return bytes, (self.value,)
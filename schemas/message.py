@@ -1,6 +1,8 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_serializer, field_validator
+from typing import Any, Optional, List
+
+from .encoded_content import EncodedContent
 
 
 class DmReceivedFile(BaseModel):
@@ -12,6 +14,23 @@ class DmReceivedFile(BaseModel):
     dmFormat: Optional[str] = Field(None, description="File format")
     dmEncodedContent: Optional[bytes] = Field(None, description="Encoded content")
     dmXmlContent: Optional[str] = Field(None, description="XML content")
+    file_path: Optional[str] = Field(
+        None, description="Path of the saved content (streaming download)"
+    )
+
+    @field_validator("dmEncodedContent", mode="wrap")
+    @classmethod
+    def _keep_encoded_content(cls, value: Any, handler: Any) -> Any:
+        # Content decoded on access is kept as it is
+        if isinstance(value, EncodedContent):
+            return value
+        return handler(value)
+
+    @field_serializer("dmEncodedContent", mode="wrap")
+    def _serialize_encoded_content(self, value: Any, handler: Any) -> Any:
+        if isinstance(value, EncodedContent):
+            value = value.value
+        return handler(value)
 
 
 class DmFiles(BaseModel):
@@ -1,14 +1,99 @@
-from .base import BaseService, ISDSError
-from .message_operations import MessageOperationsService
-from .message_info import MessageInfoService
-from .data_box_search import DataBoxSearchService
-from .data_box_access import DataBoxAccessService
-
-__all__ = [
-    "BaseService",
-    "ISDSError",
-    "MessageOperationsService",
-    "MessageInfoService",
-    "DataBoxSearchService",
-    "DataBoxAccessService",
-]
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .base import BaseService
+    from .errors import CircuitOpenError, ISDSError
+    from .message_operations import MessageOperationsService
+    from .message_info import MessageInfoService
+    from .data_box_search import DataBoxSearchService
+    from .data_box_access import DataBoxAccessService
+    from .data_box_manipulations import DataBoxManipulationsService
+    from .big_message import BigMessageService
+    from .async_services import (
+        AsyncBaseService,
+        AsyncMessageOperationsService,
+        AsyncMessageInfoService,
+        AsyncDataBoxSearchService,
+        AsyncDataBoxAccessService,
+        AsyncDataBoxManipulationsService,
+        AsyncBigMessageService,
+    )
+    from .batch import BatchResult
+    from .capture import Capture, CaptureConfig, CapturedMessage
+    from .envelope_store import EnvelopeStore
+    from .fast_codec import FAST_OPERATIONS, FastCodec
+    from .flow_control import FlowControl, FlowControlConfig
+    from .lazy_response import LazyList, LazyResponse, materialize
+    from .message_table import MessageRow, MessageTable
+    from .instrumentation import (
+        CallRecord,
+        Instrumentation,
+        MetricsCollector,
+        TracingObserver,
+    )
+    from .response_cache import ResponseCache, SQLiteCacheBackend
+    from .transfer_journal import TransferJournal
+    from .transport import TransportConfig
+    from .wsdl_cache import WSDLCache
+
+# Modules of the exported names. They are imported on first access, so
+# importing the package does not load zeep, lxml and requests until a
+# service is used.
+_EXPORTS = {
+    "BaseService": ".base",
+    "ISDSError": ".errors",
+    "CircuitOpenError": ".errors",
+    "MessageOperationsService": ".message_operations",
+    "MessageInfoService": ".message_info",
+    "DataBoxSearchService": ".data_box_search",
+    "DataBoxAccessService": ".data_box_access",
+    "DataBoxManipulationsService": ".data_box_manipulations",
+    "BigMessageService": ".big_message",
+    "AsyncBaseService": ".async_services",
+    "AsyncMessageOperationsService": ".async_services",
+    "AsyncMessageInfoService": ".async_services",
+    "AsyncDataBoxSearchService": ".async_services",
+    "AsyncDataBoxAccessService": ".async_services",
+    "AsyncDataBoxManipulationsService": ".async_services",
+    "AsyncBigMessageService": ".async_services",
+    "BatchResult": ".batch",
+    "Capture": ".capture",
+    "CaptureConfig": ".capture",
+    "CapturedMessage": ".capture",
+    "EnvelopeStore": ".envelope_store",
+    "FAST_OPERATIONS": ".fast_codec",
+    "FastCodec": ".fast_codec",
+    "FlowControl": ".flow_control",
+    "FlowControlConfig": ".flow_control",
+    "CallRecord": ".instrumentation",
+    "Instrumentation": ".instrumentation",
+    "MetricsCollector": ".instrumentation",
+    "TracingObserver": ".instrumentation",
+    "LazyList": ".lazy_response",
+    "LazyResponse": ".lazy_response",
+    "materialize": ".lazy_response",
+    "MessageRow": ".message_table",
+    "MessageTable": ".message_table",
+    "ResponseCache": ".response_cache",
+    "SQLiteCacheBackend": ".response_cache",
+    "TransferJournal": ".transfer_journal",
+    "TransportConfig": ".transport",
+    "WSDLCache": ".wsdl_cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    # Later lookups find the name without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *__all__})
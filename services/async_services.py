@@ -0,0 +1,696 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from zeep import AsyncClient
+from zeep.proxy import AsyncServiceProxy
+from zeep.transports import AsyncTransport
+
+from schemas.base import DmFile
+from schemas.responses import DownloadMessageResponse
+from .base import BaseService, ISDSError
+from .batch import AsyncSingleFlight, BatchResult, run_batch_async
+from .big_message import (
+    BigMessageService,
+    _check_download,
+    _check_upload,
+    _downloaded_path,
+    _open_part_file,
+    _upload_key,
+    _uploaded,
+)
+from .data_box_access import DataBoxAccessService
+from .data_box_manipulations import DataBoxManipulationsService
+from .data_box_search import DataBoxSearchService
+from .instrumentation import CallRecord
+from .message_info import MessageInfoService
+from .message_table import MessageTable
+from .message_operations import MAX_MULTIPLE_RECIPIENTS, MessageOperationsService
+from .mtom import create_response_parser
+from .response_cache import MISS, call_key
+from .streaming import RESPONSE_CHUNK_SIZE, ContentExtractor, StreamedContent
+from .transfer_journal import TransferJournal
+from .transport import TransportConfig
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+def create_async_session(config: TransportConfig) -> "httpx.AsyncClient":
+    """Create a pooled asynchronous HTTP client.
+
+    Args:
+        config: Transport settings
+
+    Returns:
+        Client to be shared by all asynchronous services of a client
+    """
+    if httpx is None:
+        raise ImportError("The asynchronous client requires the httpx package")
+
+    max_connections = config.pool_connections * config.pool_maxsize
+    transport = httpx.AsyncHTTPTransport(
+        verify=config.ssl_context or True,
+        retries=config.max_retries,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections if config.keep_alive else 0,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+    )
+
+
+def create_wsdl_session() -> "httpx.Client":
+    """Create the synchronous HTTP client zeep uses to load remote WSDL imports.
+
+    Returns:
+        Client to be shared by all asynchronous services of a client
+    """
+    if httpx is None:
+        raise ImportError("The asynchronous client requires the httpx package")
+    return httpx.Client()
+
+
+class AsyncBaseService(BaseService):
+    """Base class for asynchronous ISDS services.
+
+    The session passed to the service must be an httpx.AsyncClient. Service
+    methods return awaitables resolving to the same values as the methods of
+    the synchronous services.
+    """
+
+    client_class = AsyncClient
+    proxy_class = AsyncServiceProxy
+    single_flight_class = AsyncSingleFlight
+
+    def __init__(self, *args, wsdl_session: Optional["httpx.Client"] = None, **kwargs):
+        """Initialize the service.
+
+        Args:
+            *args: Arguments passed to the synchronous service
+            wsdl_session: Synchronous HTTP client for remote WSDL imports,
+                shared with other services; a new client is created if not
+                set
+            **kwargs: Options passed to the synchronous service
+        """
+        self.wsdl_session = wsdl_session
+        super().__init__(*args, **kwargs)
+
+    def _create_transport(self) -> AsyncTransport:
+        """Create the asynchronous zeep transport with basic auth."""
+        session = self.session or create_async_session(self.transport_config)
+        # zeep resets the client headers, so authenticate via httpx instead
+        session.auth = httpx.BasicAuth(self.username, self.password)
+        # The WSDL client is only used for remote imports, the bundled
+        # documents are loaded from disk
+        if self.wsdl_session is None:
+            self.wsdl_session = create_wsdl_session()
+        return AsyncTransport(client=session, wsdl_client=self.wsdl_session)
+
+    async def _call(self, operation_name: str, **kwargs) -> Any:
+        """Call a service operation with error handling.
+
+        Args:
+            operation_name: Name of the operation to call
+            **kwargs: Arguments to pass to the operation
+
+        Returns:
+            The response from the operation
+
+        Raises:
+            ISDSError: If there is an error calling the operation
+        """
+        cached = self._get_cached(operation_name, kwargs)
+        if cached is not MISS:
+            return cached
+        if operation_name in self.collapsed_operations:
+            return await self._in_flight.run(
+                call_key(operation_name, kwargs),
+                partial(self._call_uncached, operation_name, kwargs),
+            )
+        return await self._call_uncached(operation_name, kwargs)
+
+    async def _limited(
+        self,
+        operation_name: str,
+        func: Callable[[], Awaitable[Any]],
+        retry: bool = True,
+    ) -> Any:
+        """Make an asynchronous call within the flow control limits of the endpoint."""
+        if self.flow_control is None:
+            return await func()
+        return await self.flow_control.call_async(
+            self.endpoint, operation_name, func, retry=retry
+        )
+
+    async def _call_uncached(self, operation_name: str, kwargs: Dict[str, Any]) -> Any:
+        """Call a service operation, caching the response if configured."""
+        record = self._start_record(operation_name)
+        try:
+            response = await self._limited(
+                operation_name, partial(self._send, operation_name, kwargs, record)
+            )
+            result = self._process_measured(operation_name, response, record)
+        except Exception as e:
+            self._finish_record(record, error=e)
+            raise self._map_error(operation_name, e)
+        self._finish_record(record, result)
+        self._set_cached(operation_name, kwargs, result)
+        return result
+
+    async def _send(
+        self, operation_name: str, kwargs: Dict[str, Any], record: Optional[CallRecord]
+    ) -> Any:
+        """Send the request of an operation and parse its response.
+
+        Args:
+            operation_name: Name of the operation to call
+            kwargs: Arguments to pass to the operation
+            record: Measurements of the call, None if it is not measured
+
+        Returns:
+            The response returned by zeep, or the serialized response if it
+            was decoded by the fast codec
+        """
+        codec = self._operation_codec(operation_name)
+        if record is None and codec is None:
+            return await getattr(self.service, operation_name)(**kwargs)
+
+        client = self.service._client
+        address = self.service._binding_options["address"]
+        started = time.perf_counter()
+        message, headers = self._encode(codec, operation_name, kwargs)
+        sent = time.perf_counter()
+        response = await client.transport.post(address, message, headers)
+        received = time.perf_counter()
+        result = self._decode(
+            codec, operation_name, client.transport.new_response(response)
+        )
+        if record is not None:
+            self._record_phases(
+                record, started, sent, received, len(message), len(response.content)
+            )
+        return result
+
+    async def _call_streaming(
+        self, operation_name: str, contents: Dict[str, StreamedContent], **kwargs
+    ) -> Any:
+        """Call a service operation, streaming large contents into the request.
+
+        Args:
+            operation_name: Name of the operation to call
+            contents: Contents to stream, keyed by the placeholders used in
+                place of them in kwargs
+            **kwargs: Arguments to pass to the operation
+
+        Returns:
+            The response from the operation
+
+        Raises:
+            ISDSError: If there is an error calling the operation
+        """
+        record = self._start_record(operation_name)
+        try:
+            client = self.service._client
+            address, body, headers = self._prepare_streaming(
+                operation_name, contents, kwargs
+            )
+            if record is not None:
+                record.request_bytes = len(body)
+
+            async def send() -> Any:
+                # httpx only sends bodies asynchronously if they are not iterable
+                response = await client.transport.post(address, aiter(body), headers)
+                if record is not None:
+                    record.response_bytes = len(response.content)
+                return self.service._binding.process_reply(
+                    client,
+                    self.service._binding.get(operation_name),
+                    client.transport.new_response(response),
+                )
+
+            result = await self._limited(operation_name, send, retry=False)
+            result = self._process_response(operation_name, result)
+        except Exception as e:
+            self._finish_record(record, error=e)
+            raise self._map_error(operation_name, e)
+        self._finish_record(record, result)
+        return result
+
+    async def _call_extracting(
+        self, operation_name: str, extractor: ContentExtractor, **kwargs
+    ) -> Any:
+        """Call a service operation, parsing the response as it is received.
+
+        Args:
+            operation_name: Name of the operation to call
+            extractor: Parser saving the contents of the response
+            **kwargs: Arguments to pass to the operation
+
+        Returns:
+            The response from the operation
+
+        Raises:
+            ISDSError: If there is an error calling the operation
+        """
+        record = self._start_record(operation_name)
+        try:
+            transport = self.service._client.transport
+            address, body, headers = self._prepare_streaming(operation_name, {}, kwargs)
+            if record is not None:
+                record.request_bytes = len(body)
+
+            async def receive() -> Any:
+                async with transport.client.stream(
+                    "POST", address, content=aiter(body), headers=headers
+                ) as response:
+                    parser = create_response_parser(
+                        response.headers.get("Content-Type", ""), extractor
+                    )
+                    async for chunk in response.aiter_bytes(RESPONSE_CHUNK_SIZE):
+                        parser.feed(chunk)
+                        if record is not None:
+                            record.response_bytes += len(chunk)
+                    document = parser.finish()
+                return self._process_document(
+                    operation_name, response.status_code, document
+                )
+
+            result = await self._limited(operation_name, receive, retry=False)
+            result = self._process_response(operation_name, result)
+        except Exception as e:
+            extractor.abort()
+            self._finish_record(record, error=e)
+            raise self._map_error(operation_name, e)
+        self._finish_record(record, result)
+        return result
+
+
+class AsyncMessageOperationsService(AsyncBaseService, MessageOperationsService):
+    """Asynchronous service for message operations (dm_operations.wsdl)."""
+
+    async def download_message(self, message_id: str) -> DownloadMessageResponse:
+        """Download a received message.
+
+        Args:
+            message_id: ID of the message to download
+
+        Returns:
+            The complete message content
+        """
+        response = await self._call("MessageDownload", dmID=message_id)
+        return DownloadMessageResponse.model_validate(response)
+
+    async def download_message_to(
+        self,
+        message_id: str,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> DownloadMessageResponse:
+        """Download a received message, streaming its attachments to files.
+
+        Args:
+            message_id: ID of the message to download
+            target_dir: Directory the attachments are saved to
+            open_sink: Called with the index and attributes of an attachment
+                to open the binary file it is written to
+
+        Returns:
+            The message with paths of the saved attachments
+        """
+        extractor = self._attachment_extractor(target_dir, open_sink, message_id)
+        response = await self._call_extracting(
+            "MessageDownload", extractor, dmID=message_id
+        )
+        return self._saved_message(response, extractor.paths)
+
+    async def send_mass_message(
+        self,
+        recipients: Iterable[Union[str, Dict[str, Any]]],
+        subject: str,
+        files: List[DmFile],
+        batch_size: int = MAX_MULTIPLE_RECIPIENTS,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> List[BatchResult[str, str]]:
+        """Send a message with shared attachments to many recipients.
+
+        Args:
+            recipients: Recipient data box IDs or recipient structures
+            subject: Subject of the message
+            files: Files to attach to each message
+            batch_size: Maximum number of recipients per request
+            max_workers: Maximum number of concurrent requests
+            **kwargs: Additional message parameters
+
+        Returns:
+            One result per recipient in input order, with the ID of the
+            created message
+        """
+        # Encoding the shared files reads them, so keep it off the event loop
+        recipients, batches = await asyncio.to_thread(
+            self._mass_batches, recipients, files, batch_size
+        )
+        results = await run_batch_async(
+            partial(self._send_batch, recipients, subject, files, kwargs),
+            batches,
+            max_workers=max_workers,
+        )
+        return self._recipient_results(recipients, results)
+
+
+class AsyncMessageInfoService(AsyncBaseService, MessageInfoService):
+    """Asynchronous service for message info operations (dm_info.wsdl)."""
+
+    async def get_sent_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of sent messages as a compact MessageTable."""
+        return await self._collect_table(
+            self.iter_sent_messages(
+                from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+            )
+        )
+
+    async def get_received_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of received messages as a compact MessageTable."""
+        return await self._collect_table(
+            self.iter_received_messages(
+                from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+            )
+        )
+
+    async def get_state_change_records(
+        self, from_time: datetime, to_time: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get the state changes of messages in a time range as records."""
+        return self._page_records(
+            await self.get_message_state_changes(from_time, to_time)
+        )
+
+    @staticmethod
+    async def _collect_table(records: AsyncIterator[Dict[str, Any]]) -> MessageTable:
+        table = MessageTable()
+        async for record in records:
+            table.append(record)
+        return table
+
+    async def _iter_records(
+        self,
+        fetch: Callable[..., Awaitable[Dict[str, Any]]],
+        page_size: int,
+        prefetch: bool,
+        **params,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over the records of a paginated message list.
+
+        Args:
+            fetch: Method fetching one page of the list
+            page_size: Number of records fetched per request
+            prefetch: If True, fetch the next page while the current one is
+                being consumed
+            **params: Parameters passed to fetch
+
+        Returns:
+            Asynchronous iterator over message records
+        """
+
+        async def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            response = await fetch(dmOffset=offset, dmLimit=page_size, **params)
+            return self._page_records(response)
+
+        pending: Optional[asyncio.Task] = None
+        offset = 1  # ISDS numbers the records from 1
+        first_id = None
+        try:
+            while True:
+                page = await (pending or fetch_page(offset))
+                pending = None
+                # A server ignoring dmOffset returns the same page again
+                if page and page[0]["dmID"] == first_id:
+                    return
+                first_id = page[0]["dmID"] if page else None
+                # A full page may be followed by more records
+                has_more = len(page) >= page_size
+                offset += len(page)
+                if has_more and prefetch:
+                    pending = asyncio.ensure_future(fetch_page(offset))
+                for record in page:
+                    yield record
+                if not has_more:
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+class AsyncDataBoxSearchService(AsyncBaseService, DataBoxSearchService):
+    """Asynchronous service for data box search operations (db_search.wsdl)."""
+
+
+class AsyncDataBoxAccessService(AsyncBaseService, DataBoxAccessService):
+    """Asynchronous service for data box access operations (db_access.wsdl)."""
+
+
+class AsyncDataBoxManipulationsService(AsyncBaseService, DataBoxManipulationsService):
+    """Asynchronous service for data box manipulations (db_manipulations.wsdl)."""
+
+
+class AsyncBigMessageService(AsyncBaseService, BigMessageService):
+    """Asynchronous service for high-volume messages (dm_VoDZ.wsdl)."""
+
+    async def upload_attachments(
+        self,
+        files: List[DmFile],
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+    ) -> List[Dict[str, Any]]:
+        """Upload attachments of a high-volume message concurrently.
+
+        Args:
+            files: Files to upload
+            journal: Journal of finished uploads
+            max_workers: Maximum number of concurrent uploads
+            retries: Number of times a failed upload is repeated
+
+        Returns:
+            Upload results (attachment ID and hashes) in the order of files
+        """
+        results = await run_batch_async(
+            partial(self._upload_journaled, journal=journal, retries=retries),
+            files,
+            max_workers=max_workers,
+            ordered=True,
+        )
+        return self._batch_results("upload", results)
+
+    async def send_big_message(
+        self,
+        recipient_id: str,
+        subject: str,
+        files: List[DmFile],
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Upload attachments and send a high-volume message referencing them.
+
+        Args:
+            recipient_id: ID of the recipient's data box
+            subject: Subject of the message
+            files: Files to attach
+            journal: Journal of finished uploads
+            max_workers: Maximum number of concurrent uploads
+            retries: Number of times a failed upload is repeated
+            **kwargs: Additional message parameters
+
+        Returns:
+            Response containing the created message details
+        """
+        uploads = await self.upload_attachments(
+            files, journal=journal, max_workers=max_workers, retries=retries
+        )
+        response = await self.create_big_message(
+            recipient_id, subject, self._ext_files(uploads), **kwargs
+        )
+        self._forget_uploads(files, journal)
+        return response
+
+    async def download_attachments_to(
+        self,
+        message_id: str,
+        att_nums: Iterable[int],
+        target_dir: Path,
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+    ) -> List[Dict[str, Any]]:
+        """Download attachments of a high-volume message concurrently.
+
+        Args:
+            message_id: ID of the message
+            att_nums: Numbers of the attachments to download
+            target_dir: Directory the attachments are saved to
+            journal: Journal of finished downloads
+            max_workers: Maximum number of concurrent downloads
+            retries: Number of times a failed download is repeated
+
+        Returns:
+            Attachment metadata with file_path set, in the order of att_nums
+        """
+        results = await run_batch_async(
+            partial(
+                self._download_journaled,
+                message_id,
+                target_dir=Path(target_dir),
+                journal=journal,
+                retries=retries,
+            ),
+            att_nums,
+            max_workers=max_workers,
+            ordered=True,
+        )
+        return self._batch_results("download", results)
+
+    async def _upload_journaled(
+        self, file: DmFile, journal: Optional[TransferJournal], retries: int
+    ) -> Dict[str, Any]:
+        key = _upload_key(file)
+        if journal is not None and _uploaded(uploaded := journal.get(key)):
+            return uploaded
+
+        async def upload() -> Dict[str, Any]:
+            return _check_upload(await self.upload_attachment(file))
+
+        response = await self._retry(upload, retries)
+        if journal is not None:
+            journal.record(key, response)
+        return response
+
+    async def _download_journaled(
+        self,
+        message_id: str,
+        att_num: int,
+        target_dir: Path,
+        journal: Optional[TransferJournal],
+        retries: int,
+    ) -> Dict[str, Any]:
+        key = f"download:{message_id}:{att_num}"
+        downloaded = journal.get(key) if journal is not None else None
+        path = _downloaded_path(downloaded)
+        if path is not None and os.path.exists(path):
+            return downloaded
+
+        async def download() -> Dict[str, Any]:
+            return _check_download(
+                await self.download_attachment_to(
+                    message_id,
+                    att_num,
+                    open_sink=partial(
+                        _open_part_file, target_dir, message_id, att_num
+                    ),
+                )
+            )
+
+        response = await self._retry(download, retries)
+        self._complete_part_file(response)
+        if journal is not None:
+            journal.record(key, response)
+        return response
+
+    async def _retry(
+        self, transfer: Callable[[], Awaitable[Any]], retries: int
+    ) -> Any:
+        """Run a transfer, repeating it if it fails."""
+        for attempt in range(retries + 1):
+            try:
+                return await transfer()
+            except ISDSError as e:
+                if attempt == retries:
+                    raise
+                self.logger.warning(
+                    f"Transfer failed, retrying ({attempt + 1}/{retries}): {e}"
+                )
+
+    async def download_attachment_to(
+        self,
+        message_id: str,
+        att_num: int,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> Dict[str, Any]:
+        """Download an attachment of a high-volume message straight to a file.
+
+        Args:
+            message_id: ID of the message
+            att_num: Number of the attachment within the message
+            target_dir: Directory the attachment is saved to, as
+                "<message_id>_<att_num>_<dmFileDescr>"
+            open_sink: Called with the index and attributes of the attachment
+                to open the binary file it is written to
+
+        Returns:
+            The attachment metadata with file_path set to the saved content
+        """
+        extractor = self._attachment_extractor(
+            target_dir, open_sink, message_id, att_num
+        )
+        response = await self._call_extracting(
+            "DownloadAttachment", extractor, dmID=message_id, attNum=att_num
+        )
+        return self._saved_attachment(response, extractor.paths)
+
+    async def download_big_message_to(
+        self,
+        message_id: str,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> DownloadMessageResponse:
+        """Download a received high-volume message, streaming its attachments.
+
+        Args:
+            message_id: ID of the message to download
+            target_dir: Directory the attachments are saved to
+            open_sink: Called with the index and attributes of an attachment
+                to open the binary file it is written to
+
+        Returns:
+            The message with paths of the saved attachments
+        """
+        extractor = self._attachment_extractor(target_dir, open_sink, message_id)
+        response = await self._call_extracting(
+            "BigMessageDownload", extractor, dmID=message_id
+        )
+        return self._saved_message(response, extractor.paths)
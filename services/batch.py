@@ -0,0 +1,280 @@
+import copy
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+    TypeVar,
+)
+
+# asyncio is imported by the asynchronous functions, so synchronous clients
+# do not load it
+if TYPE_CHECKING:
+    import asyncio
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+
+@dataclass
+class BatchResult(Generic[K, T]):
+    """Result of one item of a batch operation.
+
+    Attributes:
+        key: Input item (e.g., message ID) the result belongs to
+        index: Position of the item in the input
+        result: Result of the operation if it succeeded
+        error: Error raised by the operation if it failed
+    """
+
+    key: K
+    index: int
+    result: Optional[T] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """True if the operation succeeded."""
+        return self.error is None
+
+
+def _run_one(func: Callable[[K], T], key: K, index: int) -> BatchResult[K, T]:
+    try:
+        return BatchResult(key=key, index=index, result=func(key))
+    except Exception as e:
+        # Errors are isolated per item so one failure does not abort the batch
+        return BatchResult(key=key, index=index, error=e)
+
+
+def iter_batch(
+    func: Callable[[K], T],
+    keys: Iterable[K],
+    max_workers: int = 8,
+    ordered: bool = False,
+) -> Iterator[BatchResult[K, T]]:
+    """Run an operation for many items with bounded concurrency.
+
+    At most max_workers items are processed at once and only a small window
+    of items is submitted ahead, so results are produced as the iterator is
+    consumed and finished results are not accumulated.
+
+    Args:
+        func: Operation called with each item
+        keys: Items to process
+        max_workers: Maximum number of concurrent operations
+        ordered: If True, yield results in input order, otherwise as they
+            complete
+
+    Returns:
+        Iterator over the results of all items
+    """
+    items = enumerate(keys)
+    window = max_workers * 2
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending: Deque[Future] = deque()
+
+    def submit_next() -> bool:
+        item: Optional[Tuple[int, K]] = next(items, None)
+        if item is None:
+            return False
+        index, key = item
+        pending.append(executor.submit(_run_one, func, key, index))
+        return True
+
+    try:
+        while len(pending) < window and submit_next():
+            pass
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [future for future in pending if future in finished]
+                for future in done:
+                    pending.remove(future)
+            for future in done:
+                submit_next()
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batch(
+    func: Callable[[K], T],
+    keys: Iterable[K],
+    max_workers: int = 8,
+    ordered: bool = False,
+    on_result: Optional[Callable[[BatchResult[K, T]], None]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[BatchResult[K, T]]:
+    """Run an operation for many items and collect the results.
+
+    Args:
+        func: Operation called with each item
+        keys: Items to process
+        max_workers: Maximum number of concurrent operations
+        ordered: If True, deliver results in input order, otherwise as they
+            complete
+        on_result: Called with each result as it is delivered
+        on_progress: Called with the number of finished and total items after
+            each result
+
+    Returns:
+        Results of all items in delivery order
+    """
+    keys = list(keys)
+    results: List[BatchResult[K, T]] = []
+    for result in iter_batch(func, keys, max_workers=max_workers, ordered=ordered):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+        if on_progress is not None:
+            on_progress(len(results), len(keys))
+    return results
+
+
+async def run_batch_async(
+    func: Callable[[K], Awaitable[T]],
+    keys: Iterable[K],
+    max_workers: int = 8,
+    ordered: bool = False,
+    on_result: Optional[Callable[[BatchResult[K, T]], None]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[BatchResult[K, T]]:
+    """Run an asynchronous operation for many items and collect the results.
+
+    Args:
+        func: Coroutine function called with each item
+        keys: Items to process
+        max_workers: Maximum number of concurrent operations
+        ordered: If True, deliver results in input order, otherwise as they
+            complete
+        on_result: Called with each result as it is delivered
+        on_progress: Called with the number of finished and total items after
+            each result
+
+    Returns:
+        Results of all items in delivery order
+    """
+    import asyncio
+
+    keys = list(keys)
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def run_one(index: int, key: K) -> BatchResult[K, T]:
+        async with semaphore:
+            try:
+                return BatchResult(key=key, index=index, result=await func(key))
+            except Exception as e:
+                return BatchResult(key=key, index=index, error=e)
+
+    tasks = [asyncio.ensure_future(run_one(i, key)) for i, key in enumerate(keys)]
+    results: List[BatchResult[K, T]] = []
+    try:
+        for task in tasks if ordered else asyncio.as_completed(tasks):
+            result = await task
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+            if on_progress is not None:
+                on_progress(len(results), len(keys))
+    finally:
+        for task in tasks:
+            task.cancel()
+    return results
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one.
+
+    While a call with a key is running, other threads calling with the same
+    key wait for it and receive copies of its result (or its error) instead
+    of repeating the call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Call func unless a call with the same key is already running.
+
+        Args:
+            key: Key identifying identical calls
+            func: The call
+
+        Returns:
+            Result of the call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Collapses concurrent identical calls of an event loop into one."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future"] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Await func() unless a call with the same key is already running.
+
+        Args:
+            key: Key identifying identical calls
+            func: Coroutine function making the call
+
+        Returns:
+            Result of the call
+        """
+        import asyncio
+
+        future = self._calls.get(key)
+        if future is not None:
+            # Shielded, so a cancelled waiter does not cancel the call
+            return copy.deepcopy(await asyncio.shield(future))
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the error as retrieved in case nobody else waits for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
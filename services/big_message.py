@@ -0,0 +1,501 @@
+import os
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Any, Iterable, List, Optional
+
+from schemas.base import DmFile
+from schemas.responses import DownloadMessageResponse
+from .base import BaseService, ISDSError, _open_attachment_file
+from .batch import BatchResult, run_batch
+from .mtom import BinaryFileContent
+from .streaming import content_placeholder
+from .transfer_journal import TransferJournal
+
+# Suffix of attachment files being downloaded
+PART_SUFFIX = ".part"
+
+
+class BigMessageService(BaseService):
+    """Service for high-volume message operations (dm_VoDZ.wsdl).
+
+    Attachments are uploaded as binary MTOM/XOP parts streamed from their
+    files. Attachments can be downloaded straight to files, from both MTOM and
+    inline base64 responses, so memory use does not depend on their size.
+    """
+
+    use_mtom = True
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str,
+        wsdl_dir: Path,
+        debug: bool = False,
+        **kwargs,
+    ):
+        """Initialize the high-volume message service.
+
+        Args:
+            username: Login username
+            password: Password
+            base_url: Base URL of the ISDS high-volume message service
+            wsdl_dir: Directory containing WSDL files
+            debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
+        """
+        super().__init__(
+            username=username,
+            password=password,
+            base_url=base_url,
+            wsdl_dir=wsdl_dir,
+            wsdl_filename="dm_VoDZ.wsdl",
+            endpoint="vodz",
+            debug=debug,
+            **kwargs,
+        )
+
+    def upload_attachment(self, file: DmFile) -> Dict[str, Any]:
+        """Upload an attachment of a high-volume message.
+
+        Args:
+            file: File to upload
+
+        Returns:
+            Attachment ID and hashes used to reference it in create_big_message
+        """
+        placeholder = content_placeholder()
+        return self._call_streaming(
+            "UploadAttachment",
+            {placeholder: BinaryFileContent(file.file_path)},
+            dmFile={
+                "dmEncodedContent": placeholder,
+                "dmMimeType": file.dmMimeType,
+                "dmFileDescr": file.dmFileDescr,
+            },
+        )
+
+    def download_attachment(self, message_id: str, att_num: int) -> Dict[str, Any]:
+        """Download an attachment of a high-volume message.
+
+        Args:
+            message_id: ID of the message
+            att_num: Number of the attachment within the message
+
+        Returns:
+            The attachment content and metadata
+        """
+        return self._call("DownloadAttachment", dmID=message_id, attNum=att_num)
+
+    def download_attachment_to(
+        self,
+        message_id: str,
+        att_num: int,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> Dict[str, Any]:
+        """Download an attachment of a high-volume message straight to a file.
+
+        Args:
+            message_id: ID of the message
+            att_num: Number of the attachment within the message
+            target_dir: Directory the attachment is saved to, as
+                "<message_id>_<att_num>_<dmFileDescr>"
+            open_sink: Called with the index and attributes of the attachment
+                to open the binary file it is written to, instead of saving to
+                target_dir; the file is closed once written
+
+        Returns:
+            The attachment metadata with file_path set to the saved content
+        """
+        extractor = self._attachment_extractor(
+            target_dir, open_sink, message_id, att_num
+        )
+        response = self._call_extracting(
+            "DownloadAttachment", extractor, dmID=message_id, attNum=att_num
+        )
+        return self._saved_attachment(response, extractor.paths)
+
+    @staticmethod
+    def _saved_attachment(
+        response: Dict[str, Any], paths: List[Optional[str]]
+    ) -> Dict[str, Any]:
+        """Reference the saved content in a DownloadAttachment response."""
+        if response.get("dmFile") is not None:
+            response["dmFile"]["dmEncodedContent"] = None
+            response["dmFile"]["file_path"] = paths[0] if paths else None
+        return response
+
+    def upload_attachments(
+        self,
+        files: List[DmFile],
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+    ) -> List[Dict[str, Any]]:
+        """Upload attachments of a high-volume message in parallel.
+
+        Attachments recorded in the journal as uploaded are not uploaded
+        again, so repeating a failed call only transfers the missing ones.
+
+        Args:
+            files: Files to upload
+            journal: Journal of finished uploads
+            max_workers: Maximum number of concurrent uploads
+            retries: Number of times a failed upload is repeated
+
+        Returns:
+            Upload results (attachment ID and hashes) in the order of files
+
+        Raises:
+            ISDSError: If any upload failed; the others are still finished
+                and recorded in the journal
+        """
+        results = run_batch(
+            partial(self._upload_journaled, journal=journal, retries=retries),
+            files,
+            max_workers=max_workers,
+            ordered=True,
+        )
+        return self._batch_results("upload", results)
+
+    def send_big_message(
+        self,
+        recipient_id: str,
+        subject: str,
+        files: List[DmFile],
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Upload attachments and send a high-volume message referencing them.
+
+        The first file is sent as the main document. If uploading or sending
+        fails, the call can be repeated with the same journal and only the
+        attachments not yet uploaded are transferred.
+
+        Args:
+            recipient_id: ID of the recipient's data box
+            subject: Subject of the message
+            files: Files to attach
+            journal: Journal of finished uploads
+            max_workers: Maximum number of concurrent uploads
+            retries: Number of times a failed upload is repeated
+            **kwargs: Additional message parameters
+
+        Returns:
+            Response containing the created message details
+        """
+        uploads = self.upload_attachments(
+            files, journal=journal, max_workers=max_workers, retries=retries
+        )
+        response = self.create_big_message(
+            recipient_id, subject, self._ext_files(uploads), **kwargs
+        )
+        self._forget_uploads(files, journal)
+        return response
+
+    def download_attachments_to(
+        self,
+        message_id: str,
+        att_nums: Iterable[int],
+        target_dir: Path,
+        journal: Optional[TransferJournal] = None,
+        max_workers: int = 4,
+        retries: int = 2,
+    ) -> List[Dict[str, Any]]:
+        """Download attachments of a high-volume message in parallel.
+
+        Each attachment is written to a ".part" file renamed once complete.
+        Attachments recorded in the journal whose files still exist are not
+        downloaded again.
+
+        Args:
+            message_id: ID of the message
+            att_nums: Numbers of the attachments to download
+            target_dir: Directory the attachments are saved to, as
+                "<message_id>_<att_num>_<dmFileDescr>"
+            journal: Journal of finished downloads
+            max_workers: Maximum number of concurrent downloads
+            retries: Number of times a failed download is repeated
+
+        Returns:
+            Attachment metadata with file_path set, in the order of att_nums
+
+        Raises:
+            ISDSError: If any download failed; the others are still finished
+                and recorded in the journal
+        """
+        results = run_batch(
+            partial(
+                self._download_journaled,
+                message_id,
+                target_dir=Path(target_dir),
+                journal=journal,
+                retries=retries,
+            ),
+            att_nums,
+            max_workers=max_workers,
+            ordered=True,
+        )
+        return self._batch_results("download", results)
+
+    def _upload_journaled(
+        self, file: DmFile, journal: Optional[TransferJournal], retries: int
+    ) -> Dict[str, Any]:
+        key = _upload_key(file)
+        if journal is not None and _uploaded(uploaded := journal.get(key)):
+            return uploaded
+        response = self._retry(
+            lambda: _check_upload(self.upload_attachment(file)), retries
+        )
+        if journal is not None:
+            journal.record(key, response)
+        return response
+
+    def _download_journaled(
+        self,
+        message_id: str,
+        att_num: int,
+        target_dir: Path,
+        journal: Optional[TransferJournal],
+        retries: int,
+    ) -> Dict[str, Any]:
+        key = f"download:{message_id}:{att_num}"
+        downloaded = journal.get(key) if journal is not None else None
+        path = _downloaded_path(downloaded)
+        if path is not None and os.path.exists(path):
+            return downloaded
+        response = self._retry(
+            lambda: _check_download(
+                self.download_attachment_to(
+                    message_id,
+                    att_num,
+                    open_sink=partial(
+                        _open_part_file, target_dir, message_id, att_num
+                    ),
+                )
+            ),
+            retries,
+        )
+        self._complete_part_file(response)
+        if journal is not None:
+            journal.record(key, response)
+        return response
+
+    def _retry(self, transfer: Callable[[], Any], retries: int) -> Any:
+        """Run a transfer, repeating it if it fails."""
+        for attempt in range(retries + 1):
+            try:
+                return transfer()
+            except ISDSError as e:
+                if attempt == retries:
+                    raise
+                self.logger.warning(
+                    f"Transfer failed, retrying ({attempt + 1}/{retries}): {e}"
+                )
+
+    @staticmethod
+    def _batch_results(action: str, results: List[BatchResult]) -> List[Any]:
+        failed = [result for result in results if not result.ok]
+        if failed:
+            raise ISDSError(
+                f"Failed to {action} {len(failed)} of {len(results)} attachments: "
+                f"{failed[0].error}"
+            )
+        return [result.result for result in results]
+
+    @staticmethod
+    def _ext_files(uploads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build attachment references of create_big_message from uploads."""
+        return [
+            {
+                "dmFileMetaType": "main" if index == 0 else "enclosure",
+                "dmAttID": upload["dmAttID"],
+                "dmAttHash1": upload["dmAttHash1"]["_value_1"],
+                "dmAttHash1Alg": upload["dmAttHash1"]["AttHashAlg"],
+                "dmAttHash2": upload["dmAttHash2"]["_value_1"],
+                "dmAttHash2Alg": upload["dmAttHash2"]["AttHashAlg"],
+            }
+            for index, upload in enumerate(uploads)
+        ]
+
+    @staticmethod
+    def _complete_part_file(response: Dict[str, Any]) -> None:
+        """Rename the downloaded ".part" file to its final name."""
+        file = response.get("dmFile")
+        if file is not None and file.get("file_path"):
+            path = file["file_path"].removesuffix(PART_SUFFIX)
+            os.replace(file["file_path"], path)
+            file["file_path"] = path
+
+    @staticmethod
+    def _forget_uploads(
+        files: List[DmFile], journal: Optional[TransferJournal]
+    ) -> None:
+        # Uploaded attachments are used by the sent message and cannot be
+        # referenced again
+        if journal is not None:
+            for file in files:
+                journal.discard(_upload_key(file))
+
+    def create_big_message(
+        self,
+        recipient_id: str,
+        subject: str,
+        attachments: List[Dict[str, Any]],
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Create and send a high-volume message.
+
+        Args:
+            recipient_id: ID of the recipient's data box
+            subject: Subject of the message
+            attachments: References to uploaded attachments (dmExtFile items)
+            **kwargs: Additional message parameters
+
+        Returns:
+            Response containing the created message details
+        """
+        params = {
+            "dmEnvelope": {
+                "dbIDRecipient": recipient_id,
+                "dmAnnotation": subject,
+            },
+            "dmFiles": {"dmExtFile": attachments},
+            **kwargs,
+        }
+        return self._call("CreateBigMessage", **params)
+
+    def download_big_message(self, message_id: str) -> Dict[str, Any]:
+        """Download a received high-volume message.
+
+        Args:
+            message_id: ID of the message to download
+
+        Returns:
+            The complete message content
+        """
+        return self._call("BigMessageDownload", dmID=message_id)
+
+    def download_big_message_to(
+        self,
+        message_id: str,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> DownloadMessageResponse:
+        """Download a received high-volume message, streaming its attachments.
+
+        Args:
+            message_id: ID of the message to download
+            target_dir: Directory the attachments are saved to, as
+                "<message_id>_<index>_<dmFileDescr>"
+            open_sink: Called with the index and attributes of an attachment
+                to open the binary file it is written to, instead of saving to
+                target_dir; the file is closed once written
+
+        Returns:
+            The message with paths of the saved attachments
+        """
+        extractor = self._attachment_extractor(target_dir, open_sink, message_id)
+        response = self._call_extracting(
+            "BigMessageDownload", extractor, dmID=message_id
+        )
+        return self._saved_message(response, extractor.paths)
+
+    def download_signed_big_message(self, message_id: str) -> Dict[str, Any]:
+        """Download a signed received high-volume message.
+
+        Args:
+            message_id: ID of the message to download
+
+        Returns:
+            The complete signed message content
+        """
+        return self._call("SignedBigMessageDownload", dmID=message_id)
+
+    def download_signed_sent_big_message(self, message_id: str) -> Dict[str, Any]:
+        """Download a signed sent high-volume message.
+
+        Args:
+            message_id: ID of the message to download
+
+        Returns:
+            The complete signed message content
+        """
+        return self._call("SignedSentBigMessageDownload", dmID=message_id)
+
+    def authenticate_big_message(self, message: bytes) -> Dict[str, Any]:
+        """Verify the authenticity of a signed high-volume message.
+
+        Args:
+            message: Signed message content
+
+        Returns:
+            Authentication result
+        """
+        return self._call("AuthenticateBigMessage", dmMessage=message)
+
+
+def _upload_key(file: DmFile) -> str:
+    # A modified file is uploaded again
+    stat = os.stat(file.file_path)
+    path = os.path.abspath(file.file_path)
+    return f"upload:{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _uploaded(response: Optional[Dict[str, Any]]) -> bool:
+    """Check whether an UploadAttachment response reports a stored attachment."""
+    return (
+        response is not None
+        and _status_code(response) == "0000"
+        and response.get("dmAttID") is not None
+    )
+
+
+def _downloaded_path(response: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Get the file saved by a successful DownloadAttachment, None if there is none."""
+    if response is None or _status_code(response) != "0000":
+        return None
+    return (response.get("dmFile") or {}).get("file_path")
+
+
+def _check_upload(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise ISDSError unless an UploadAttachment response reports success."""
+    if not _uploaded(response):
+        raise _transfer_error("UploadAttachment", response)
+    return response
+
+
+def _check_download(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise ISDSError unless a DownloadAttachment response saved the file."""
+    if _downloaded_path(response) is None:
+        raise _transfer_error("DownloadAttachment", response)
+    return response
+
+
+def _status_code(response: Dict[str, Any]) -> Optional[str]:
+    return (response.get("dmStatus") or {}).get("dmStatusCode")
+
+
+def _transfer_error(operation_name: str, response: Dict[str, Any]) -> ISDSError:
+    status = response.get("dmStatus") or {}
+    if status.get("dmStatusCode") == "0000":
+        return ISDSError(f"{operation_name} returned no attachment")
+    return ISDSError(
+        f"{operation_name} failed: {status.get('dmStatusCode')} "
+        f"{status.get('dmStatusMessage')}"
+    )
+
+
+def _open_part_file(
+    target_dir: Path,
+    message_id: str,
+    att_num: int,
+    index: int,
+    attributes: Dict[str, str],
+) -> BinaryIO:
+    return _open_attachment_file(
+        target_dir, message_id, att_num, index, attributes, PART_SUFFIX
+    )
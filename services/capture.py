@@ -0,0 +1,191 @@
+import contextvars
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Deque, Dict, FrozenSet, List, Optional
+
+from zeep import Plugin
+from zeep.wsdl.utils import etree_to_string
+
+# Whether the call made in the current thread or task is captured
+_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "isds_capture_sampled", default=False
+)
+
+
+@dataclass(frozen=True)
+class CaptureConfig:
+    """Settings of the capture of SOAP requests and responses.
+
+    Attributes:
+        max_entries: Number of most recent requests and responses kept in
+            memory; none are kept if 0
+        max_body_bytes: Size in bytes after which a captured envelope is cut
+        max_text_length: Length after which the text of an element, e.g. an
+            attachment's base64 content, is cut
+        redacted_elements: Local names of elements whose text is replaced
+        redacted_headers: Lower-cased names of HTTP headers whose value is
+            replaced
+        sample_rate: Fraction of calls that are captured
+        file_path: File the captured messages are appended to as JSON lines
+        file_max_bytes: Size in bytes at which the file is rotated
+        file_backup_count: Number of rotated files kept
+    """
+
+    max_entries: int = 20
+    max_body_bytes: int = 64 * 1024
+    max_text_length: int = 256
+    redacted_elements: FrozenSet[str] = frozenset({"dbOldPassword", "dbNewPassword"})
+    redacted_headers: FrozenSet[str] = frozenset(
+        {"authorization", "cookie", "set-cookie", "proxy-authorization"}
+    )
+    sample_rate: float = 1.0
+    file_path: Optional[Path] = None
+    file_max_bytes: int = 10 * 1024 * 1024
+    file_backup_count: int = 5
+
+
+@dataclass
+class CapturedMessage:
+    """A captured SOAP request or response.
+
+    Attributes:
+        time: Time of the capture (seconds since epoch)
+        direction: "request" or "response"
+        operation: Name of the operation
+        headers: HTTP headers, redacted
+        body: Envelope, redacted and truncated
+        truncated: True if the envelope was cut at max_body_bytes
+    """
+
+    time: float
+    direction: str
+    operation: str
+    headers: Dict[str, str]
+    body: str
+    truncated: bool
+
+
+class Capture(Plugin):
+    """Bounded, redacted capture of SOAP requests and responses.
+
+    A zeep plugin shared by the services of a client. Captured messages are
+    kept in a bounded in-memory buffer, appended to a rotating file and
+    logged at DEBUG level to the "services.capture" logger. Services only
+    install the plugin when capture is configured, so it costs nothing when
+    disabled.
+    """
+
+    def __init__(self, config: Optional[CaptureConfig] = None):
+        """Initialize the capture.
+
+        Args:
+            config: Capture settings
+        """
+        self.config = config or CaptureConfig()
+        self.logger = logging.getLogger(__name__)
+        self._entries: Deque[CapturedMessage] = deque(maxlen=self.config.max_entries)
+        self._lock = threading.Lock()
+        self._text_pattern = re.compile(
+            rb">([^<]{%d})[^<]{4,}<" % self.config.max_text_length
+        )
+        self._redact_pattern = None
+        if self.config.redacted_elements:
+            names = "|".join(map(re.escape, sorted(self.config.redacted_elements)))
+            self._redact_pattern = re.compile(
+                rb"(<(?:[\w.-]+:)?(?:%s)(?:\s[^>]*)?>)[^<]*" % names.encode()
+            )
+        self._file_handler: Optional[RotatingFileHandler] = None
+        if self.config.file_path is not None:
+            Path(self.config.file_path).parent.mkdir(parents=True, exist_ok=True)
+            self._file_handler = RotatingFileHandler(
+                self.config.file_path,
+                maxBytes=self.config.file_max_bytes,
+                backupCount=self.config.file_backup_count,
+                encoding="utf-8",
+            )
+
+    @property
+    def entries(self) -> List[CapturedMessage]:
+        """Captured messages kept in memory, oldest first."""
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def last_sent(self) -> Optional[CapturedMessage]:
+        """Most recent captured request."""
+        return self._last("request")
+
+    @property
+    def last_received(self) -> Optional[CapturedMessage]:
+        """Most recent captured response."""
+        return self._last("response")
+
+    def clear(self) -> None:
+        """Drop the captured messages kept in memory."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """Close the capture file."""
+        if self._file_handler is not None:
+            self._file_handler.close()
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+        sampled = random.random() < self.config.sample_rate
+        _sampled.set(sampled)
+        if sampled:
+            self._capture("request", operation, envelope, http_headers)
+        return envelope, http_headers
+
+    def ingress(self, envelope, http_headers, operation):
+        if _sampled.get():
+            self._capture("response", operation, envelope, http_headers)
+        return envelope, http_headers
+
+    def _last(self, direction: str) -> Optional[CapturedMessage]:
+        with self._lock:
+            for entry in reversed(self._entries):
+                if entry.direction == direction:
+                    return entry
+        return None
+
+    def _capture(self, direction: str, operation, envelope, http_headers) -> None:
+        body = etree_to_string(envelope)
+        # Texts are cut first, so attachments do not use up max_body_bytes
+        body = self._text_pattern.sub(rb">\1...<", body)
+        if self._redact_pattern is not None:
+            body = self._redact_pattern.sub(rb"\1***", body)
+        truncated = len(body) > self.config.max_body_bytes
+        entry = CapturedMessage(
+            time=time.time(),
+            direction=direction,
+            operation=getattr(operation, "name", str(operation)),
+            headers=self._redact_headers(http_headers),
+            body=body[: self.config.max_body_bytes].decode("utf-8", "replace"),
+            truncated=truncated,
+        )
+        if self.config.max_entries:
+            with self._lock:
+                self._entries.append(entry)
+        if self._file_handler is not None:
+            self._file_handler.handle(
+                logging.makeLogRecord({"msg": json.dumps(entry.__dict__)})
+            )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"{entry.direction.capitalize()} {entry.operation}: {entry.body}"
+            )
+
+    def _redact_headers(self, http_headers: Any) -> Dict[str, str]:
+        return {
+            name: "***" if name.lower() in self.config.redacted_headers else str(value)
+            for name, value in (http_headers or {}).items()
+        }
@@ -13,6 +13,7 @@ class DataBoxAccessService(BaseService):
         base_url: str,
         wsdl_dir: Path,
         debug: bool = False,
+        **kwargs,
     ):
         """Initialize the data box access service.
 
@@ -22,6 +23,7 @@ class DataBoxAccessService(BaseService):
             base_url: Base URL of the ISDS service
             wsdl_dir: Directory containing WSDL files
             debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
         """
         super().__init__(
             username=username,
@@ -31,6 +33,7 @@ class DataBoxAccessService(BaseService):
             wsdl_filename="db_access.wsdl",
             endpoint="DsManage",
             debug=debug,
+            **kwargs,
         )
 
     def get_owner_info2(self, login: str = "") -> Dict[str, Any]:
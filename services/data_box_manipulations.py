@@ -0,0 +1,245 @@
+from pathlib import Path
+from typing import Dict, Any
+from datetime import date
+
+from .base import BaseService
+
+
+class DataBoxManipulationsService(BaseService):
+    """Service for data box manipulation operations (db_manipulations.wsdl)."""
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str,
+        wsdl_dir: Path,
+        debug: bool = False,
+        **kwargs,
+    ):
+        """Initialize the data box manipulations service.
+
+        Args:
+            username: Login username
+            password: Password
+            base_url: Base URL of the ISDS service
+            wsdl_dir: Directory containing WSDL files
+            debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
+        """
+        super().__init__(
+            username=username,
+            password=password,
+            base_url=base_url,
+            wsdl_dir=wsdl_dir,
+            wsdl_filename="db_manipulations.wsdl",
+            endpoint="DsManage",
+            debug=debug,
+            **kwargs,
+        )
+
+    def create_data_box2(self, **kwargs) -> Dict[str, Any]:
+        """Create a new data box.
+
+        Args:
+            **kwargs: Data box parameters (e.g., dbOwnerInfo, dbPrimaryUsers, etc.)
+
+        Returns:
+            ID of the created data box
+        """
+        return self._call("CreateDataBox2", **kwargs)
+
+    def delete_data_box2(
+        self, data_box_id: str, termination_date: date, **kwargs
+    ) -> Dict[str, Any]:
+        """Delete a data box.
+
+        Args:
+            data_box_id: ID of the data box
+            termination_date: Date of the owner's termination
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "DeleteDataBox2",
+            dbID=data_box_id,
+            dbOwnerTerminationDate=termination_date,
+            **kwargs,
+        )
+
+    def update_data_box_descr2(
+        self, data_box_id: str, owner_info: Dict[str, Any], **kwargs
+    ) -> Dict[str, Any]:
+        """Update the description of a data box owner.
+
+        Args:
+            data_box_id: ID of the data box
+            owner_info: New owner information
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "UpdateDataBoxDescr2", dbID=data_box_id, dbNewOwnerInfo=owner_info, **kwargs
+        )
+
+    def get_data_box_users2(self, data_box_id: str, **kwargs) -> Dict[str, Any]:
+        """Get the list of users of a data box.
+
+        Args:
+            data_box_id: ID of the data box
+            **kwargs: Additional parameters
+
+        Returns:
+            List of data box users
+        """
+        return self._call("GetDataBoxUsers2", dbID=data_box_id, **kwargs)
+
+    def add_data_box_user2(
+        self, data_box_id: str, user_info: Dict[str, Any], **kwargs
+    ) -> Dict[str, Any]:
+        """Add a user to a data box.
+
+        Args:
+            data_box_id: ID of the data box
+            user_info: Information about the new user
+            **kwargs: Additional parameters
+
+        Returns:
+            Login and password of the new user
+        """
+        return self._call(
+            "AddDataBoxUser2", dbID=data_box_id, dbUserInfo=user_info, **kwargs
+        )
+
+    def update_data_box_user2(
+        self, data_box_id: str, isds_id: str, user_info: Dict[str, Any], **kwargs
+    ) -> Dict[str, Any]:
+        """Update a user of a data box.
+
+        Args:
+            data_box_id: ID of the data box
+            isds_id: ISDS ID of the user
+            user_info: New information about the user
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "UpdateDataBoxUser2",
+            dbID=data_box_id,
+            isdsID=isds_id,
+            dbNewUserInfo=user_info,
+            **kwargs,
+        )
+
+    def delete_data_box_user2(
+        self, data_box_id: str, isds_id: str, **kwargs
+    ) -> Dict[str, Any]:
+        """Remove a user from a data box.
+
+        Args:
+            data_box_id: ID of the data box
+            isds_id: ISDS ID of the user
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "DeleteDataBoxUser2", dbID=data_box_id, isdsID=isds_id, **kwargs
+        )
+
+    def new_access_data2(
+        self, data_box_id: str, isds_id: str, fee_paid: bool, **kwargs
+    ) -> Dict[str, Any]:
+        """Generate new access data for a data box user.
+
+        Args:
+            data_box_id: ID of the data box
+            isds_id: ISDS ID of the user
+            fee_paid: Whether the fee for sending the access data was paid
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "NewAccessData2",
+            dbID=data_box_id,
+            isdsID=isds_id,
+            dbFeePaid=fee_paid,
+            **kwargs,
+        )
+
+    def disable_data_box_externally2(
+        self, data_box_id: str, disable_date: date, **kwargs
+    ) -> Dict[str, Any]:
+        """Disable a data box on an external request.
+
+        Args:
+            data_box_id: ID of the data box
+            disable_date: Date the data box is disabled from
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call(
+            "DisableDataBoxExternally2",
+            dbID=data_box_id,
+            dbOwnerDisableDate=disable_date,
+            **kwargs,
+        )
+
+    def disable_own_data_box2(self, data_box_id: str, **kwargs) -> Dict[str, Any]:
+        """Disable a data box on the owner's request.
+
+        Args:
+            data_box_id: ID of the data box
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call("DisableOwnDataBox2", dbID=data_box_id, **kwargs)
+
+    def enable_own_data_box2(self, data_box_id: str, **kwargs) -> Dict[str, Any]:
+        """Enable a data box on the owner's request.
+
+        Args:
+            data_box_id: ID of the data box
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call("EnableOwnDataBox2", dbID=data_box_id, **kwargs)
+
+    def set_open_addressing(self, data_box_id: str, **kwargs) -> Dict[str, Any]:
+        """Allow the data box to send commercial messages to anyone.
+
+        Args:
+            data_box_id: ID of the data box
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call("SetOpenAddressing", dbID=data_box_id, **kwargs)
+
+    def clear_open_addressing(self, data_box_id: str, **kwargs) -> Dict[str, Any]:
+        """Disable open addressing of commercial messages for the data box.
+
+        Args:
+            data_box_id: ID of the data box
+            **kwargs: Additional parameters
+
+        Returns:
+            Operation result
+        """
+        return self._call("ClearOpenAddressing", dbID=data_box_id, **kwargs)
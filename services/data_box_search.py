@@ -1,11 +1,16 @@
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base import BaseService
 
 
 class DataBoxSearchService(BaseService):
     """Service for data box search operations (db_search.wsdl)."""
 
+    collapsed_operations = frozenset(
+        {"CheckDataBox", "GetDataBoxActivityStatus", "FindDataBox2", "ISDSSearch3"}
+    )
+
     def __init__(
         self,
         username: str,
@@ -13,6 +18,7 @@ class DataBoxSearchService(BaseService):
         base_url: str,
         wsdl_dir: Path,
         debug: bool = False,
+        **kwargs,
     ):
         """Initialize the data box search service.
 
@@ -22,6 +28,7 @@ class DataBoxSearchService(BaseService):
             base_url: Base URL of the ISDS service
             wsdl_dir: Directory containing WSDL files
             debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
         """
         super().__init__(
             username=username,
@@ -31,6 +38,7 @@ class DataBoxSearchService(BaseService):
             wsdl_filename="db_search.wsdl",
             endpoint="df",
             debug=debug,
+            **kwargs,
         )
 
     def find_data_box2(self, **kwargs) -> Any:
@@ -78,13 +86,38 @@ class DataBoxSearchService(BaseService):
         """
         return self._call("DataBoxCreditInfo", dbID=data_box_id)
 
-    def get_activity_status(self, data_box_id: str) -> Dict[str, Any]:
+    def get_activity_status(
+        self,
+        data_box_id: str,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
         """Get activity status of a data box.
 
         Args:
             data_box_id: ID of the data box
+            from_time: Start of the period; the current minute if not set
+            to_time: End of the period; the current minute if not set
 
         Returns:
             Activity status information
         """
-        return self._call("GetDataBoxActivityStatus", dbID=data_box_id)
+        # Whole minutes, so repeated lookups of the current status are cached
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        return self._call(
+            "GetDataBoxActivityStatus",
+            dbID=data_box_id,
+            baFrom=from_time or now,
+            baTo=to_time or now,
+        )
+
+    def invalidate_data_box(self, data_box_id: str) -> None:
+        """Drop the cached status and activity status of a data box.
+
+        Args:
+            data_box_id: ID of the data box
+        """
+        if self.response_cache is None:
+            return
+        for operation_name in ("CheckDataBox", "GetDataBoxActivityStatus"):
+            self.response_cache.invalidate(operation_name, dbID=data_box_id)
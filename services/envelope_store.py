@@ -0,0 +1,343 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import batched
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .lazy_response import materialize
+from .message_info import MessageInfoService
+
+RECEIVED = "received"
+SENT = "sent"
+
+# Columns copied from the message records, all of them indexed for queries
+# except the times and the attachment size
+_COLUMNS = (
+    "dbIDSender",
+    "dmSender",
+    "dbIDRecipient",
+    "dmRecipient",
+    "dmAnnotation",
+    "dmSenderRefNumber",
+    "dmRecipientRefNumber",
+    "dmMessageStatus",
+    "dmDeliveryTime",
+    "dmAcceptanceTime",
+    "dmAttachmentSize",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS envelopes (
+    box_id TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    dmID TEXT NOT NULL,
+    dbIDSender TEXT,
+    dmSender TEXT,
+    dbIDRecipient TEXT,
+    dmRecipient TEXT,
+    dmAnnotation TEXT,
+    dmSenderRefNumber TEXT,
+    dmRecipientRefNumber TEXT,
+    dmMessageStatus INTEGER,
+    dmDeliveryTime TEXT,
+    dmAcceptanceTime TEXT,
+    dmAttachmentSize INTEGER,
+    record TEXT NOT NULL,
+    PRIMARY KEY (box_id, direction, dmID)
+);
+CREATE INDEX IF NOT EXISTS envelopes_sender
+    ON envelopes (box_id, dbIDSender, dmDeliveryTime);
+CREATE INDEX IF NOT EXISTS envelopes_recipient
+    ON envelopes (box_id, dbIDRecipient, dmDeliveryTime);
+CREATE INDEX IF NOT EXISTS envelopes_delivery_time
+    ON envelopes (box_id, dmDeliveryTime);
+CREATE INDEX IF NOT EXISTS envelopes_status
+    ON envelopes (box_id, dmMessageStatus, dmDeliveryTime);
+CREATE INDEX IF NOT EXISTS envelopes_sender_ref
+    ON envelopes (box_id, dmSenderRefNumber);
+CREATE INDEX IF NOT EXISTS envelopes_recipient_ref
+    ON envelopes (box_id, dmRecipientRefNumber);
+CREATE TABLE IF NOT EXISTS sync_state (
+    box_id TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL
+);
+"""
+
+
+class EnvelopeStore:
+    """Local SQLite mirror of message envelopes and their status.
+
+    The store is filled per data box by sync, which lists the messages
+    delivered since the last sync and applies the state changes reported by
+    ISDS in the meantime. The time of the last sync (the watermark) is
+    persisted, so each sync only fetches what changed. List and search
+    queries can then be answered locally with query.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = ":memory:",
+        overlap: timedelta = timedelta(minutes=5),
+    ):
+        """Open the store, creating the database if needed.
+
+        Args:
+            path: Path of the SQLite database
+            overlap: Time by which each sync reaches back before the
+                watermark, covering clock differences and late records
+        """
+        self.path = path
+        self.overlap = overlap
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self) -> "EnvelopeStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_watermark(self, box_id: str) -> Optional[datetime]:
+        """Get the time up to which a data box was synchronized."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT watermark FROM sync_state WHERE box_id = ?", (box_id,)
+            ).fetchone()
+        return datetime.fromisoformat(row["watermark"]) if row else None
+
+    def sync(
+        self,
+        service: MessageInfoService,
+        box_id: str,
+        initial_from: Optional[datetime] = None,
+        page_size: int = 1000,
+    ) -> int:
+        """Synchronize the envelopes of a data box with ISDS.
+
+        Args:
+            service: Message info service of the data box
+            box_id: ID of the data box
+            initial_from: Start of the first synchronization; ISDS decides
+                how far back messages are listed if not set
+            page_size: Number of records fetched per list request
+
+        Returns:
+            Number of stored or updated envelopes
+
+        Raises:
+            ISDSError: If a request fails; the watermark is then kept, so the
+                next sync fetches the missed records
+        """
+        now = datetime.now(timezone.utc)
+        watermark = self.get_watermark(box_id)
+        since = watermark - self.overlap if watermark else initial_from
+
+        count = 0
+        for direction, records in (
+            (RECEIVED, service.iter_received_messages),
+            (SENT, service.iter_sent_messages),
+        ):
+            # Store page by page, so a large first sync is not held in memory
+            for page in batched(
+                records(from_time=since, to_time=now, page_size=page_size), page_size
+            ):
+                count += self.store_records(box_id, direction, page)
+        if watermark is not None:
+            changes = service.get_state_change_records(since, now)
+            count += self.apply_state_changes(box_id, changes)
+        # Reached only if all pages were fetched; after an error the next
+        # sync starts from the old watermark again
+        self._set_watermark(box_id, now)
+        return count
+
+    async def sync_async(
+        self,
+        service: MessageInfoService,
+        box_id: str,
+        initial_from: Optional[datetime] = None,
+        page_size: int = 1000,
+    ) -> int:
+        """Synchronize the envelopes of a data box using an asynchronous service.
+
+        Args:
+            service: Asynchronous message info service of the data box
+            box_id: ID of the data box
+            initial_from: Start of the first synchronization
+            page_size: Number of records fetched per list request
+
+        Returns:
+            Number of stored or updated envelopes
+        """
+        now = datetime.now(timezone.utc)
+        watermark = self.get_watermark(box_id)
+        since = watermark - self.overlap if watermark else initial_from
+
+        count = 0
+        for direction, records in (
+            (RECEIVED, service.iter_received_messages),
+            (SENT, service.iter_sent_messages),
+        ):
+            page = []
+            async for record in records(
+                from_time=since, to_time=now, page_size=page_size
+            ):
+                page.append(record)
+                if len(page) == page_size:
+                    count += self.store_records(box_id, direction, page)
+                    page = []
+            count += self.store_records(box_id, direction, page)
+        if watermark is not None:
+            changes = await service.get_state_change_records(since, now)
+            count += self.apply_state_changes(box_id, changes)
+        self._set_watermark(box_id, now)
+        return count
+
+    def store_records(
+        self, box_id: str, direction: str, records: Iterable[Dict[str, Any]]
+    ) -> int:
+        """Insert or update message records from a message list.
+
+        Args:
+            box_id: ID of the data box
+            direction: RECEIVED or SENT
+            records: Message records (dmRecord items of a message list)
+
+        Returns:
+            Number of stored records
+        """
+        sql = (
+            "INSERT OR REPLACE INTO envelopes "
+            f"(box_id, direction, dmID, {', '.join(_COLUMNS)}, record) "
+            f"VALUES ({', '.join('?' * (len(_COLUMNS) + 4))})"
+        )
+        rows = [
+            (
+                box_id,
+                direction,
+                record["dmID"],
+                *(_to_column(record.get(column)) for column in _COLUMNS),
+                json.dumps(materialize(record), default=_to_column),
+            )
+            for record in records
+        ]
+        with self._lock, self._db:
+            return self._db.executemany(sql, rows).rowcount
+
+    def apply_state_changes(
+        self, box_id: str, changes: Iterable[Dict[str, Any]]
+    ) -> int:
+        """Update the status of stored messages from state change records.
+
+        Args:
+            box_id: ID of the data box
+            changes: State change records (dmID, dmEventTime, dmMessageStatus)
+
+        Returns:
+            Number of updated envelopes
+        """
+        rows = [
+            (change["dmMessageStatus"], box_id, change["dmID"])
+            for change in sorted(changes, key=lambda change: change["dmEventTime"])
+        ]
+        with self._lock, self._db:
+            return self._db.executemany(
+                "UPDATE envelopes SET dmMessageStatus = ? "
+                "WHERE box_id = ? AND dmID = ?",
+                rows,
+            ).rowcount
+
+    def query(
+        self,
+        box_id: str,
+        direction: Optional[str] = None,
+        sender_id: Optional[str] = None,
+        recipient_id: Optional[str] = None,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        status: Optional[int] = None,
+        ref_number: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Query stored envelopes, newest delivered first.
+
+        Args:
+            box_id: ID of the data box
+            direction: RECEIVED or SENT; both if not set
+            sender_id: Data box ID of the sender
+            recipient_id: Data box ID of the recipient
+            from_time: Earliest delivery time
+            to_time: Latest delivery time
+            status: Message status (dmMessageStatus)
+            ref_number: Sender's or recipient's reference number
+            limit: Maximum number of envelopes returned
+
+        Times without a timezone are taken as UTC.
+
+        Returns:
+            Message records as listed by ISDS, with the current status and
+            times as ISO strings in UTC
+        """
+        conditions = ["box_id = ?"]
+        params: List[Any] = [box_id]
+        for column, value in (
+            ("direction", direction),
+            ("dbIDSender", sender_id),
+            ("dbIDRecipient", recipient_id),
+            ("dmMessageStatus", status),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if from_time is not None:
+            conditions.append("dmDeliveryTime >= ?")
+            params.append(_to_column(from_time))
+        if to_time is not None:
+            conditions.append("dmDeliveryTime <= ?")
+            params.append(_to_column(to_time))
+        if ref_number is not None:
+            conditions.append("(dmSenderRefNumber = ? OR dmRecipientRefNumber = ?)")
+            params += [ref_number, ref_number]
+        sql = (
+            "SELECT dmMessageStatus, record FROM envelopes "
+            f"WHERE {' AND '.join(conditions)} ORDER BY dmDeliveryTime DESC"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        records = []
+        for row in rows:
+            record = json.loads(row["record"])
+            record["dmMessageStatus"] = row["dmMessageStatus"]
+            records.append(record)
+        return records
+
+    def _set_watermark(self, box_id: str, watermark: datetime) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (box_id, watermark) VALUES (?, ?)",
+                (box_id, watermark.isoformat()),
+            )
+
+
+def _to_column(value: Any) -> Any:
+    """Convert a record value to a column value.
+
+    Times are stored as ISO strings in UTC, so they sort chronologically.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.isoformat()
+    return value
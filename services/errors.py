@@ -0,0 +1,10 @@
+class ISDSError(Exception):
+    """Base exception for ISDS client errors."""
+
+    pass
+
+
+class CircuitOpenError(ISDSError):
+    """Raised without calling ISDS while an endpoint's circuit is open."""
+
+    pass
@@ -0,0 +1,668 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from lxml import etree
+from zeep.helpers import serialize_object
+from zeep.utils import get_media_type
+from zeep.wsdl.bindings.soap import Soap11Binding
+from zeep.wsdl.utils import etree_to_string
+from zeep.xsd import Nil, SkipValue
+from zeep.xsd.const import NotSet, xsi_ns
+from zeep.xsd.elements import Choice, Element, Group, Sequence
+from zeep.xsd.types import AnySimpleType, ComplexType
+from zeep.xsd.types.builtins import Base64Binary
+
+from schemas.encoded_content import EncodedContent
+
+# Operations encoded and decoded by the fast codec by default
+FAST_OPERATIONS: FrozenSet[str] = frozenset(
+    {
+        "CheckDataBox",
+        "GetListOfReceivedMessages",
+        "MarkMessageAsDownloaded",
+        "MessageDownload",
+        "MessageEnvelopeDownload",
+    }
+)
+
+# Returned by OperationCodec.encode and decode for input they leave to zeep
+FALLBACK = object()
+
+_XSI_NIL = ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"'
+_XSI_TYPE = xsi_ns("type")
+_XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+# Characters lxml refuses in text
+_INVALID_TEXT = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff\ud800-\udfff]")
+
+Decoder = Callable[[Any, bool], Any]
+
+
+class _Fallback(Exception):
+    """Raised by compiled decoders on input not handled exactly like zeep."""
+
+
+class _Decoders(dict):
+    """Decoders compiled for a response, by id of their XSD type."""
+
+    def __init__(self, lazy_content: bool):
+        super().__init__()
+        self.lazy_content = lazy_content
+
+
+class OperationCodec:
+    """Precompiled request template and response decoder of an operation.
+
+    Requests are rendered by filling in a template of the envelope and
+    responses are decoded straight from the parsed XML into the dicts
+    serialize_object would return for zeep's result. Input not handled
+    exactly like zeep (e.g., SOAP faults, MTOM responses, missing
+    required arguments or unexpected elements) is left to zeep.
+    """
+
+    def __init__(
+        self, binding: Soap11Binding, operation_name: str, lazy_content: bool = False
+    ):
+        """Compile the codec of an operation.
+
+        Args:
+            binding: SOAP binding of the service
+            operation_name: Name of the operation
+            lazy_content: If True, base64Binary values are decoded as
+                EncodedContent, which is only decoded on access
+
+        Raises:
+            TypeError: If the operation's messages cannot be compiled
+        """
+        operation = binding.get(operation_name)
+        self.operation_name = operation_name
+        self.headers = {
+            "SOAPAction": '"%s"' % operation.soapaction,
+            "Content-Type": "text/xml; charset=utf-8",
+        }
+        self.enabled = True
+        self._body_tag = f"{{{binding.nsmap['soap-env']}}}Body"
+        self._fault_tag = f"{{{binding.nsmap['soap-env']}}}Fault"
+        self._compile_request(binding.nsmap["soap-env"], operation.input.body)
+        self._compile_response(operation.output.body, lazy_content)
+        self._parsers = threading.local()
+
+    def encode(self, kwargs: Mapping[str, Any]) -> Any:
+        """Render the request envelope of a call.
+
+        Returns:
+            The envelope, or FALLBACK if zeep must render it
+        """
+        if not kwargs.keys() <= self._field_names:
+            return FALLBACK
+        parts = [self._prefix]
+        for name, start, end, nil, optional, nillable, xmlvalue in self._fields:
+            value = kwargs.get(name)
+            if value is None or value is NotSet:
+                if optional:
+                    continue
+                if not nillable:
+                    return FALLBACK
+                parts.append(nil)
+                continue
+            if value is Nil:
+                parts.append(nil)
+                continue
+            if value is SkipValue or hasattr(value, "_xsd_type"):
+                return FALLBACK
+            try:
+                text = xmlvalue(value)
+            except (TypeError, ValueError):
+                return FALLBACK
+            if text is None:
+                parts.append(start[:-1] + "/>")
+                continue
+            text = str(text)
+            if _INVALID_TEXT.search(text):
+                return FALLBACK
+            parts.append(start)
+            parts.append(_escape(text))
+            parts.append(end)
+        if len(parts) == 1:
+            return self._empty
+        parts.append(self._suffix)
+        return _XML_DECLARATION + "".join(parts).encode("utf-8")
+
+    def decode(self, response: Any, huge_tree: bool = False) -> Any:
+        """Decode a response into dicts.
+
+        Args:
+            response: HTTP response of the call
+            huge_tree: Allow very large and deep documents (zeep's
+                xml_huge_tree setting)
+
+        Returns:
+            The serialized response, or FALLBACK if zeep must process it
+        """
+        if response.status_code != 200:
+            return FALLBACK
+        content_type = response.headers.get("Content-Type", "text/xml")
+        if get_media_type(content_type) == "multipart/related":
+            return FALLBACK
+        try:
+            document = etree.fromstring(response.content, self._parser(huge_tree))
+        except etree.XMLSyntaxError:
+            return FALLBACK
+        if document.getroottree().docinfo.doctype:
+            return FALLBACK
+        body = document.find(self._body_tag)
+        if body is None or len(body) == 0 or body.find(self._fault_tag) is not None:
+            return FALLBACK
+        try:
+            result = self._decode_body(body[0], False)
+        except _Fallback:
+            return FALLBACK
+        return self._unwrap(result)
+
+    def _parser(self, huge_tree: bool) -> etree.XMLParser:
+        # Parsers are not shared between threads
+        parsers = self._parsers.__dict__
+        parser = parsers.get(huge_tree)
+        if parser is None:
+            parser = parsers[huge_tree] = etree.XMLParser(
+                remove_comments=True, resolve_entities=False, huge_tree=huge_tree
+            )
+        return parser
+
+    def _compile_request(self, envelope_ns: str, body: Element) -> None:
+        xsd_type = body.type
+        if not isinstance(xsd_type, ComplexType) or xsd_type.attributes:
+            raise TypeError(f"Unsupported input of {self.operation_name}")
+        namespace = body.qname.namespace
+        self._fields: List[Tuple] = []
+        for name, element in _flatten(xsd_type.elements_nested):
+            if (
+                not isinstance(element.type, AnySimpleType)
+                or element.max_occurs != 1
+                or element.qname.namespace != namespace
+            ):
+                raise TypeError(f"Unsupported input element {name}")
+            tag = f"ns0:{element.qname.localname}"
+            self._fields.append(
+                (
+                    name,
+                    f"<{tag}>",
+                    f"</{tag}>",
+                    f"<{tag}{_XSI_NIL}/>",
+                    element.is_optional,
+                    element.nillable,
+                    element.type.xmlvalue,
+                )
+            )
+        self._field_names = frozenset(field[0] for field in self._fields)
+        operation_tag = f"ns0:{body.qname.localname}"
+        envelope = (
+            f'<soap-env:Envelope xmlns:soap-env="{envelope_ns}"><soap-env:Body>'
+        )
+        self._prefix = f'{envelope}<{operation_tag} xmlns:ns0="{namespace}">'
+        self._suffix = f"</{operation_tag}></soap-env:Body></soap-env:Envelope>"
+        self._empty = _XML_DECLARATION + (
+            f'{envelope}<{operation_tag} xmlns:ns0="{namespace}"/>'
+            "</soap-env:Body></soap-env:Envelope>"
+        ).encode("utf-8")
+
+    def _compile_response(self, body: Element, lazy_content: bool) -> None:
+        xsd_type = body.type
+        self._decode_body = _type_decoder(xsd_type, _Decoders(lazy_content))
+        # zeep returns the only field of a response instead of the response,
+        # and the only element of that field's value instead of the value
+        self._unwrapped: Dict[str, str] = {}
+        if isinstance(xsd_type, ComplexType):
+            for name, element in xsd_type.elements:
+                child_type = element.type
+                if (
+                    isinstance(child_type, ComplexType)
+                    and len(child_type.elements) == 1
+                    and not child_type.attributes
+                ):
+                    self._unwrapped[name] = child_type.elements[0][0]
+
+    def _unwrap(self, result: Any) -> Any:
+        if not isinstance(result, dict):
+            return result
+        if len(result) != 1:
+            return result or None
+        name, value = next(iter(result.items()))
+        if isinstance(value, dict) and name in self._unwrapped:
+            return value[self._unwrapped[name]]
+        return value
+
+
+class FastCodec:
+    """Fast path encoding and decoding of frequently called operations.
+
+    Operation codecs are compiled from the WSDL on first use and shared by
+    the services using the codec. Operations that cannot be compiled, and
+    calls the compiled codec does not handle, go through zeep.
+
+    With verify set, each call is also encoded and decoded by zeep and the
+    results are compared; on a difference a warning is logged, zeep's
+    result is used and the operation's codec is disabled. This is meant for
+    checking the codec against real traffic, not for production.
+
+    With lazy_content set, file contents and other base64Binary values are
+    returned as EncodedContent and only decoded when they are used.
+    """
+
+    def __init__(
+        self,
+        operations: FrozenSet[str] = FAST_OPERATIONS,
+        verify: bool = False,
+        lazy_content: bool = False,
+    ):
+        """Initialize the codec.
+
+        Args:
+            operations: Names of the operations handled by the codec
+            verify: If True, compare every result with zeep's
+            lazy_content: If True, defer the decoding of base64Binary values
+                (e.g., attachment contents) until they are accessed
+        """
+        self.operations = frozenset(operations)
+        self.verify = verify
+        self.lazy_content = lazy_content
+        self.logger = logging.getLogger(__name__)
+        self._codecs: Dict[Tuple[int, str], Optional[OperationCodec]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, binding: Any, operation_name: str) -> Optional[OperationCodec]:
+        """Get the compiled codec of an operation.
+
+        Returns:
+            The codec, or None if the operation is left to zeep
+        """
+        if operation_name not in self.operations:
+            return None
+        key = (id(binding), operation_name)
+        try:
+            codec = self._codecs[key]
+        except KeyError:
+            with self._lock:
+                codec = self._codecs.get(key, FALLBACK)
+                if codec is FALLBACK:
+                    codec = self._codecs[key] = self._compile(binding, operation_name)
+        if codec is None or not codec.enabled:
+            return None
+        return codec
+
+    def check_request(
+        self,
+        codec: OperationCodec,
+        service: Any,
+        kwargs: Mapping[str, Any],
+        message: bytes,
+        headers: Mapping[str, str],
+    ) -> Tuple[bytes, Dict[str, str]]:
+        """Compare a request rendered by a codec with zeep's rendering.
+
+        Args:
+            codec: Codec of the operation
+            service: zeep service proxy the call is made with
+            kwargs: Arguments of the call
+            message: Envelope rendered by the codec
+            headers: HTTP headers of the rendered request
+
+        Returns:
+            zeep's envelope and HTTP headers
+        """
+        envelope, zeep_headers = service._binding._create(
+            codec.operation_name,
+            (),
+            dict(kwargs),
+            client=service._client,
+            options=service._binding_options,
+        )
+        zeep_message = etree_to_string(envelope)
+        if zeep_message != message or dict(zeep_headers) != dict(headers):
+            self._mismatch(codec, "request", message, zeep_message)
+        return zeep_message, zeep_headers
+
+    def check_response(
+        self, codec: OperationCodec, service: Any, response: Any, result: Any
+    ) -> Any:
+        """Compare a response decoded by a codec with zeep's result.
+
+        Args:
+            codec: Codec of the operation
+            service: zeep service proxy the call was made with
+            response: HTTP response of the call
+            result: Response decoded by the codec
+
+        Returns:
+            zeep's serialized result
+        """
+        binding = service._binding
+        expected = serialize_object(
+            binding.process_reply(
+                service._client, binding.get(codec.operation_name), response
+            )
+        )
+        if not _identical(expected, result):
+            self._mismatch(codec, "response", result, expected)
+        return expected
+
+    def _compile(self, binding: Any, operation_name: str) -> Optional[OperationCodec]:
+        if not isinstance(binding, Soap11Binding):
+            return None
+        operation = binding.get(operation_name)
+        if (
+            operation is None
+            or operation.abstract.wsa_action
+            or operation.output.header.type._element
+        ):
+            return None
+        try:
+            return OperationCodec(binding, operation_name, self.lazy_content)
+        except TypeError as e:
+            self.logger.debug(f"Operation {operation_name} is left to zeep: {e}")
+            return None
+
+    def _mismatch(self, codec: OperationCodec, kind: str, got: Any, expected: Any) -> None:
+        codec.enabled = False
+        self.logger.warning(
+            f"Fast codec {kind} of {codec.operation_name} differs from zeep, "
+            f"disabling it: {got!r} != {expected!r}"
+        )
+
+
+def _flatten(elements_nested: List[Tuple[str, Any]]) -> List[Tuple[str, Element]]:
+    """Flatten the single-occurrence sequences and groups of request elements."""
+    result = []
+    for name, element in elements_nested:
+        if isinstance(element, Element):
+            result.append((name, element))
+        elif isinstance(element, (Sequence, Group)) and element.max_occurs == 1:
+            if isinstance(element, Group):
+                element = element.child
+            if not isinstance(element, Sequence):
+                raise TypeError("Unsupported group")
+            result.extend(_flatten(element.elements_nested))
+        else:
+            raise TypeError(f"Unsupported indicator {element!r}")
+    return result
+
+
+def _escape(text: str) -> str:
+    # Escaped as lxml escapes text
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    return text
+
+
+def _identical(a: Any, b: Any) -> bool:
+    """Compare values including the types and order of dict keys."""
+    if isinstance(b, EncodedContent):
+        b = b.value
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_identical(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_identical, a, b))
+    return a == b
+
+
+def _fallback_decoder(node: Any, allow_none: bool) -> Any:
+    raise _Fallback()
+
+
+def _type_decoder(xsd_type: Any, decoders: _Decoders) -> Decoder:
+    """Compile the decoder of an XSD type, mirroring its parse_xmlelement."""
+    decoder = decoders.get(id(xsd_type))
+    if decoder is not None:
+        return decoder
+    if isinstance(xsd_type, AnySimpleType):
+        decoder = decoders[id(xsd_type)] = _simple_decoder(
+            xsd_type, decoders.lazy_content
+        )
+        return decoder
+
+    # Recursive types refer to the decoder before it is compiled
+    compiled: List[Decoder] = []
+    decoders[id(xsd_type)] = lambda node, allow_none: compiled[0](node, allow_none)
+    try:
+        compiled.append(_complex_decoder(xsd_type, decoders))
+    except TypeError:
+        compiled.append(_fallback_decoder)
+    decoders[id(xsd_type)] = compiled[0]
+    return compiled[0]
+
+
+def _simple_decoder(xsd_type: AnySimpleType, lazy_content: bool) -> Decoder:
+    pythonvalue = xsd_type.pythonvalue
+    if lazy_content and isinstance(xsd_type, Base64Binary):
+        pythonvalue = EncodedContent
+
+    def decode(node: Any, allow_none: bool) -> Any:
+        text = node.text
+        if text is None:
+            return None
+        try:
+            return pythonvalue(text)
+        except (TypeError, ValueError):
+            # zeep logs the error and returns None
+            raise _Fallback()
+
+    return decode
+
+
+def _complex_decoder(xsd_type: Any, decoders: _Decoders) -> Decoder:
+    if not isinstance(xsd_type, ComplexType) or getattr(xsd_type, "_array_type", None):
+        raise TypeError("Unsupported type")
+    if not xsd_type.attributes and not xsd_type.elements:
+        return lambda node, allow_none: None
+
+    attributes = []
+    for name, attribute in xsd_type.attributes:
+        if not attribute.name:
+            raise TypeError("Unsupported attribute")
+        attributes.append((name, attribute.qname.text, attribute.type.pythonvalue))
+
+    defaults = serialize_object(xsd_type())
+    list_defaults = [name for name, value in defaults.items() if isinstance(value, list)]
+
+    def new_values() -> "OrderedDict[str, Any]":
+        values = OrderedDict(defaults)
+        for name in list_defaults:
+            values[name] = []
+        return values
+
+    def parse_attributes(node: Any, values: Dict[str, Any]) -> None:
+        attrib = node.attrib
+        if attrib:
+            for name, qname, pythonvalue in attributes:
+                value = attrib.get(qname)
+                if value is not None:
+                    try:
+                        values[name] = pythonvalue(value)
+                    except (TypeError, ValueError):
+                        raise _Fallback()
+
+    element = getattr(xsd_type, "_element", None)
+    if isinstance(element, Element) and isinstance(element.type, AnySimpleType):
+        # Simple content with attributes
+        content_name = xsd_type.elements_nested[0][0]
+        parse_content = _simple_decoder(element.type, decoders.lazy_content)
+
+        def decode_simple_content(node: Any, allow_none: bool) -> Any:
+            values = new_values()
+            values[content_name] = parse_content(node, True)
+            parse_attributes(node, values)
+            return values
+
+        return decode_simple_content
+
+    if len(xsd_type.elements_nested) != 1:
+        raise TypeError("Unsupported content")
+    name, indicator = xsd_type.elements_nested[0]
+    parse_particle = _particle_decoder(name, indicator, decoders)
+
+    def decode(node: Any, allow_none: bool) -> Any:
+        children = list(node)
+        if allow_none and not children and not node.attrib:
+            return None
+        values = new_values()
+        if parse_particle(children, 0, values) != len(children):
+            # zeep rejects unexpected elements in strict mode
+            raise _Fallback()
+        parse_attributes(node, values)
+        return values
+
+    return decode
+
+
+# Particle decoders consume children from a position, store the parsed
+# values and return the position of the first unconsumed child
+Particle = Callable[[List[Any], int, Dict[str, Any]], int]
+
+
+def _particle_decoder(name: str, particle: Any, decoders: _Decoders) -> Particle:
+    if isinstance(particle, Element):
+        return _element_decoder(name, particle, decoders)
+    if isinstance(particle, Group):
+        if particle.accepts_multiple:
+            raise TypeError("Unsupported group")
+        return _particle_decoder(name, particle.child, decoders)
+    if isinstance(particle, Choice):
+        return _choice_decoder(particle, decoders)
+    if isinstance(particle, Sequence):
+        return _sequence_decoder(name, particle, decoders)
+    raise TypeError(f"Unsupported particle {particle!r}")
+
+
+def _matcher(element: Element) -> Callable[[Any], bool]:
+    """Match child tags against an element like zeep's parse_xmlelements."""
+    expected = element.qname.text
+    localname = element.qname.localname
+    namespace = element.qname.namespace
+
+    def matches(tag: Any) -> bool:
+        if tag == expected:
+            return True
+        if not isinstance(tag, str):
+            raise _Fallback()
+        tag_namespace, _, tag_localname = tag[1:].rpartition("}")
+        if tag_localname != localname:
+            return False
+        if tag_namespace and namespace and tag_namespace != namespace:
+            # zeep stops matching in strict mode
+            raise _Fallback()
+        return True
+
+    return matches
+
+
+def _element_decoder(name: str, element: Element, decoders: _Decoders) -> Particle:
+    matches = _matcher(element)
+    decode_type = _type_decoder(element.type, decoders)
+    max_occurs = element.max_occurs
+    unbounded = max_occurs == "unbounded"
+    multiple = element.accepts_multiple
+    optional = element.is_optional
+
+    def parse(children: List[Any], position: int, values: Dict[str, Any]) -> int:
+        items = []
+        count = len(children)
+        while position < count and (unbounded or len(items) < max_occurs):
+            child = children[position]
+            if not matches(child.tag):
+                if not items and not optional:
+                    raise _Fallback()
+                break
+            if _XSI_TYPE in child.attrib:
+                raise _Fallback()
+            items.append(decode_type(child, True))
+            position += 1
+        if multiple:
+            values[name] = items
+        else:
+            values[name] = items[0] if items else None
+        return position
+
+    return parse
+
+
+def _sequence_decoder(name: str, sequence: Sequence, decoders: _Decoders) -> Particle:
+    parts = [
+        _particle_decoder(child_name, child, decoders)
+        for child_name, child in sequence.elements_nested
+    ]
+    max_occurs = sequence.max_occurs
+    unbounded = max_occurs == "unbounded"
+
+    if not sequence.accepts_multiple:
+
+        def parse(children: List[Any], position: int, values: Dict[str, Any]) -> int:
+            count = len(children)
+            if position < count:
+                for part in parts:
+                    position = part(children, position, values)
+                    if position == count:
+                        break
+            return position
+
+        return parse
+
+    def parse_multiple(children: List[Any], position: int, values: Dict[str, Any]) -> int:
+        items = []
+        count = len(children)
+        while position < count and (unbounded or len(items) < max_occurs):
+            item: Dict[str, Any] = OrderedDict()
+            started = position
+            for part in parts:
+                position = part(children, position, item)
+                if position == count:
+                    break
+            if position == started:
+                # The remaining children are left for the parent to reject
+                break
+            items.append(item)
+        values[name] = items
+        return position
+
+    return parse_multiple
+
+
+def _choice_decoder(choice: Choice, decoders: _Decoders) -> Particle:
+    if choice.accepts_multiple:
+        raise TypeError("Unsupported choice")
+    names = []
+    options = []
+    for name, element in choice.elements_nested:
+        if not isinstance(element, Element) or element.accepts_multiple:
+            raise TypeError("Unsupported choice")
+        names.append(name)
+        options.append(
+            (name, _matcher(element), _element_decoder(name, element, decoders))
+        )
+
+    def parse(children: List[Any], position: int, values: Dict[str, Any]) -> int:
+        if position < len(children):
+            tag = children[position].tag
+            for name, matches, parse_option in options:
+                if matches(tag):
+                    chosen: Dict[str, Any] = {}
+                    position = parse_option(children, position, chosen)
+                    # zeep sets the options not chosen to None, unless the
+                    # chosen one is empty too
+                    if chosen[name] is not None:
+                        for option_name in names:
+                            values[option_name] = None
+                        values[name] = chosen[name]
+                    return position
+        return position
+
+    return parse
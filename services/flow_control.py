@@ -0,0 +1,380 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, FrozenSet, Optional, TypeVar
+
+import requests
+from zeep import exceptions
+
+from .errors import CircuitOpenError
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+T = TypeVar("T")
+
+# Operations without side effects (or with idempotent ones), which are safe
+# to repeat after a transient failure
+READ_OPERATIONS: FrozenSet[str] = frozenset(
+    {
+        "AttachmentInfo",
+        "AuthenticateBigMessage",
+        "AuthenticateMessage",
+        "BigMessageDownload",
+        "CheckDataBox",
+        "DTInfo",
+        "DataBoxCreditInfo",
+        "DownloadAttachment",
+        "DummyOperation",
+        "FindDataBox",
+        "FindDataBox2",
+        "FindPersonalDataBox",
+        "GetConstants",
+        "GetDataBoxActivityStatus",
+        "GetDataBoxAddress",
+        "GetDataBoxList",
+        "GetDataBoxUsers2",
+        "GetDeliveryInfo",
+        "GetListForNotifications",
+        "GetListOfErasedMessages",
+        "GetListOfReceivedMessages",
+        "GetListOfSentMessages",
+        "GetMessageAuthor",
+        "GetMessageAuthor2",
+        "GetMessageStateChanges",
+        "GetOwnerInfoFromLogin",
+        "GetOwnerInfoFromLogin2",
+        "GetPasswordInfo",
+        "GetSignedDeliveryInfo",
+        "GetUserInfoFromLogin",
+        "GetUserInfoFromLogin2",
+        "ISDSSearch2",
+        "ISDSSearch3",
+        "MarkMessageAsDownloaded",
+        "MessageDownload",
+        "MessageEnvelopeDownload",
+        "PDZInfo",
+        "PDZSendInfo",
+        "SentMessageEnvelopeDownload",
+        "SignedBigMessageDownload",
+        "SignedMessageDownload",
+        "SignedSentBigMessageDownload",
+        "SignedSentMessageDownload",
+        "VerifyMessage",
+    }
+)
+
+# HTTP status codes of responses sent by an overloaded or failing server
+_OVERLOAD_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Interval in seconds at which asynchronous callers poll for a free slot
+_ASYNC_POLL_INTERVAL = 0.01
+
+# Maximum time in seconds a synchronous caller waits for a released slot
+# before checking again
+_MAX_SLOT_WAIT = 1.0
+
+
+@dataclass(frozen=True)
+class FlowControlConfig:
+    """Rate limiting, concurrency control and retry settings per endpoint.
+
+    The concurrency limit of each endpoint adapts to the server (AIMD): it
+    grows by one per limit's worth of successful calls and is multiplied by
+    decrease_factor when a call fails with a fault, timeout or overload
+    status. After failure_threshold such failures in a row the endpoint's
+    circuit opens and calls fail fast with CircuitOpenError for
+    reset_timeout seconds, after which a single trial call is let through.
+
+    Attributes:
+        rate: Maximum number of calls per second per endpoint; unlimited if
+            not set
+        burst: Number of calls that can be made at once within the rate
+        initial_concurrency: Initial concurrency limit per endpoint
+        min_concurrency: Lowest concurrency limit the adaptation goes to
+        max_concurrency: Highest concurrency limit the adaptation goes to
+        decrease_factor: Factor applied to the concurrency limit on failure
+        max_retries: Number of times a failed read operation is repeated
+        backoff_base: Delay in seconds before the first retry, doubled for
+            each further one and randomized (full jitter)
+        backoff_max: Maximum delay in seconds between retries
+        failure_threshold: Number of consecutive failures opening the circuit
+        reset_timeout: Time in seconds the circuit stays open
+        retried_operations: Operations repeated after transient failures
+    """
+
+    rate: Optional[float] = None
+    burst: int = 10
+    initial_concurrency: int = 8
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+    decrease_factor: float = 0.5
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    retried_operations: FrozenSet[str] = READ_OPERATIONS
+
+    def backoff(self, attempt: int) -> float:
+        """Delay in seconds before the retry following the given attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class EndpointLimiter:
+    """Token bucket, adaptive concurrency limit and circuit breaker of an endpoint.
+
+    Each call must acquire a slot, which returns the start time of the call,
+    and release it with that time and whether the call failed because of
+    the server.
+    """
+
+    def __init__(self, name: str, config: FlowControlConfig):
+        """Initialize the limiter.
+
+        Args:
+            name: Name of the endpoint, used in error messages
+            config: Flow control settings
+        """
+        self.name = name
+        self.config = config
+        self.limit = float(config.initial_concurrency)
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self._tokens = float(config.burst)
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._opened_until: Optional[float] = None
+        self._probing = False
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot.
+
+        Returns:
+            Start time of the call
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open
+        """
+        with self._condition:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return time.monotonic()
+                self._condition.wait(wait)
+
+    async def acquire_async(self) -> float:
+        """Wait for a free slot without blocking the event loop.
+
+        Returns:
+            Start time of the call
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open
+        """
+        # Imported here, so synchronous clients do not load asyncio
+        import asyncio
+
+        while True:
+            with self._condition:
+                wait = self._try_acquire()
+            if wait == 0:
+                return time.monotonic()
+            await asyncio.sleep(min(wait, _ASYNC_POLL_INTERVAL))
+
+    def release(self, started_at: float, overloaded: bool) -> None:
+        """Release the slot of a finished call and adapt to its outcome.
+
+        Args:
+            started_at: Start time returned by acquire
+            overloaded: True if the call failed because of the server
+        """
+        config = self.config
+        with self._condition:
+            self.in_flight -= 1
+            probe = self._probing
+            self._probing = False
+            if overloaded:
+                self.consecutive_failures += 1
+                # Failures of calls started before the last decrease were
+                # already accounted for by it
+                if started_at >= self._decreased_at:
+                    self.limit = max(
+                        config.min_concurrency, self.limit * config.decrease_factor
+                    )
+                    self._decreased_at = time.monotonic()
+                if probe or self.consecutive_failures >= config.failure_threshold:
+                    self._opened_until = time.monotonic() + config.reset_timeout
+            else:
+                self.consecutive_failures = 0
+                self._opened_until = None
+                self.limit = min(config.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _try_acquire(self) -> float:
+        """Take a slot if one is free.
+
+        Returns:
+            0 if a slot was taken, otherwise the time in seconds to wait
+            before trying again
+        """
+        now = time.monotonic()
+        if self._opened_until is not None:
+            if now < self._opened_until or self._probing:
+                raise CircuitOpenError(
+                    f"Circuit for endpoint {self.name} is open after "
+                    f"{self.consecutive_failures} consecutive failures"
+                )
+            # Half-open: let a single trial call through
+            if self.in_flight == 0:
+                self._probing = True
+                self.in_flight += 1
+                return 0
+            return _ASYNC_POLL_INTERVAL
+
+        if self.in_flight >= int(self.limit):
+            return _MAX_SLOT_WAIT
+
+        if self.config.rate is not None:
+            self._tokens = min(
+                self.config.burst,
+                self._tokens + (now - self._refilled_at) * self.config.rate,
+            )
+            self._refilled_at = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.config.rate
+            self._tokens -= 1
+
+        self.in_flight += 1
+        return 0
+
+
+class FlowControl:
+    """Flow control of the calls of all services of a client, per endpoint."""
+
+    def __init__(self, config: Optional[FlowControlConfig] = None):
+        """Initialize flow control.
+
+        Args:
+            config: Flow control settings applied to every endpoint
+        """
+        self.config = config or FlowControlConfig()
+        self._limiters: Dict[str, EndpointLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, endpoint: str) -> EndpointLimiter:
+        """Get the limiter of an endpoint (e.g., 'dz'), creating it on first use."""
+        with self._lock:
+            limiter = self._limiters.get(endpoint)
+            if limiter is None:
+                limiter = self._limiters[endpoint] = EndpointLimiter(
+                    endpoint, self.config
+                )
+            return limiter
+
+    def call(
+        self, endpoint: str, operation_name: str, func: Callable[[], T], retry: bool = True
+    ) -> T:
+        """Make a call within the limits of an endpoint.
+
+        Args:
+            endpoint: Endpoint of the service
+            operation_name: Name of the called operation
+            func: The call
+            retry: If False, the call is never repeated
+
+        Returns:
+            Result of the call
+        """
+        limiter = self.limiter(endpoint)
+        attempts = self._attempts(operation_name, retry)
+        for attempt in range(attempts):
+            started_at = limiter.acquire()
+            try:
+                result = func()
+            except Exception as e:
+                overloaded = is_overload(e)
+                limiter.release(started_at, overloaded)
+                if not overloaded or attempt == attempts - 1:
+                    raise
+            except BaseException:
+                # Interrupted; the call says nothing about the server
+                limiter.release(started_at, False)
+                raise
+            else:
+                limiter.release(started_at, False)
+                return result
+            time.sleep(self.config.backoff(attempt))
+
+    async def call_async(
+        self,
+        endpoint: str,
+        operation_name: str,
+        func: Callable[[], Awaitable[T]],
+        retry: bool = True,
+    ) -> T:
+        """Make an asynchronous call within the limits of an endpoint.
+
+        Args:
+            endpoint: Endpoint of the service
+            operation_name: Name of the called operation
+            func: Coroutine function making the call
+            retry: If False, the call is never repeated
+
+        Returns:
+            Result of the call
+        """
+        import asyncio
+
+        limiter = self.limiter(endpoint)
+        attempts = self._attempts(operation_name, retry)
+        for attempt in range(attempts):
+            started_at = await limiter.acquire_async()
+            try:
+                result = await func()
+            except Exception as e:
+                overloaded = is_overload(e)
+                limiter.release(started_at, overloaded)
+                if not overloaded or attempt == attempts - 1:
+                    raise
+            except BaseException:
+                # Cancelled; the call says nothing about the server
+                limiter.release(started_at, False)
+                raise
+            else:
+                limiter.release(started_at, False)
+                return result
+            await asyncio.sleep(self.config.backoff(attempt))
+
+    def _attempts(self, operation_name: str, retry: bool) -> int:
+        if retry and operation_name in self.config.retried_operations:
+            return 1 + self.config.max_retries
+        return 1
+
+
+def is_overload(error: Exception) -> bool:
+    """Check whether an error means the server is overloaded or failing.
+
+    Timeouts, connection failures, server SOAP faults and HTTP statuses
+    429 and 5xx count as such; errors caused by the request do not.
+    """
+    if isinstance(error, exceptions.Fault):
+        code = error.code or ""
+        return code.endswith(("Server", "Receiver"))
+    if isinstance(error, exceptions.TransportError):
+        return error.status_code in _OVERLOAD_STATUS_CODES
+    if isinstance(
+        error,
+        (
+            requests.Timeout,
+            requests.ConnectionError,
+            TimeoutError,
+            ConnectionError,
+        ),
+    ):
+        return True
+    return httpx is not None and isinstance(error, httpx.TransportError)
@@ -0,0 +1,298 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+
+from zeep import exceptions
+
+from .errors import CircuitOpenError
+from .response_cache import response_status_code
+
+try:
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # pragma: no cover
+    Status = StatusCode = None
+
+# Upper bounds in seconds of the call latency histogram buckets
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    300,
+)
+
+
+@dataclass
+class CallRecord:
+    """Measurements of one call of a service operation.
+
+    Times are in seconds. The phase times are only measured for regular
+    calls; streamed calls record the total duration and byte counts only.
+
+    Attributes:
+        endpoint: Endpoint of the service (e.g., 'dz')
+        operation: Name of the operation
+        started_at: Start of the call (time.perf_counter)
+        duration: Total duration of the call
+        serialize_time: Time spent building the request envelope
+        network_time: Time spent sending the request and receiving the
+            response
+        deserialize_time: Time spent parsing the response
+        request_bytes: Size of the request body
+        response_bytes: Size of the response body
+        error: Error raised by the call
+        error_code: SOAP fault code, HTTP status or error type of the error,
+            or the ISDS status code of a response reporting an error
+        context: Storage for observers, e.g. of their spans
+    """
+
+    endpoint: str
+    operation: str
+    started_at: float = field(default_factory=time.perf_counter)
+    duration: float = 0.0
+    serialize_time: float = 0.0
+    network_time: float = 0.0
+    deserialize_time: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    error: Optional[BaseException] = None
+    error_code: Optional[str] = None
+    context: Dict[Any, Any] = field(default_factory=dict)
+
+
+class CallObserver(Protocol):
+    """Hook notified of service calls."""
+
+    def call_started(self, record: CallRecord) -> None:
+        """Called before a call is made."""
+        ...
+
+    def call_finished(self, record: CallRecord) -> None:
+        """Called after a call finished or failed, with its measurements."""
+        ...
+
+
+class Instrumentation:
+    """Dispatches the measurements of service calls to observers."""
+
+    def __init__(self, observers: Sequence[CallObserver]):
+        """Initialize the instrumentation.
+
+        Args:
+            observers: Hooks notified of each call, e.g. a MetricsCollector
+                and a TracingObserver
+        """
+        self.observers = list(observers)
+
+    def start(self, endpoint: str, operation_name: str) -> CallRecord:
+        """Start measuring a call."""
+        record = CallRecord(endpoint, operation_name)
+        for observer in self.observers:
+            observer.call_started(record)
+        return record
+
+    def finish(
+        self,
+        record: CallRecord,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Finish measuring a call and notify the observers.
+
+        Args:
+            record: Record returned by start
+            result: Serialized response of a successful call
+            error: Error raised by a failed call
+        """
+        record.duration = time.perf_counter() - record.started_at
+        if error is not None:
+            record.error = error
+            record.error_code = error_code(error)
+        else:
+            status_code = response_status_code(result)
+            if status_code not in (None, "0000"):
+                record.error_code = status_code
+        for observer in self.observers:
+            observer.call_finished(record)
+
+
+def error_code(error: BaseException) -> str:
+    """Classify an error raised by a call for metrics."""
+    if isinstance(error, exceptions.Fault):
+        return error.code or "Fault"
+    if isinstance(error, exceptions.TransportError):
+        return f"HTTP {error.status_code}"
+    if isinstance(error, CircuitOpenError):
+        return "CircuitOpen"
+    return type(error).__name__
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, buckets: Sequence[float], value: float) -> None:
+        self.counts[bisect.bisect_left(buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsCollector:
+    """Prometheus-style metrics of service calls, labeled by endpoint and operation.
+
+    Collects call latency histograms, call, error and byte counters, the
+    time spent per phase and the number of calls in flight. render returns
+    them in the Prometheus text exposition format, e.g. to be served from a
+    /metrics handler.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "isds"):
+        """Initialize the collector.
+
+        Args:
+            buckets: Upper bounds in seconds of the latency histogram buckets
+            prefix: Prefix of the metric names
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def call_started(self, record: CallRecord) -> None:
+        with self._lock:
+            self._in_flight[record.endpoint, record.operation] += 1
+
+    def call_finished(self, record: CallRecord) -> None:
+        labels = (record.endpoint, record.operation)
+        with self._lock:
+            self._in_flight[labels] -= 1
+            histogram = self._latency.get(labels)
+            if histogram is None:
+                histogram = self._latency[labels] = _Histogram(self.buckets)
+            histogram.observe(self.buckets, record.duration)
+            counters = self._counters
+            counters["calls_total"][labels] += 1
+            counters["request_bytes_total"][labels] += record.request_bytes
+            counters["response_bytes_total"][labels] += record.response_bytes
+            counters["serialize_seconds_total"][labels] += record.serialize_time
+            counters["network_seconds_total"][labels] += record.network_time
+            counters["deserialize_seconds_total"][labels] += record.deserialize_time
+            if record.error_code is not None:
+                counters["errors_total"][(*labels, record.error_code)] += 1
+
+    def in_flight(self, endpoint: str, operation: str) -> int:
+        """Get the number of calls of an operation in flight."""
+        with self._lock:
+            return self._in_flight.get((endpoint, operation), 0)
+
+    def counter(self, name: str, *labels: str) -> float:
+        """Get the value of a counter.
+
+        Args:
+            name: Name of the counter without the prefix, e.g. "errors_total"
+            *labels: Endpoint, operation and (for errors_total) error code
+        """
+        with self._lock:
+            return self._counters[name].get(labels, 0.0)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        prefix = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            name = f"{prefix}_call_duration_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(self._latency.items()):
+                label_text = _labels(("endpoint", "operation"), labels)
+                cumulative = 0
+                for bound, count in zip(
+                    (*self.buckets, "+Inf"), histogram.counts, strict=True
+                ):
+                    cumulative += count
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{name}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{label_text}}} {cumulative}")
+
+            for counter_name, values in sorted(self._counters.items()):
+                name = f"{prefix}_{counter_name}"
+                label_names = ("endpoint", "operation", "code")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(values.items()):
+                    lines.append(f"{name}{{{_labels(label_names, labels)}}} {value}")
+
+            name = f"{prefix}_calls_in_flight"
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(self._in_flight.items()):
+                lines.append(
+                    f"{name}{{{_labels(('endpoint', 'operation'), labels)}}} {value}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+class TracingObserver:
+    """Records each service call as an OpenTelemetry-style span.
+
+    Works with any tracer providing start_span(name, attributes=...) whose
+    spans provide set_attribute, record_exception and end, such as
+    opentelemetry.trace.get_tracer(...). The spans are not made current.
+    """
+
+    def __init__(self, tracer: Any):
+        """Initialize the observer.
+
+        Args:
+            tracer: Tracer the spans are started with
+        """
+        self.tracer = tracer
+
+    def call_started(self, record: CallRecord) -> None:
+        record.context[self] = self.tracer.start_span(
+            f"ISDS {record.operation}",
+            attributes={
+                "rpc.system": "soap",
+                "rpc.service": record.endpoint,
+                "rpc.method": record.operation,
+            },
+        )
+
+    def call_finished(self, record: CallRecord) -> None:
+        span = record.context.pop(self)
+        span.set_attribute("isds.request_bytes", record.request_bytes)
+        span.set_attribute("isds.response_bytes", record.response_bytes)
+        span.set_attribute("isds.serialize_seconds", record.serialize_time)
+        span.set_attribute("isds.network_seconds", record.network_time)
+        span.set_attribute("isds.deserialize_seconds", record.deserialize_time)
+        if record.error_code is not None:
+            span.set_attribute("error.type", record.error_code)
+        if record.error is not None:
+            span.record_exception(record.error)
+            if Status is not None:
+                span.set_status(Status(StatusCode.ERROR, str(record.error)))
+        span.end()
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
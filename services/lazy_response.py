@@ -0,0 +1,133 @@
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List
+
+from zeep.helpers import serialize_object
+from zeep.xsd.valueobjects import CompoundValue
+
+
+class LazyResponse(Mapping):
+    """Read-only mapping view of a response parsed by zeep.
+
+    Unlike serialize_object, which copies the whole response into nested
+    dicts up front, nested structures are only wrapped when they are
+    accessed, so reading a few fields of a large response (e.g., a message
+    list) costs little. Lists are returned as LazyList views. to_dict
+    converts the whole response to nested dicts.
+
+    The view is not copied by copy.deepcopy, as it cannot be modified, and
+    is pickled as the dicts returned by to_dict.
+    """
+
+    __slots__ = ("_value", "_values", "_wrapped")
+
+    def __init__(self, value: Any):
+        """Initialize the view.
+
+        Args:
+            value: Parsed response (a zeep CompoundValue) or dict
+        """
+        self._value = value
+        self._values = value.__values__ if isinstance(value, CompoundValue) else value
+        self._wrapped: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._wrapped[key]
+        except KeyError:
+            pass
+        value = self._wrapped[key] = lazy_view(self._values[key])
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"LazyResponse({self.to_dict()!r})"
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyResponse":
+        return self
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the response to nested dicts and lists."""
+        return serialize_object(self._value)
+
+
+class LazyList(Sequence):
+    """Read-only sequence view of a list in a response parsed by zeep."""
+
+    __slots__ = ("_items", "_wrapped")
+
+    def __init__(self, items: List[Any]):
+        """Initialize the view.
+
+        Args:
+            items: List of parsed values
+        """
+        self._items = items
+        self._wrapped: Dict[int, Any] = {}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self._items))[index]]
+        if index < 0:
+            index += len(self._items)
+        try:
+            return self._wrapped[index]
+        except KeyError:
+            pass
+        value = self._wrapped[index] = lazy_view(self._items[index])
+        return value
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (LazyList, list)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyList({self.to_list()!r})"
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyList":
+        return self
+
+    def __reduce__(self):
+        return list, (self.to_list(),)
+
+    def to_list(self) -> List[Any]:
+        """Convert the list to nested dicts and lists."""
+        return serialize_object(self._items)
+
+
+def materialize(response: Any) -> Any:
+    """Convert a lazy response view to nested dicts and lists.
+
+    Other values are returned as they are.
+    """
+    if isinstance(response, LazyResponse):
+        return response.to_dict()
+    if isinstance(response, LazyList):
+        return response.to_list()
+    return response
+
+
+def lazy_view(value: Any) -> Any:
+    """Wrap a value parsed by zeep in a lazy view.
+
+    Structures are returned as LazyResponse, lists as LazyList and other
+    values as they are.
+    """
+    if isinstance(value, (CompoundValue, dict)):
+        return LazyResponse(value)
+    if isinstance(value, list):
+        return LazyList(value)
+    return value
@@ -1,8 +1,11 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator, List
 from datetime import datetime
 
 from .base import BaseService
+from .errors import ISDSError
+from .message_table import MessageTable
 
 
 class MessageInfoService(BaseService):
@@ -15,6 +18,7 @@ class MessageInfoService(BaseService):
         base_url: str,
         wsdl_dir: Path,
         debug: bool = False,
+        **kwargs,
     ):
         """Initialize the message info service.
 
@@ -24,6 +28,7 @@ class MessageInfoService(BaseService):
             base_url: Base URL of the ISDS service
             wsdl_dir: Directory containing WSDL files
             debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
         """
         super().__init__(
             username=username,
@@ -33,6 +38,7 @@ class MessageInfoService(BaseService):
             wsdl_filename="dm_info.wsdl",
             endpoint="dx",
             debug=debug,
+            **kwargs,
         )
 
     def get_message_envelope(self, message_id: str) -> Dict[str, Any]:
@@ -135,6 +141,196 @@ class MessageInfoService(BaseService):
         }
         return self._call("GetListOfReceivedMessages", **params)
 
+    def iter_sent_messages(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        prefetch: bool = False,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over sent messages, fetching the list page by page.
+
+        Args:
+            from_time: Start time for the list
+            to_time: End time for the list
+            page_size: Number of records fetched per request
+            prefetch: If True, fetch the next page in the background while
+                the current one is being consumed
+            **kwargs: Additional filter parameters
+
+        Returns:
+            Iterator over message records
+        """
+        return self._iter_records(
+            self.get_sent_messages,
+            page_size,
+            prefetch,
+            from_time=from_time,
+            to_time=to_time,
+            **kwargs,
+        )
+
+    def iter_received_messages(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        prefetch: bool = False,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over received messages, fetching the list page by page.
+
+        Args:
+            from_time: Start time for the list
+            to_time: End time for the list
+            page_size: Number of records fetched per request
+            prefetch: If True, fetch the next page in the background while
+                the current one is being consumed
+            **kwargs: Additional filter parameters
+
+        Returns:
+            Iterator over message records
+        """
+        return self._iter_records(
+            self.get_received_messages,
+            page_size,
+            prefetch,
+            from_time=from_time,
+            to_time=to_time,
+            **kwargs,
+        )
+
+    def get_sent_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of sent messages as a compact MessageTable.
+
+        Args:
+            from_time: Start time for the list
+            to_time: End time for the list
+            page_size: Number of records fetched per request
+            **kwargs: Additional filter parameters
+
+        Returns:
+            Table of all message records in the time range
+        """
+        return MessageTable(
+            self.iter_sent_messages(
+                from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+            )
+        )
+
+    def get_received_message_table(
+        self,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        page_size: int = 1000,
+        **kwargs,
+    ) -> MessageTable:
+        """Get the list of received messages as a compact MessageTable.
+
+        Args:
+            from_time: Start time for the list
+            to_time: End time for the list
+            page_size: Number of records fetched per request
+            **kwargs: Additional filter parameters
+
+        Returns:
+            Table of all message records in the time range
+        """
+        return MessageTable(
+            self.iter_received_messages(
+                from_time=from_time, to_time=to_time, page_size=page_size, **kwargs
+            )
+        )
+
+    def _iter_records(
+        self,
+        fetch: Callable[..., Dict[str, Any]],
+        page_size: int,
+        prefetch: bool,
+        **params,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over the records of a paginated message list.
+
+        Args:
+            fetch: Method fetching one page of the list
+            page_size: Number of records fetched per request
+            prefetch: If True, fetch the next page in the background
+            **params: Parameters passed to fetch
+
+        Returns:
+            Iterator over message records
+        """
+
+        def fetch_page(offset: int) -> List[Dict[str, Any]]:
+            response = fetch(dmOffset=offset, dmLimit=page_size, **params)
+            return self._page_records(response)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending: Optional[Future] = None
+        offset = 1  # ISDS numbers the records from 1
+        first_id = None
+        try:
+            while True:
+                page = pending.result() if pending else fetch_page(offset)
+                pending = None
+                # A server ignoring dmOffset returns the same page again
+                if page and page[0]["dmID"] == first_id:
+                    return
+                first_id = page[0]["dmID"] if page else None
+                # A full page may be followed by more records
+                has_more = len(page) >= page_size
+                offset += len(page)
+                if has_more and executor is not None:
+                    pending = executor.submit(fetch_page, offset)
+                yield from page
+                if not has_more:
+                    return
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_state_change_records(
+        self, from_time: datetime, to_time: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get the state changes of messages in a time range as records.
+
+        Args:
+            from_time: Start of the time range
+            to_time: End of the time range
+
+        Returns:
+            State change records (dmID, dmEventTime, dmMessageStatus)
+
+        Raises:
+            ISDSError: If ISDS reports an error status
+        """
+        return self._page_records(self.get_message_state_changes(from_time, to_time))
+
+    @staticmethod
+    def _page_records(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get the records from a message list or state change response.
+
+        Raises:
+            ISDSError: If ISDS reports an error status, so that a failed page
+                is not mistaken for the end of the list
+        """
+        status = response.get("dmStatus") or {}
+        if status.get("dmStatusCode") != "0000":
+            raise ISDSError(
+                f"Listing messages failed: {status.get('dmStatusCode')} "
+                f"{status.get('dmStatusMessage')}"
+            )
+        records = response.get("dmRecords") or {}
+        # zeep exposes the repeated sequence as a list of {"dmRecord": ...}
+        return [item["dmRecord"] for item in records.get("_value_1") or []]
+
     def get_message_state_changes(
         self, dmFromTime: datetime, dmToTime: datetime
     ) -> Dict[str, Any]:
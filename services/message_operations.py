@@ -1,9 +1,15 @@
+from functools import partial
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import BinaryIO, Callable, Dict, Any, Iterable, List, Optional, Tuple, Union
 
 from schemas.base import DmFile
 from schemas.responses import DownloadMessageResponse
-from .base import BaseService
+from .base import BaseService, ISDSError
+from .batch import BatchResult, run_batch
+from .streaming import content_placeholder
+
+# Maximum number of recipients of one CreateMultipleMessage request
+MAX_MULTIPLE_RECIPIENTS = 50
 
 
 class MessageOperationsService(BaseService):
@@ -16,6 +22,7 @@ class MessageOperationsService(BaseService):
         base_url: str,
         wsdl_dir: Path,
         debug: bool = False,
+        **kwargs,
     ):
         """Initialize the message operations service.
 
@@ -25,6 +32,7 @@ class MessageOperationsService(BaseService):
             base_url: Base URL of the ISDS service
             wsdl_dir: Directory containing WSDL files
             debug: If True, enable debug logging
+            **kwargs: Additional options passed to BaseService
         """
         super().__init__(
             username=username,
@@ -34,6 +42,7 @@ class MessageOperationsService(BaseService):
             wsdl_filename="dm_operations.wsdl",
             endpoint="dz",
             debug=debug,
+            **kwargs,
         )
 
     def create_message(
@@ -44,55 +53,198 @@ class MessageOperationsService(BaseService):
         Args:
             recipient_id: ID of the recipient's data box
             subject: Subject of the message
-            content: Content of the message
+            files: Files to attach to the message
             **kwargs: Additional message parameters
 
         Returns:
             Response containing the created message details
         """
+        # File contents are streamed into the request instead of being
+        # encoded in memory
+        contents = {content_placeholder(): file for file in files}
         params = {
             "dmEnvelope": {
                 "dbIDRecipient": recipient_id,
                 "dmAnnotation": subject,
             },
-            "dmFiles": {
-                "dmFile": [
-                    {
-                        "dmEncodedContent": file.dmEncodedContent,
-                        "dmMimeType": file.dmMimeType,
-                        "dmFileMetaType": file.dmFileMetaType,
-                        "dmFileDescr": file.dmFileDescr,
-                    }
-                    for file in files
-                ]
-            },
+            "dmFiles": self._files_param(contents),
             **kwargs,
         }
-        return self._call("CreateMessage", **params)
+        return self._call_streaming("CreateMessage", contents, **params)
 
     def create_multiple_message(
-        self, recipient_ids: List[str], subject: str, content: str, **kwargs
+        self,
+        recipients: List[Union[str, Dict[str, Any]]],
+        subject: str,
+        files: List[DmFile],
+        **kwargs,
     ) -> Dict[str, Any]:
         """Create and send a message to multiple recipients.
 
+        ISDS creates a separate message for each recipient, at most
+        MAX_MULTIPLE_RECIPIENTS per request.
+
         Args:
-            recipient_ids: List of recipient data box IDs
+            recipients: Recipient data box IDs, or recipient structures with
+                dbIDRecipient and optionally dmRecipientOrgUnit,
+                dmRecipientOrgUnitNum and dmToHands
             subject: Subject of the message
-            content: Content of the message
+            files: Files to attach to the message
             **kwargs: Additional message parameters
 
         Returns:
-            Response containing the created message details
+            Response with the status of each recipient's message
+            (dmMultipleStatus) in the order of recipients
         """
+        contents = {content_placeholder(): file for file in files}
         params = {
-            "dmEnvelope": {
-                "dbIDRecipient": recipient_ids,
-                "dmAnnotation": subject,
+            "dmRecipients": {
+                "dmRecipient": [
+                    {"dbIDRecipient": recipient}
+                    if isinstance(recipient, str)
+                    else recipient
+                    for recipient in recipients
+                ]
             },
-            "dmContent": content,
+            "dmEnvelope": {"dmAnnotation": subject},
+            "dmFiles": self._files_param(contents),
             **kwargs,
         }
-        return self._call("CreateMultipleMessage", **params)
+        return self._call_streaming("CreateMultipleMessage", contents, **params)
+
+    def send_mass_message(
+        self,
+        recipients: Iterable[Union[str, Dict[str, Any]]],
+        subject: str,
+        files: List[DmFile],
+        batch_size: int = MAX_MULTIPLE_RECIPIENTS,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> List[BatchResult[str, str]]:
+        """Send a message with shared attachments to many recipients.
+
+        Recipients are split into CreateMultipleMessage requests of at most
+        batch_size recipients, which are sent concurrently. If
+        DmFile.cache is set, the attachments are encoded once and reused by
+        all requests. A failure of one request
+        or recipient is recorded in the recipients' results and does not
+        abort the others.
+
+        Args:
+            recipients: Recipient data box IDs or recipient structures, as in
+                create_multiple_message
+            subject: Subject of the message
+            files: Files to attach to each message
+            batch_size: Maximum number of recipients per request
+            max_workers: Maximum number of concurrent requests
+            **kwargs: Additional message parameters
+
+        Returns:
+            One result per recipient in input order, keyed by the recipient's
+            data box ID, with the ID of the created message
+        """
+        recipients, batches = self._mass_batches(recipients, files, batch_size)
+        results = run_batch(
+            partial(self._send_batch, recipients, subject, files, kwargs),
+            batches,
+            max_workers=max_workers,
+        )
+        return self._recipient_results(recipients, results)
+
+    def _send_batch(
+        self,
+        recipients: List[Union[str, Dict[str, Any]]],
+        subject: str,
+        files: List[DmFile],
+        kwargs: Dict[str, Any],
+        batch: range,
+    ) -> Dict[str, Any]:
+        return self.create_multiple_message(
+            [recipients[index] for index in batch], subject, files, **kwargs
+        )
+
+    @staticmethod
+    def _files_param(contents: Dict[str, DmFile]) -> Dict[str, Any]:
+        """Build dmFiles of a message whose contents are streamed."""
+        return {
+            "dmFile": [
+                {
+                    "dmEncodedContent": placeholder,
+                    "dmMimeType": file.dmMimeType,
+                    "dmFileMetaType": file.dmFileMetaType,
+                    "dmFileDescr": file.dmFileDescr,
+                }
+                for placeholder, file in contents.items()
+            ]
+        }
+
+    @staticmethod
+    def _mass_batches(
+        recipients: Iterable[Union[str, Dict[str, Any]]],
+        files: List[DmFile],
+        batch_size: int,
+    ) -> Tuple[List[Union[str, Dict[str, Any]]], List[range]]:
+        """Split recipients into batches, caching the shared files if enabled."""
+        if not 0 < batch_size <= MAX_MULTIPLE_RECIPIENTS:
+            raise ValueError(
+                f"batch_size must be between 1 and {MAX_MULTIPLE_RECIPIENTS}"
+            )
+        recipients = list(recipients)
+        if len(recipients) > batch_size and DmFile.cache is not None:
+            for file in files:
+                file.cache.warm(file.file_path)
+        batches = [
+            range(start, min(start + batch_size, len(recipients)))
+            for start in range(0, len(recipients), batch_size)
+        ]
+        return recipients, batches
+
+    @staticmethod
+    def _recipient_results(
+        recipients: List[Union[str, Dict[str, Any]]],
+        batch_results: List[BatchResult[range, Dict[str, Any]]],
+    ) -> List[BatchResult[str, str]]:
+        """Split the results of CreateMultipleMessage requests per recipient."""
+        results = []
+        for batch_result in batch_results:
+            statuses: List[Any] = []
+            error = batch_result.error
+            if error is None:
+                response = batch_result.result
+                statuses = (response.get("dmMultipleStatus") or {}).get(
+                    "dmSingleStatus"
+                ) or []
+                if len(statuses) != len(batch_result.key):
+                    status = response.get("dmStatus") or {}
+                    error = ISDSError(
+                        f"CreateMultipleMessage failed: {status.get('dmStatusCode')} "
+                        f"{status.get('dmStatusMessage')}"
+                    )
+            for position, index in enumerate(batch_result.key):
+                recipient = recipients[index]
+                if not isinstance(recipient, str):
+                    recipient = recipient["dbIDRecipient"]
+                result = BatchResult(key=recipient, index=index)
+                if error is not None:
+                    result.error = error
+                else:
+                    # dmSingleStatus is nillable, so an entry may be missing
+                    single_status = statuses[position] or {}
+                    status = single_status.get("dmStatus")
+                    if not status:
+                        result.error = ISDSError(
+                            "CreateMultipleMessage returned no status for the recipient"
+                        )
+                    elif status.get("dmStatusCode") == "0000":
+                        result.result = single_status.get("dmID")
+                    else:
+                        result.error = ISDSError(
+                            f"{status.get('dmStatusCode')}: "
+                            f"{status.get('dmStatusMessage')}"
+                        )
+                results.append(result)
+        results.sort(key=lambda result: result.index)
+        return results
 
     def download_message(self, message_id: str) -> DownloadMessageResponse:
         """Download a received message.
@@ -106,6 +258,34 @@ class MessageOperationsService(BaseService):
         response = self._call("MessageDownload", dmID=message_id)
         return DownloadMessageResponse.model_validate(response)
 
+    def download_message_to(
+        self,
+        message_id: str,
+        target_dir: Optional[Path] = None,
+        open_sink: Optional[Callable[[int, Dict[str, str]], BinaryIO]] = None,
+    ) -> DownloadMessageResponse:
+        """Download a received message, streaming its attachments to files.
+
+        The response is parsed as it is received and each attachment is
+        decoded in chunks straight into its file, so attachments are never
+        held in memory. The returned files have no dmEncodedContent; instead
+        file_path is set to the path of the saved content.
+
+        Args:
+            message_id: ID of the message to download
+            target_dir: Directory the attachments are saved to, as
+                "<message_id>_<index>_<dmFileDescr>"
+            open_sink: Called with the index and attributes of an attachment
+                to open the binary file it is written to, instead of saving to
+                target_dir; the file is closed once written
+
+        Returns:
+            The message with paths of the saved attachments
+        """
+        extractor = self._attachment_extractor(target_dir, open_sink, message_id)
+        response = self._call_extracting("MessageDownload", extractor, dmID=message_id)
+        return self._saved_message(response, extractor.paths)
+
     def download_signed_message(self, message_id: str) -> Dict[str, Any]:
         """Download a signed received message.
 
@@ -149,3 +329,4 @@ class MessageOperationsService(BaseService):
             Result of the re-signing operation
         """
         return self._call("Re-signISDSDocument", dmID=message_id)
+
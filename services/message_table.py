@@ -0,0 +1,375 @@
+import csv
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+# Fields of a message list record (tRecord), in the order of the schema
+RECORD_COLUMNS = (
+    "dmOrdinal",
+    "dmID",
+    "dbIDSender",
+    "dmSender",
+    "dmSenderAddress",
+    "dmSenderType",
+    "dmRecipient",
+    "dmRecipientAddress",
+    "dmAmbiguousRecipient",
+    "dmSenderOrgUnit",
+    "dmSenderOrgUnitNum",
+    "dbIDRecipient",
+    "dmRecipientOrgUnit",
+    "dmRecipientOrgUnitNum",
+    "dmToHands",
+    "dmAnnotation",
+    "dmRecipientRefNumber",
+    "dmSenderRefNumber",
+    "dmRecipientIdent",
+    "dmSenderIdent",
+    "dmLegalTitleLaw",
+    "dmLegalTitleYear",
+    "dmLegalTitleSect",
+    "dmLegalTitlePar",
+    "dmLegalTitlePoint",
+    "dmPersonalDelivery",
+    "dmAllowSubstDelivery",
+    "dmMessageStatus",
+    "dmAttachmentSize",
+    "dmDeliveryTime",
+    "dmAcceptanceTime",
+    "dmType",
+    "dmVODZ",
+)
+
+_INT_COLUMNS = frozenset(
+    {
+        "dmOrdinal",
+        "dmSenderType",
+        "dmSenderOrgUnitNum",
+        "dmRecipientOrgUnitNum",
+        "dmLegalTitleLaw",
+        "dmLegalTitleYear",
+        "dmMessageStatus",
+        "dmAttachmentSize",
+    }
+)
+_BOOL_COLUMNS = frozenset(
+    {"dmAmbiguousRecipient", "dmPersonalDelivery", "dmAllowSubstDelivery", "dmVODZ"}
+)
+_TIME_COLUMNS = frozenset({"dmDeliveryTime", "dmAcceptanceTime"})
+
+# Stored in integer and time columns in place of None
+_NULL = -(2**63)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = datetime.resolution
+
+
+class _Column:
+    """Storage of the values of one field."""
+
+    __slots__ = ("kind", "data")
+
+    def __init__(self, kind: str, data: Any):
+        self.kind = kind
+        self.data = data
+
+    @classmethod
+    def empty(cls, name: str) -> "_Column":
+        if name in _INT_COLUMNS:
+            return cls("int", array("q"))
+        if name in _BOOL_COLUMNS:
+            return cls("bool", array("b"))
+        if name in _TIME_COLUMNS:
+            return cls("time", array("q"))
+        return cls("object", [])
+
+    def encode(self, value: Any) -> Any:
+        kind = self.kind
+        if kind == "object":
+            return sys.intern(value) if type(value) is str else value
+        if value is None:
+            return -1 if kind == "bool" else _NULL
+        if kind == "time":
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return (value - _EPOCH) // _MICROSECOND
+        return int(value)
+
+    def decode(self, stored: Any) -> Any:
+        kind = self.kind
+        if kind == "object":
+            return stored
+        if kind == "bool":
+            return None if stored < 0 else bool(stored)
+        if stored == _NULL:
+            return None
+        if kind == "time":
+            return _EPOCH + stored * _MICROSECOND
+        return stored
+
+    def take(self, indices: Sequence[int]) -> "_Column":
+        values = map(self.data.__getitem__, indices)
+        if isinstance(self.data, array):
+            return _Column(self.kind, array(self.data.typecode, values))
+        return _Column(self.kind, list(values))
+
+
+class MessageRow(Mapping):
+    """Read-only view of one record of a MessageTable.
+
+    Values are read as items (row["dmID"]) or attributes (row.dmID).
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "MessageTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        column = self._table._columns[name]
+        return column.decode(column.data[self._index])
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table._columns)
+
+    def __len__(self) -> int:
+        return len(self._table._columns)
+
+    def __repr__(self) -> str:
+        return f"MessageRow({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the record as a dict."""
+        return dict(self.items())
+
+
+class MessageTable:
+    """Compact column-oriented table of message list records.
+
+    Each field is stored in one column: numbers, flags and times in typed
+    arrays and texts in lists of interned strings, so the many repeated
+    sender and recipient names are stored once. Rows are MessageRow views.
+    Times are returned in UTC.
+
+    Filtering and sorting work on whole columns and return new tables.
+    """
+
+    def __init__(self, records: Iterable[Mapping[str, Any]] = ()):
+        """Create a table.
+
+        Args:
+            records: Message records (dmRecord items of a message list),
+                e.g. from iter_received_messages
+        """
+        self._columns: Dict[str, _Column] = {
+            name: _Column.empty(name) for name in RECORD_COLUMNS
+        }
+        self._length = 0
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[MessageRow]:
+        return (MessageRow(self, index) for index in range(self._length))
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return self.take(range(self._length)[index])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageTable index out of range")
+        return MessageRow(self, index)
+
+    def __repr__(self) -> str:
+        return f"<MessageTable of {self._length} messages>"
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of the columns."""
+        return list(self._columns)
+
+    def append(self, record: Mapping[str, Any]) -> None:
+        """Add a message record to the table."""
+        for name in record:
+            if name not in self._columns:
+                # Fields unknown to this version of the schema
+                column = self._columns[name] = _Column("object", [])
+                column.data.extend([None] * self._length)
+        get = record.get
+        for name, column in self._columns.items():
+            column.data.append(column.encode(get(name)))
+        self._length += 1
+
+    def extend(self, records: Iterable[Mapping[str, Any]]) -> None:
+        """Add message records to the table."""
+        for record in records:
+            self.append(record)
+
+    def column(self, name: str) -> List[Any]:
+        """Get the values of a column."""
+        column = self._columns[name]
+        if column.kind == "object":
+            return list(column.data)
+        return [column.decode(value) for value in column.data]
+
+    def take(self, indices: Iterable[int]) -> "MessageTable":
+        """Get a table of the rows at the given indices, in their order."""
+        indices = list(indices)
+        table = MessageTable()
+        table._columns = {
+            name: column.take(indices) for name, column in self._columns.items()
+        }
+        table._length = len(indices)
+        return table
+
+    def filter(
+        self,
+        status: Union[int, Iterable[int], None] = None,
+        sender: Union[str, Iterable[str], None] = None,
+        recipient: Union[str, Iterable[str], None] = None,
+        delivered_from: Optional[datetime] = None,
+        delivered_to: Optional[datetime] = None,
+    ) -> "MessageTable":
+        """Get a table of the messages matching all of the given conditions.
+
+        Args:
+            status: Message status (dmMessageStatus) or statuses
+            sender: Data box ID of the sender (dbIDSender) or IDs
+            recipient: Data box ID of the recipient (dbIDRecipient) or IDs
+            delivered_from: Earliest delivery time (inclusive)
+            delivered_to: Latest delivery time (exclusive)
+
+        Returns:
+            The matching messages, in their order in this table
+        """
+        indices: Iterable[int] = range(self._length)
+        for name, values in (
+            ("dmMessageStatus", status),
+            ("dbIDSender", sender),
+            ("dbIDRecipient", recipient),
+        ):
+            if values is None:
+                continue
+            wanted = {values} if isinstance(values, (int, str)) else set(values)
+            data = self._columns[name].data
+            indices = [index for index in indices if data[index] in wanted]
+
+        if delivered_from is not None or delivered_to is not None:
+            column = self._columns["dmDeliveryTime"]
+            data = column.data
+            low = _NULL + 1 if delivered_from is None else column.encode(delivered_from)
+            high = None if delivered_to is None else column.encode(delivered_to)
+            if high is None:
+                indices = [index for index in indices if data[index] >= low]
+            else:
+                indices = [index for index in indices if low <= data[index] < high]
+        return self.take(indices)
+
+    def sort_by(self, name: str, reverse: bool = False) -> "MessageTable":
+        """Get a table of the messages sorted by a column.
+
+        Messages without a value are placed last.
+
+        Args:
+            name: Name of the column, e.g. "dmDeliveryTime"
+            reverse: If True, sort in descending order
+
+        Returns:
+            The sorted messages; messages with equal values keep their order
+        """
+        column = self._columns[name]
+        data = column.data
+        null = {"int": _NULL, "time": _NULL, "bool": -1}.get(column.kind)
+        present: List[int] = []
+        missing: List[int] = []
+        for index in range(self._length):
+            value = data[index]
+            (missing if value is None or value == null else present).append(index)
+        present.sort(key=data.__getitem__, reverse=reverse)
+        return self.take(present + missing)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Convert the table to a list of record dicts."""
+        return [row.to_dict() for row in self]
+
+    def to_csv(self, file: Union[str, Path, IO[str]]) -> None:
+        """Write the table as CSV with a header row.
+
+        Times are written in ISO format and missing values as empty fields.
+
+        Args:
+            file: Path or text file to write to
+        """
+        if isinstance(file, (str, Path)):
+            with open(file, "w", newline="", encoding="utf-8") as f:
+                self._write_csv(f)
+        else:
+            self._write_csv(file)
+
+    def to_arrow(self) -> Any:
+        """Convert the table to a pyarrow Table.
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if pyarrow is None:
+            raise ImportError("Exporting to Arrow requires the pyarrow package")
+        types = {
+            "int": pyarrow.int64(),
+            "bool": pyarrow.bool_(),
+            "time": pyarrow.timestamp("us", tz="UTC"),
+        }
+        return pyarrow.table(
+            {
+                name: pyarrow.array(self.column(name), type=types.get(column.kind))
+                for name, column in self._columns.items()
+            }
+        )
+
+    def _write_csv(self, file: IO[str]) -> None:
+        writer = csv.writer(file)
+        writer.writerow(self._columns)
+        formatters: List[Callable[[Any], Any]] = [
+            _format_time if column.kind == "time" else _format_value
+            for column in self._columns.values()
+        ]
+        columns = [self.column(name) for name in self._columns]
+        for values in zip(*columns):
+            writer.writerow(
+                [format(value) for format, value in zip(formatters, values)]
+            )
+
+
+def _format_value(value: Any) -> Any:
+    return "" if value is None else value
+
+
+def _format_time(value: Optional[datetime]) -> str:
+    return "" if value is None else value.isoformat()
@@ -0,0 +1,292 @@
+import os
+import re
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .streaming import (
+    RESPONSE_CHUNK_SIZE,
+    XOP_NAMESPACE,
+    ContentExtractor,
+    StreamedContent,
+)
+
+_ROOT_ID = "root.message@isds"
+
+
+class BinaryFileContent:
+    """File sent as a binary MIME part of an MTOM request.
+
+    Implements StreamedContent with the raw file bytes as the transferred
+    form, as MTOM parts are not base64-encoded.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = RESPONSE_CHUNK_SIZE):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+
+    def encoded_size(self) -> int:
+        return os.path.getsize(self.file_path)
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        with open(self.file_path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                yield chunk
+
+
+def build_mtom_parts(
+    message: bytes, contents: Dict[str, StreamedContent]
+) -> Tuple[List[Union[bytes, StreamedContent]], str]:
+    """Package a serialized envelope and its contents as an MTOM message.
+
+    Each placeholder in the envelope is replaced by an xop:Include of a MIME
+    part carrying the content in binary form.
+
+    Args:
+        message: Serialized SOAP 1.2 envelope containing the placeholders
+        contents: Contents keyed by their placeholders
+
+    Returns:
+        Parts of the multipart body and its Content-Type header
+    """
+    boundary = f"isds-mtom-{uuid.uuid4().hex}"
+    content_ids = {placeholder: f"{placeholder}@isds" for placeholder in contents}
+    for placeholder, content_id in content_ids.items():
+        include = (
+            f'<xop:Include xmlns:xop="{XOP_NAMESPACE}" href="cid:{content_id}"/>'
+        )
+        message = message.replace(placeholder.encode(), include.encode())
+
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Type: application/xop+xml; charset=UTF-8; type="application/soap+xml"\r\n'
+        "Content-Transfer-Encoding: 8bit\r\n"
+        f"Content-ID: <{_ROOT_ID}>\r\n\r\n"
+    ).encode()
+    parts: List[Union[bytes, StreamedContent]] = [head + message]
+    for placeholder, content_id in content_ids.items():
+        parts.append(
+            (
+                f"\r\n--{boundary}\r\n"
+                "Content-Type: application/octet-stream\r\n"
+                "Content-Transfer-Encoding: binary\r\n"
+                f"Content-ID: <{content_id}>\r\n\r\n"
+            ).encode()
+        )
+        parts.append(contents[placeholder])
+    parts.append(f"\r\n--{boundary}--\r\n".encode())
+
+    content_type = (
+        'multipart/related; type="application/xop+xml"; '
+        f'start="<{_ROOT_ID}>"; start-info="application/soap+xml"; '
+        f'boundary="{boundary}"'
+    )
+    return parts, content_type
+
+
+class MultipartParser:
+    """Incremental parser of a multipart/related body.
+
+    The body is fed in chunks. For each part, open_part is called with the
+    part headers and returns the function the part body is written to; the
+    part body is passed on in chunks as it arrives.
+    """
+
+    def __init__(
+        self,
+        boundary: str,
+        open_part: Callable[[Dict[str, str]], Callable[[Optional[bytes]], None]],
+    ):
+        """Initialize the parser.
+
+        Args:
+            boundary: Boundary separating the parts
+            open_part: Called with the (lower-cased) headers of each part;
+                returns a function called with each chunk of the part body
+                and with None at the end of the part
+        """
+        self.open_part = open_part
+        self._delimiter = f"\r\n--{boundary}".encode()
+        self._buffer = b"\r\n"  # The first delimiter is not preceded by CRLF
+        self._write: Optional[Callable[[Optional[bytes]], None]] = None
+        self._state = "preamble"
+
+    def feed(self, data: bytes) -> None:
+        """Parse the next chunk of the body."""
+        self._buffer += data
+        while self._step():
+            pass
+
+    def close(self) -> None:
+        """Finish parsing.
+
+        Raises:
+            ValueError: If the body ended before its closing delimiter
+        """
+        if self._state != "end":
+            raise ValueError("Truncated multipart body")
+
+    def _step(self) -> bool:
+        """Parse as much of the buffer as possible in the current state.
+
+        Returns:
+            True if the state changed and parsing can continue
+        """
+        if self._state in ("preamble", "body"):
+            index = self._buffer.find(self._delimiter)
+            if index < 0:
+                # Keep a possible partial delimiter for the next chunk
+                keep = len(self._delimiter) - 1
+                if self._state == "body" and len(self._buffer) > keep:
+                    self._write(self._buffer[:-keep])
+                    self._buffer = self._buffer[-keep:]
+                return False
+            if self._state == "body":
+                if index:
+                    self._write(self._buffer[:index])
+                self._write(None)
+            self._buffer = self._buffer[index + len(self._delimiter) :]
+            self._state = "delimiter"
+            return True
+
+        if self._state == "delimiter":
+            if len(self._buffer) < 2:
+                return False
+            self._state = "end" if self._buffer.startswith(b"--") else "headers"
+            if self._state == "end":
+                self._buffer = b""
+            return self._state == "headers"
+
+        if self._state == "headers":
+            index = self._buffer.find(b"\r\n\r\n")
+            if index < 0:
+                return False
+            headers = {}
+            for line in self._buffer[:index].decode("latin-1").split("\r\n"):
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            self._buffer = self._buffer[index + 4 :]
+            self._write = self.open_part(headers)
+            self._state = "body"
+            return True
+
+        # Ignore the epilogue
+        self._buffer = b""
+        return False
+
+
+class MtomResponseParser:
+    """Incremental parser of an MTOM response.
+
+    The root part, identified by the start parameter of the Content-Type (or
+    the first part if there is none), is parsed by a ContentExtractor. The
+    binary parts it references through xop:Include are written to the sinks
+    the extractor opened for the including content elements. The root part
+    must precede them, so they can be streamed without being buffered.
+    """
+
+    def __init__(self, content_type: str, extractor: ContentExtractor):
+        """Initialize the parser.
+
+        Args:
+            content_type: Content-Type header of the response
+            extractor: Parser of the root part
+        """
+        self.extractor = extractor
+        self.document = None
+        self._start = _content_type_param(content_type, "start", "").strip("<>")
+        self._root_seen = False
+        self._parser = MultipartParser(
+            _content_type_param(content_type, "boundary"), self._open_part
+        )
+
+    def feed(self, data: bytes) -> None:
+        """Parse the next chunk of the response."""
+        self._parser.feed(data)
+
+    def finish(self):
+        """Finish parsing.
+
+        Returns:
+            Root element of the SOAP envelope
+
+        Raises:
+            ValueError: If the root part or a part it includes is missing
+        """
+        self._parser.close()
+        if self.document is None:
+            raise ValueError("MTOM response has no root part")
+        if self.extractor.includes:
+            missing = ", ".join(sorted(self.extractor.includes))
+            raise ValueError(f"MTOM response has no parts for {missing}")
+        return self.document
+
+    def abort(self) -> None:
+        """Close all sinks of partially written contents."""
+        self.extractor.abort()
+
+    def _open_part(self, headers: Dict[str, str]) -> Callable[[Optional[bytes]], None]:
+        content_id = headers.get("content-id", "").strip("<>")
+        if self._start:
+            is_root = content_id == self._start
+        else:
+            # Without a start parameter, the root is the first part
+            is_root = not self._root_seen
+        if is_root:
+            if self._root_seen:
+                raise ValueError(f"MTOM response has two root parts {content_id}")
+            if "xml" not in headers.get("content-type", "xml").lower():
+                raise ValueError(
+                    f"MTOM root part {content_id} is not XML: {headers['content-type']}"
+                )
+            self._root_seen = True
+
+            def write_root(data: Optional[bytes]) -> None:
+                if data is None:
+                    self.document = self.extractor.finish()
+                else:
+                    self.extractor.feed(data)
+
+            return write_root
+
+        if not self._root_seen:
+            raise ValueError(f"MTOM part {content_id} precedes the root part")
+        sink = self.extractor.includes.pop(content_id, None)
+        if sink is None:
+            raise ValueError(f"MTOM part {content_id} is not included by the root part")
+
+        def write_part(data: Optional[bytes]) -> None:
+            if data is None:
+                sink.close()
+            else:
+                sink.write(data)
+
+        return write_part
+
+
+def create_response_parser(content_type: str, extractor: ContentExtractor):
+    """Create the incremental parser of a response.
+
+    Args:
+        content_type: Content-Type header of the response
+        extractor: Parser of the SOAP envelope
+
+    Returns:
+        An MtomResponseParser for multipart responses, otherwise the extractor
+    """
+    if content_type.lower().startswith("multipart/related"):
+        return MtomResponseParser(content_type, extractor)
+    return extractor
+
+
+def _content_type_param(
+    content_type: str, name: str, default: Optional[str] = None
+) -> str:
+    match = re.search(
+        rf'(?:^|[;\s]){name}="?([^";]+)"?', content_type, re.IGNORECASE
+    )
+    if match is None:
+        if default is not None:
+            return default
+        raise ValueError(f"Missing {name} in Content-Type {content_type}")
+    return match.group(1)
@@ -0,0 +1,261 @@
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Protocol, Tuple, Union
+
+# Default time to live in seconds of cached responses per operation; only
+# these operations are cached unless configured otherwise
+DEFAULT_TTLS: Dict[str, float] = {
+    "CheckDataBox": 3600,
+    "GetDataBoxActivityStatus": 3600,
+    "FindDataBox2": 24 * 3600,
+    "ISDSSearch3": 3600,
+}
+
+# Returned by ResponseCache.get if no valid response is cached
+MISS = object()
+
+
+class CacheBackend(Protocol):
+    """Storage of serialized responses with expiration times."""
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        """Get the expiration time and value stored under a key."""
+        ...
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        """Store a value until the expiration time (seconds since epoch)."""
+        ...
+
+    def delete(self, prefix: str, match: Optional[Callable[[str], bool]] = None) -> None:
+        """Delete the values whose key starts with the prefix.
+
+        Args:
+            prefix: Prefix of the deleted keys
+            match: Called with each key with the prefix; only keys for which
+                it returns True are deleted if set
+        """
+        ...
+
+
+class MemoryCacheBackend:
+    """In-process cache backend evicting the least recently used entries."""
+
+    def __init__(self, max_entries: int = 10000):
+        """Initialize the backend.
+
+        Args:
+            max_entries: Maximum number of cached responses
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, prefix: str, match: Optional[Callable[[str], bool]] = None) -> None:
+        with self._lock:
+            for key in [
+                key
+                for key in self._entries
+                if key.startswith(prefix) and (match is None or match(key))
+            ]:
+                del self._entries[key]
+
+
+class SQLiteCacheBackend:
+    """Cache backend in an SQLite file shared by the processes of a host.
+
+    Values are stored pickled, so the file must only be writable by trusted
+    users.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Open the backend, creating the database if needed.
+
+        Args:
+            path: Path of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=5)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT expires_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def set(self, key: str, value: bytes, expires_at: float) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, expires_at, value),
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (time.time(),)
+            )
+
+    def delete(self, prefix: str, match: Optional[Callable[[str], bool]] = None) -> None:
+        with self._lock, self._db:
+            keys = self._db.execute(
+                "SELECT key FROM responses WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+            self._db.executemany(
+                "DELETE FROM responses WHERE key = ?",
+                [(key,) for (key,) in keys if match is None or match(key)],
+            )
+
+
+class ResponseCache:
+    """Cache of responses of read-only operations with per-operation TTLs.
+
+    Responses are looked up in an in-process LRU first and then in an
+    optional shared backend. Responses reporting an error status (e.g., a
+    data box that does not exist) are cached for the shorter negative_ttl.
+    Cached responses are returned as copies, so callers may modify them.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        negative_ttl: float = 300,
+        max_entries: int = 10000,
+        shared: Optional[CacheBackend] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttls: Time to live in seconds per operation name, replacing
+                DEFAULT_TTLS; operations not listed are not cached
+            negative_ttl: Time to live in seconds of error responses
+            max_entries: Maximum number of responses kept in memory
+            shared: Backend shared with other clients or processes, e.g. a
+                SQLiteCacheBackend
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.negative_ttl = negative_ttl
+        self.memory = MemoryCacheBackend(max_entries)
+        self.shared = shared
+
+    def caches(self, operation_name: str) -> bool:
+        """Check whether responses of an operation are cached."""
+        return operation_name in self.ttls
+
+    def get(self, operation_name: str, params: Mapping[str, Any], account: str = "") -> Any:
+        """Get the cached response of an operation call.
+
+        Args:
+            operation_name: Name of the operation
+            params: Arguments of the operation
+            account: Server and user the call is made as; responses are only
+                shared by calls of the same account
+
+        Returns:
+            The cached response, or MISS if there is none
+        """
+        key = call_key(operation_name, params, account)
+        now = time.time()
+        entry = self.memory.get(key)
+        if (entry is None or entry[0] < now) and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None and entry[0] >= now:
+                self.memory.set(key, entry[1], entry[0])
+        if entry is None or entry[0] < now:
+            return MISS
+        return pickle.loads(entry[1])
+
+    def set(
+        self,
+        operation_name: str,
+        params: Mapping[str, Any],
+        response: Any,
+        account: str = "",
+    ) -> None:
+        """Cache the response of an operation call.
+
+        Args:
+            operation_name: Name of the operation
+            params: Arguments of the operation
+            response: Serialized response of the operation
+            account: Server and user the call is made as
+        """
+        ttl = self.ttls[operation_name]
+        if response_status_code(response) not in (None, "0000"):
+            ttl = self.negative_ttl
+        key = call_key(operation_name, params, account)
+        value = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.shared is not None:
+            self.shared.set(key, value, expires_at)
+
+    def invalidate(self, operation_name: Optional[str] = None, **params) -> None:
+        """Drop cached responses.
+
+        Args:
+            operation_name: Operation whose responses are dropped; all
+                responses are dropped if not set
+            **params: Only responses of calls with these arguments (and any
+                others) are dropped if set; responses of all accounts are
+                dropped
+        """
+        prefix = "" if operation_name is None else f"{operation_name}:"
+        match = None
+        if params:
+            expected = json.loads(json.dumps(params, default=str)).items()
+
+            def match(key: str) -> bool:
+                return expected <= json.loads(key.partition(":")[2])[1].items()
+
+        self.memory.delete(prefix, match)
+        if self.shared is not None:
+            self.shared.delete(prefix, match)
+
+
+def call_key(operation_name: str, params: Mapping[str, Any], account: str = "") -> str:
+    """Get the key identifying a call of an operation with its arguments.
+
+    Args:
+        operation_name: Name of the operation
+        params: Arguments of the operation
+        account: Server and user the call is made as
+    """
+    call = json.dumps([account, params], sort_keys=True, default=str)
+    return f"{operation_name}:{call}"
+
+
+def response_status_code(response: Any) -> Optional[str]:
+    """Get the ISDS status code (dbStatusCode or dmStatusCode) of a response."""
+    if not isinstance(response, Mapping):
+        return None
+    for status_name, code_name in (
+        ("dbStatus", "dbStatusCode"),
+        ("dmStatus", "dmStatusCode"),
+    ):
+        status = response.get(status_name)
+        if isinstance(status, Mapping):
+            return status.get(code_name)
+    return None
@@ -0,0 +1,202 @@
+import base64
+import re
+import uuid
+from urllib.parse import unquote
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Union,
+)
+
+from lxml import etree
+
+# Size of the chunks in which responses are read
+RESPONSE_CHUNK_SIZE = 256 * 1024
+
+XOP_NAMESPACE = "http://www.w3.org/2004/08/xop/include"
+XOP_INCLUDE = f"{{{XOP_NAMESPACE}}}Include"
+
+
+class StreamedContent(Protocol):
+    """Binary content sent base64-encoded without being loaded into memory."""
+
+    def encoded_size(self) -> int:
+        """Length of the base64-encoded content in bytes."""
+        ...
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        """Iterate over the base64-encoded content in chunks."""
+        ...
+
+
+def content_placeholder() -> str:
+    """Create a unique placeholder marking where streamed content is inserted."""
+    return f"isds-streamed-content-{uuid.uuid4().hex}"
+
+
+class StreamingBody:
+    """Request body assembled from serialized XML and streamed contents.
+
+    The envelope is serialized with placeholders in place of the encoded
+    contents. On sending, the XML around the placeholders is written as is
+    and each content is encoded chunk by chunk, so memory use does not depend
+    on the size of the contents. The body has a known length, so it is sent
+    with a Content-Length header rather than chunked.
+    """
+
+    def __init__(self, parts: List[Union[bytes, StreamedContent]]):
+        self.parts = parts
+
+    @classmethod
+    def from_message(
+        cls, message: bytes, contents: Dict[str, StreamedContent]
+    ) -> "StreamingBody":
+        """Split a serialized envelope at the placeholders of the contents.
+
+        Args:
+            message: Serialized envelope containing the placeholders
+            contents: Streamed contents keyed by their placeholders
+
+        Returns:
+            The request body
+        """
+        if not contents:
+            return cls([message])
+        pattern = re.compile(
+            "|".join(re.escape(placeholder) for placeholder in contents).encode()
+        )
+        parts: List[Union[bytes, StreamedContent]] = []
+        position = 0
+        for match in pattern.finditer(message):
+            parts.append(message[position : match.start()])
+            parts.append(contents[match.group().decode()])
+            position = match.end()
+        parts.append(message[position:])
+        return cls(parts)
+
+    def __len__(self) -> int:
+        return sum(
+            len(part) if isinstance(part, bytes) else part.encoded_size()
+            for part in self.parts
+        )
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part.iter_encoded()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in self:
+            yield chunk
+
+
+class ContentExtractor:
+    """Incremental response parser saving base64 element contents to sinks.
+
+    The response is fed to the extractor in chunks. The text of each
+    content element is decoded as it arrives and written to a sink opened
+    for it, so the contents are never held in memory. The rest of the
+    response is built into an element tree in which the content elements are
+    left empty.
+
+    A content element holding an xop:Include (MTOM) keeps its sink open in
+    includes, keyed by the Content-ID of the MIME part with the content.
+    """
+
+    def __init__(
+        self,
+        content_tag: str,
+        open_sink: Callable[[int, Dict[str, str]], BinaryIO],
+    ):
+        """Initialize the extractor.
+
+        Args:
+            content_tag: Qualified tag of the content elements
+            open_sink: Called with the index of a content and the attributes
+                of its parent element to open the sink it is written to; the
+                sink is closed once the content is written
+        """
+        self.content_tag = content_tag
+        self.open_sink = open_sink
+        self.paths: List[Optional[str]] = []
+        self.includes: Dict[str, BinaryIO] = {}
+        self._builder = etree.TreeBuilder()
+        self._parser = etree.XMLParser(
+            target=self, huge_tree=True, resolve_entities=False
+        )
+        self._attributes: Dict[str, str] = {}
+        self._sink: Optional[BinaryIO] = None
+        self._in_include = False
+        self._pending = ""
+
+    def feed(self, data: bytes) -> None:
+        """Parse the next chunk of the response."""
+        self._parser.feed(data)
+
+    def finish(self) -> etree._Element:
+        """Finish parsing.
+
+        Returns:
+            Root element of the response with empty content elements
+        """
+        return self._parser.close()
+
+    def abort(self) -> None:
+        """Close the sinks of all partially written contents."""
+        self._close_sink()
+        while self.includes:
+            self.includes.popitem()[1].close()
+
+    def _close_sink(self) -> None:
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    # Parser target interface
+
+    def start(self, tag: str, attrib: Dict[str, str], nsmap=None) -> None:
+        if tag == XOP_INCLUDE and self._sink is not None:
+            content_id = unquote(attrib.get("href", "").removeprefix("cid:"))
+            self.includes[content_id] = self._sink
+            self._sink = None
+            self._in_include = True
+            return
+        if tag == self.content_tag:
+            self._sink = self.open_sink(len(self.paths), self._attributes)
+            name = getattr(self._sink, "name", None)
+            self.paths.append(name if isinstance(name, str) else None)
+        else:
+            self._attributes = dict(attrib)
+        self._builder.start(tag, attrib, nsmap)
+
+    def data(self, data: str) -> None:
+        if self._sink is None:
+            self._builder.data(data)
+            return
+        # Decode whole base64 quanta, keeping the rest for the next data
+        data = self._pending + "".join(data.split())
+        size = len(data) - len(data) % 4
+        self._sink.write(base64.b64decode(data[:size]))
+        self._pending = data[size:]
+
+    def end(self, tag: str) -> None:
+        if self._in_include:
+            self._in_include = False
+            return
+        if tag == self.content_tag and self._sink is not None:
+            if self._pending:
+                raise ValueError("Truncated base64 content")
+            self._close_sink()
+        self._builder.end(tag)
+
+    def close(self) -> etree._Element:
+        self._close_sink()
+        return self._builder.close()
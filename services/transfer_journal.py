@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class TransferJournal:
+    """Local journal of completed attachment transfers.
+
+    Records the result of each finished upload and download in a JSON file,
+    so a batch of transfers interrupted by a failure can be repeated without
+    transferring the finished attachments again. The journal is written
+    atomically after every recorded transfer.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize the journal, loading the transfers recorded in it.
+
+        Args:
+            path: JSON file storing the journal
+        """
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        try:
+            self._entries: Dict[str, Any] = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            self._entries = {}
+        except ValueError as e:
+            self.logger.warning(f"Ignoring unreadable transfer journal {path}: {e}")
+            self._entries = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get the recorded result of a transfer, None if not finished."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def record(self, key: str, value: Any) -> None:
+        """Record the result of a finished transfer.
+
+        Args:
+            key: Key identifying the transfer
+            value: JSON-serializable result of the transfer
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._write()
+
+    def discard(self, key: str) -> None:
+        """Forget a transfer, so it is repeated next time."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._write()
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so the journal is never partial
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
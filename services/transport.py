@@ -0,0 +1,91 @@
+import socket
+import ssl
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """HTTP transport settings shared by all services of a client.
+
+    Attributes:
+        pool_connections: Number of per-host connection pools to keep
+        pool_maxsize: Maximum number of pooled connections per host
+        pool_block: If True, wait for a free connection instead of opening
+            connections above pool_maxsize
+        keep_alive: If True, keep connections open between requests (with
+            TCP keep-alive probes), otherwise close them after each request
+        connect_timeout: Timeout in seconds for establishing a connection
+        read_timeout: Timeout in seconds for waiting on response data
+        max_retries: Number of retries of failed connection attempts
+        ssl_context: SSL context used for all connections; sharing one
+            context lets connections reuse its TLS configuration
+    """
+
+    pool_connections: int = 4
+    pool_maxsize: int = 32
+    pool_block: bool = False
+    keep_alive: bool = True
+    connect_timeout: Optional[float] = 10.0
+    read_timeout: Optional[float] = 300.0
+    max_retries: int = 0
+    ssl_context: Optional[ssl.SSLContext] = None
+
+    @property
+    def timeout(self) -> Tuple[Optional[float], Optional[float]]:
+        """Timeout in the form accepted by requests."""
+        return self.connect_timeout, self.read_timeout
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTP adapter configured from a TransportConfig."""
+
+    def __init__(self, config: TransportConfig):
+        self.transport_config = config
+        # Only connection failures are retried, SOAP requests are not idempotent
+        retries = Retry(
+            total=config.max_retries,
+            connect=config.max_retries,
+            read=0,
+            redirect=0,
+            status=0,
+            other=0,
+        )
+        super().__init__(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            max_retries=retries,
+            pool_block=config.pool_block,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.transport_config.ssl_context is not None:
+            kwargs["ssl_context"] = self.transport_config.ssl_context
+        if self.transport_config.keep_alive:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+def create_session(config: TransportConfig) -> requests.Session:
+    """Create a pooled HTTP session.
+
+    Args:
+        config: Transport settings
+
+    Returns:
+        Session to be shared by all services of a client
+    """
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(config)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
@@ -0,0 +1,196 @@
+import hashlib
+import io
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import zeep
+from lxml import etree
+from zeep.settings import Settings
+from zeep.transports import Transport
+from zeep.wsdl import Document
+
+# Modules zeep assigns to the classes it creates while parsing a schema.
+_DYNAMIC_MODULES = ("zeep.xsd.dynamic_types", "zeep.objects")
+
+# Parsed documents shared by all services in the process, keyed by WSDL path
+_documents: Dict[Path, Document] = {}
+_documents_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def wsdl_dir_digest(wsdl_dir: Path) -> str:
+    """Compute the cache key for a WSDL directory.
+
+    The key covers the content of every file in the directory together with
+    the zeep and Python versions, so editing a WSDL/XSD or upgrading zeep
+    invalidates all cached documents.
+
+    Args:
+        wsdl_dir: Directory containing WSDL files
+
+    Returns:
+        Hex digest identifying the directory content
+    """
+    digest = hashlib.sha256()
+    digest.update(f"zeep={zeep.__version__};python={sys.version_info[:2]}".encode())
+    for path in sorted(p for p in wsdl_dir.iterdir() if p.is_file()):
+        digest.update(path.name.encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:32]
+
+
+def _restore_element(data: bytes) -> etree._Element:
+    return etree.fromstring(data)
+
+
+class _DocumentPickler(pickle.Pickler):
+    """Pickler that can serialize a parsed zeep WSDL document."""
+
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        # Transport and settings are bound again when the document is loaded
+        if isinstance(obj, Transport):
+            return "transport"
+        if isinstance(obj, Settings):
+            return "settings"
+        return None
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, etree.QName):
+            return etree.QName, (obj.text,)
+        if isinstance(obj, etree._Element):
+            return _restore_element, (etree.tostring(obj),)
+        if isinstance(obj, type) and obj.__module__ in _DYNAMIC_MODULES:
+            namespace = {
+                key: value
+                for key, value in obj.__dict__.items()
+                if key not in ("__dict__", "__weakref__")
+            }
+            return type, (obj.__name__, obj.__bases__, namespace)
+        return NotImplemented
+
+
+class _DocumentUnpickler(pickle.Unpickler):
+    """Unpickler that binds a cached document to a live transport."""
+
+    def __init__(self, file: io.BytesIO, transport: Transport, settings: Settings):
+        super().__init__(file)
+        self._persistent = {"transport": transport, "settings": settings}
+
+    def persistent_load(self, pid: str) -> Any:
+        return self._persistent[pid]
+
+
+class WSDLCache:
+    """On-disk cache of parsed WSDL documents.
+
+    Entries are keyed by the content hash of the WSDL directory and the zeep
+    version, written atomically and therefore safe to share between all
+    processes on a host. The cache directory must only be writable by trusted
+    users, as entries are loaded with pickle.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory where parsed documents are stored
+        """
+        self.cache_dir = Path(cache_dir)
+        self.logger = logging.getLogger(__name__)
+
+    def entry_path(self, wsdl_path: Path) -> Path:
+        """Get the cache file used for a WSDL file."""
+        digest = wsdl_dir_digest(wsdl_path.parent.resolve())
+        return self.cache_dir / f"{wsdl_path.stem}-{digest}.pickle"
+
+    def load(
+        self, wsdl_path: Path, transport: Transport, settings: Settings
+    ) -> Document:
+        """Load a parsed WSDL document, parsing and storing it on a cache miss.
+
+        Args:
+            wsdl_path: Path of the WSDL file
+            transport: Transport the document is bound to
+            settings: zeep settings the document is bound to
+
+        Returns:
+            The parsed WSDL document
+        """
+        path = self.entry_path(wsdl_path)
+        document = self._read(path, transport, settings)
+        if document is None:
+            document = Document(str(wsdl_path), transport, settings=settings)
+            self._write(path, document)
+        return document
+
+    def _read(
+        self, path: Path, transport: Transport, settings: Settings
+    ) -> Optional[Document]:
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            return _DocumentUnpickler(io.BytesIO(data), transport, settings).load()
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable WSDL cache entry {path}: {e}")
+            return None
+
+    def _write(self, path: Path, document: Document) -> None:
+        try:
+            buffer = io.BytesIO()
+            _DocumentPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(document)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial data
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(buffer.getvalue())
+                os.replace(tmp_name, path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except Exception as e:
+            self.logger.warning(f"Failed to write WSDL cache entry {path}: {e}")
+
+
+def load_document(wsdl_path: Path, cache_dir: Optional[Path] = None) -> Document:
+    """Get the parsed WSDL document shared by all services in the process.
+
+    Each WSDL file is parsed (or loaded from the persistent cache) only once
+    per process. Services bind their own credentials and transport on top of
+    the shared document, so memory grows with the number of distinct WSDL
+    files rather than with the number of accounts.
+
+    Args:
+        wsdl_path: Path of the WSDL file
+        cache_dir: Directory of the persistent cache, if enabled
+
+    Returns:
+        The parsed WSDL document
+    """
+    key = wsdl_path.resolve()
+    document = _documents.get(key)
+    if document is None:
+        with _documents_lock:
+            document = _documents.get(key)
+            if document is None:
+                # The transport is only used to load the local schema includes
+                transport = Transport()
+                settings = Settings()
+                if cache_dir is not None:
+                    document = WSDLCache(cache_dir).load(
+                        wsdl_path, transport, settings
+                    )
+                else:
+                    document = Document(str(wsdl_path), transport, settings=settings)
+                _documents[key] = document
+    return document
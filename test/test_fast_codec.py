@@ -0,0 +1,274 @@
+"""Conformance of the fast codec with zeep.
+
+Canned requests and responses of every operation handled by the codec are
+encoded and decoded by both, and the results must be identical, including
+the types and the order of the keys.
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import zeep
+from requests.structures import CaseInsensitiveDict
+from zeep.exceptions import Fault
+from zeep.helpers import serialize_object
+from zeep.wsdl.utils import etree_to_string
+from zeep.xsd import Nil
+
+from schemas import EncodedContent
+from services import FAST_OPERATIONS, FastCodec
+from services.fast_codec import FALLBACK
+
+WSDL_DIR = Path(__file__).resolve().parent.parent / "wsdl"
+
+WSDL_FILES = {
+    "CheckDataBox": "db_search.wsdl",
+    "GetListOfReceivedMessages": "dm_info.wsdl",
+    "MarkMessageAsDownloaded": "dm_info.wsdl",
+    "MessageDownload": "dm_operations.wsdl",
+    "MessageEnvelopeDownload": "dm_info.wsdl",
+}
+
+NIL = ' xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"'
+
+OK = (
+    "<p:dmStatus><p:dmStatusCode>0000</p:dmStatusCode>"
+    "<p:dmStatusMessage>Provedeno úspěšně.</p:dmStatusMessage></p:dmStatus>"
+)
+
+ERROR = (
+    "<p:dmStatus><p:dmStatusCode>1219</p:dmStatusCode>"
+    "<p:dmStatusMessage>Zpráva neexistuje.</p:dmStatusMessage></p:dmStatus>"
+)
+
+MESSAGE = (
+    "<p:dmID>123456789</p:dmID>"
+    "<p:dbIDSender>abc1234</p:dbIDSender>"
+    "<p:dmSender>Odesílatel &amp; syn s.r.o.</p:dmSender>"
+    "<p:dmSenderAddress>Praha 1</p:dmSenderAddress>"
+    "<p:dmSenderType>10</p:dmSenderType>"
+    "<p:dmRecipient>Příjemce a.s.</p:dmRecipient>"
+    "<p:dmRecipientAddress>Brno</p:dmRecipientAddress>"
+    f"<p:dmSenderOrgUnit{NIL}/>"
+    f"<p:dmSenderOrgUnitNum{NIL}/>"
+    "<p:dbIDRecipient>xyz9876</p:dbIDRecipient>"
+    "<p:dmRecipientOrgUnit></p:dmRecipientOrgUnit>"
+    f"<p:dmRecipientOrgUnitNum{NIL}/>"
+    f"<p:dmToHands{NIL}/>"
+    "<p:dmAnnotation>Výzva  k\tdoplnění</p:dmAnnotation>"
+    f"<p:dmRecipientRefNumber{NIL}/>"
+    "<p:dmSenderRefNumber>č.j. 1/2025</p:dmSenderRefNumber>"
+    f"<p:dmRecipientIdent{NIL}/>"
+    f"<p:dmSenderIdent{NIL}/>"
+    "<p:dmLegalTitleLaw>500</p:dmLegalTitleLaw>"
+    "<p:dmLegalTitleYear>2004</p:dmLegalTitleYear>"
+    f"<p:dmLegalTitleSect{NIL}/>"
+    f"<p:dmLegalTitlePar{NIL}/>"
+    f"<p:dmLegalTitlePoint{NIL}/>"
+    "<p:dmPersonalDelivery>true</p:dmPersonalDelivery>"
+    "<p:dmAllowSubstDelivery>0</p:dmAllowSubstDelivery>"
+)
+
+DELIVERY = (
+    '<p:dmHash algorithm="SHA-256">c2FtcGxl</p:dmHash>'
+    "<p:dmQTimestamp>c2FtcGxl</p:dmQTimestamp>"
+    "<p:dmDeliveryTime>2025-01-02T10:00:00.123+01:00</p:dmDeliveryTime>"
+    f"<p:dmAcceptanceTime{NIL}/>"
+    "<p:dmMessageStatus>4</p:dmMessageStatus>"
+    "<p:dmAttachmentSize>12</p:dmAttachmentSize>"
+)
+
+RECORD = (
+    '<p:dmRecord dmType="V" dmVODZ="false">'
+    "<p:dmOrdinal>{ordinal}</p:dmOrdinal>"
+    f"{MESSAGE}"
+    "<p:dmMessageStatus>4</p:dmMessageStatus>"
+    "<p:dmAttachmentSize>12</p:dmAttachmentSize>"
+    "<p:dmDeliveryTime>2025-01-02T10:00:00+01:00</p:dmDeliveryTime>"
+    f"<p:dmAcceptanceTime{NIL}/>"
+    "</p:dmRecord>"
+)
+
+# Response bodies by operation and case, without the enclosing element
+RESPONSES = {
+    "CheckDataBox": {
+        "active": "<p:dbState>1</p:dbState>"
+        "<p:dbStatus><p:dbStatusCode>0000</p:dbStatusCode>"
+        "<p:dbStatusMessage>Provedeno úspěšně.</p:dbStatusMessage>"
+        "<p:dbStatusRefNumber>42</p:dbStatusRefNumber></p:dbStatus>",
+        "not found": f"<p:dbState{NIL}/>"
+        "<p:dbStatus><p:dbStatusCode>0002</p:dbStatusCode>"
+        "<p:dbStatusMessage>Schránka neexistuje.</p:dbStatusMessage></p:dbStatus>",
+    },
+    "GetListOfReceivedMessages": {
+        "records": "<p:dmRecords>"
+        + "".join(RECORD.format(ordinal=i) for i in range(1, 4))
+        + f"</p:dmRecords>{OK}",
+        "empty list": f"<p:dmRecords></p:dmRecords>{OK}",
+        "nil list": f"<p:dmRecords{NIL}/>{OK}",
+        "error status": ERROR,
+    },
+    "MarkMessageAsDownloaded": {
+        "ok": OK,
+        "error status": ERROR,
+    },
+    "MessageDownload": {
+        "files": '<p:dmReturnedMessage dmType="V">'
+        f"<p:dmDm>{MESSAGE}<p:dmFiles>"
+        '<p:dmFile dmMimeType="application/pdf" dmFileMetaType="main" '
+        'dmFileDescr="výzva.pdf"><p:dmEncodedContent>JVBERi0xLjQK'
+        "</p:dmEncodedContent></p:dmFile>"
+        '<p:dmFile dmMimeType="text/plain" dmFileMetaType="enclosure" '
+        'dmFileGuid="a1" dmUpFileGuid="a0" dmFileDescr="empty.txt" dmFormat="txt">'
+        "<p:dmEncodedContent></p:dmEncodedContent></p:dmFile>"
+        f"</p:dmFiles></p:dmDm>{DELIVERY}</p:dmReturnedMessage>{OK}",
+        "xml content": '<p:dmReturnedMessage dmType="V">'
+        f"<p:dmDm>{MESSAGE}<p:dmFiles>"
+        '<p:dmFile dmMimeType="application/xml" dmFileMetaType="main" '
+        'dmFileDescr="form.xml"><p:dmXMLContent><form xmlns="urn:form">'
+        "<field>1</field></form></p:dmXMLContent></p:dmFile>"
+        f"</p:dmFiles></p:dmDm>{DELIVERY}</p:dmReturnedMessage>{OK}",
+        "error status": f"<p:dmReturnedMessage{NIL}/>{ERROR}",
+    },
+    "MessageEnvelopeDownload": {
+        "envelope": '<p:dmReturnedMessageEnvelope dmType="V" dmVODZ="true" '
+        f'attsNum="2"><p:dmDm>{MESSAGE}</p:dmDm>{DELIVERY}'
+        f"</p:dmReturnedMessageEnvelope>{OK}",
+        "no attributes": "<p:dmReturnedMessageEnvelope>"
+        f"<p:dmDm>{MESSAGE}</p:dmDm>{DELIVERY}"
+        f"</p:dmReturnedMessageEnvelope>{OK}",
+        "error status": ERROR,
+    },
+}
+
+# Arguments of the requests by operation and case
+REQUESTS = {
+    "CheckDataBox": {
+        "id": {"dbID": "abc1234"},
+        "escaped": {"dbID": "a<b>&c"},
+        "with flags": {"dbID": "abc1234", "dbApproved": True, "dbExternRefNumber": "1"},
+        "nil": {"dbID": "abc1234", "dbApproved": Nil},
+    },
+    "GetListOfReceivedMessages": {
+        "all": {"dmStatusFilter": -1},
+        "page": {
+            "dmFromTime": "2025-01-01T00:00:00",
+            "dmToTime": None,
+            "dmRecipientOrgUnitNum": None,
+            "dmStatusFilter": -1,
+            "dmOffset": 1001,
+            "dmLimit": 1000,
+        },
+    },
+    "MarkMessageAsDownloaded": {"id": {"dmID": "123456789"}},
+    "MessageDownload": {"id": {"dmID": "123456789"}},
+    "MessageEnvelopeDownload": {"id": {"dmID": "123456789"}},
+}
+
+
+@pytest.fixture(scope="module")
+def bindings():
+    clients = {name: zeep.Client(str(WSDL_DIR / name)) for name in set(WSDL_FILES.values())}
+    return {
+        operation: (clients[name], next(iter(clients[name].wsdl.bindings.values())))
+        for operation, name in WSDL_FILES.items()
+    }
+
+
+def _response(operation, body, status_code=200):
+    tag = f"{operation}Response"
+    content = (
+        "<?xml version='1.0' encoding='utf-8'?>"
+        '<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">'
+        f'<soap-env:Body><p:{tag} xmlns:p="http://isds.czechpoint.cz/v20">{body}</p:{tag}>'
+        "</soap-env:Body></soap-env:Envelope>"
+    ).encode("utf-8")
+    return SimpleNamespace(
+        status_code=status_code,
+        headers=CaseInsensitiveDict({"Content-Type": "text/xml; charset=utf-8"}),
+        content=content,
+        encoding="utf-8",
+    )
+
+
+def _zeep_result(client, binding, operation, response):
+    return serialize_object(
+        binding.process_reply(client, binding.get(operation), response)
+    )
+
+
+def _decoded(value):
+    """Decode EncodedContent values, which zeep returns as bytes."""
+    if isinstance(value, EncodedContent):
+        return value.value
+    if isinstance(value, dict):
+        return type(value)((key, _decoded(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_decoded(item) for item in value]
+    return value
+
+
+def test_all_fast_operations_are_covered():
+    assert set(RESPONSES) == set(REQUESTS) == set(FAST_OPERATIONS)
+
+
+@pytest.mark.parametrize(
+    "operation, case",
+    [(operation, case) for operation, cases in RESPONSES.items() for case in cases],
+)
+@pytest.mark.parametrize("lazy_content", [False, True])
+def test_response_matches_zeep(bindings, operation, case, lazy_content):
+    client, binding = bindings[operation]
+    codec = FastCodec(lazy_content=lazy_content).get(binding, operation)
+    assert codec is not None
+
+    response = _response(operation, RESPONSES[operation][case])
+    result = codec.decode(response)
+    expected = _zeep_result(client, binding, operation, response)
+
+    if result is FALLBACK:
+        # Only content the codec cannot reproduce exactly is left to zeep
+        assert case == "xml content"
+        return
+    assert repr(_decoded(result)) == repr(expected)
+
+
+@pytest.mark.parametrize("operation", sorted(FAST_OPERATIONS))
+def test_fault_is_left_to_zeep(bindings, operation):
+    client, binding = bindings[operation]
+    codec = FastCodec().get(binding, operation)
+    fault = (
+        "<?xml version='1.0' encoding='utf-8'?>"
+        '<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">'
+        "<soap-env:Body><soap-env:Fault><faultcode>soap-env:Server</faultcode>"
+        "<faultstring>Internal error</faultstring></soap-env:Fault>"
+        "</soap-env:Body></soap-env:Envelope>"
+    ).encode("utf-8")
+    response = SimpleNamespace(
+        status_code=500,
+        headers=CaseInsensitiveDict({"Content-Type": "text/xml"}),
+        content=fault,
+        encoding="utf-8",
+    )
+
+    assert codec.decode(response) is FALLBACK
+    with pytest.raises(Fault):
+        binding.process_reply(client, binding.get(operation), response)
+
+
+@pytest.mark.parametrize(
+    "operation, case",
+    [(operation, case) for operation, cases in REQUESTS.items() for case in cases],
+)
+def test_request_matches_zeep(bindings, operation, case):
+    client, binding = bindings[operation]
+    codec = FastCodec().get(binding, operation)
+    kwargs = REQUESTS[operation][case]
+
+    message = codec.encode(kwargs)
+    envelope, headers = binding._create(operation, (), dict(kwargs), client=client)
+
+    assert message is not FALLBACK
+    assert message == etree_to_string(envelope)
+    assert codec.headers == dict(headers)
@@ -0,0 +1,35 @@
+"""Concurrency slots of flow control."""
+
+import asyncio
+
+import pytest
+
+from services import FlowControl, FlowControlConfig
+
+
+@pytest.mark.parametrize("error", [KeyboardInterrupt, SystemExit])
+def test_interrupted_call_releases_its_slot(error):
+    flow_control = FlowControl(FlowControlConfig(initial_concurrency=1))
+
+    def call():
+        raise error
+
+    with pytest.raises(error):
+        flow_control.call("dx", "MessageDownload", call)
+    limiter = flow_control.limiter("dx")
+    assert limiter.in_flight == 0
+    assert flow_control.call("dx", "MessageDownload", lambda: "ok") == "ok"
+
+
+def test_cancelled_async_call_releases_its_slot():
+    flow_control = FlowControl(FlowControlConfig(initial_concurrency=1))
+
+    async def call():
+        raise asyncio.CancelledError
+
+    async def main():
+        with pytest.raises(asyncio.CancelledError):
+            await flow_control.call_async("dx", "MessageDownload", call)
+
+    asyncio.run(main())
+    assert flow_control.limiter("dx").in_flight == 0
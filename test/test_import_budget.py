@@ -0,0 +1,47 @@
+"""Importing the client must not load its heavy dependencies.
+
+The import time itself is checked by the benchmark runner
+(`python -m benchmarks --suites imports`), as it depends on the machine.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.importtime import HEAVY_MODULES, ROOT
+
+
+def _loaded_heavy_modules(statement: str) -> list:
+    """Run a statement in a new interpreter and list the heavy modules it loaded."""
+    code = (
+        f"{statement}\n"
+        "import sys\n"
+        "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return sorted(set(result.stdout.split()) & set(HEAVY_MODULES))
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import isds_client",
+        "from isds_client import ISDSClient, AsyncISDSClient",
+        "import services",
+        "import schemas",
+    ],
+)
+def test_import_does_not_load_heavy_modules(statement):
+    assert _loaded_heavy_modules(statement) == []
+
+
+def test_heavy_modules_are_detected():
+    # Guards against the check passing because nothing is detected
+    assert _loaded_heavy_modules("import schemas\nschemas.DmFile") == ["pydantic"]
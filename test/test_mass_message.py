@@ -0,0 +1,45 @@
+"""Per-recipient results of send_mass_message."""
+
+from services import BatchResult, ISDSError, MessageOperationsService
+
+OK = {"dmStatusCode": "0000", "dmStatusMessage": "OK"}
+
+
+def _batch(key, statuses):
+    return BatchResult(
+        key=key,
+        index=key.start,
+        result={"dmMultipleStatus": {"dmSingleStatus": statuses}, "dmStatus": OK},
+    )
+
+
+def test_missing_single_statuses_fail_only_their_recipients():
+    recipients = ["aaa1111", {"dbIDRecipient": "bbb2222"}, "ccc3333", "ddd4444"]
+    batches = [
+        _batch(range(0, 2), [{"dmID": "1", "dmStatus": OK}, None]),
+        _batch(
+            range(2, 4),
+            [
+                {"dmID": None, "dmStatus": None},
+                {
+                    "dmID": None,
+                    "dmStatus": {"dmStatusCode": "1214", "dmStatusMessage": "Rejected"},
+                },
+            ],
+        ),
+    ]
+
+    results = MessageOperationsService._recipient_results(recipients, batches)
+
+    assert [result.key for result in results] == [
+        "aaa1111",
+        "bbb2222",
+        "ccc3333",
+        "ddd4444",
+    ]
+    assert results[0].ok and results[0].result == "1"
+    for result in results[1:]:
+        assert isinstance(result.error, ISDSError)
+    assert "no status" in str(results[1].error)
+    assert "no status" in str(results[2].error)
+    assert str(results[3].error) == "1214: Rejected"
@@ -0,0 +1,89 @@
+"""Incremental parsing of MTOM responses."""
+
+import io
+
+import pytest
+
+from services.mtom import MtomResponseParser
+from services.streaming import XOP_NAMESPACE, ContentExtractor
+
+ISDS = "http://isds.czechpoint.cz/v20"
+BOUNDARY = "uuid:0ca0e16e"
+
+ROOT = (
+    f'<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"><s:Body>'
+    f'<p:DownloadAttachmentResponse xmlns:p="{ISDS}"><p:dmFile dmFileDescr="a.pdf">'
+    f'<p:dmEncodedContent><xop:Include xmlns:xop="{XOP_NAMESPACE}" '
+    f'href="cid:att@isds"/></p:dmEncodedContent></p:dmFile>'
+    f"</p:DownloadAttachmentResponse></s:Body></s:Envelope>"
+).encode()
+
+
+def _part(content_id, content_type, body):
+    return (
+        f"--{BOUNDARY}\r\nContent-Type: {content_type}\r\n"
+        f"Content-ID: <{content_id}>\r\n\r\n"
+    ).encode() + body + b"\r\n"
+
+
+def _body(*parts):
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+ROOT_PART = _part("root@isds", "application/xop+xml", ROOT)
+BINARY_PART = _part("att@isds", "application/octet-stream", b"\x00binary\xff")
+
+
+class Sink(io.BytesIO):
+    def close(self):
+        self.content = self.getvalue()
+        super().close()
+
+
+def _parse(body, start=None):
+    sinks = []
+
+    def open_sink(index, attributes):
+        sinks.append(Sink())
+        return sinks[-1]
+
+    content_type = (
+        f'multipart/related; type="application/xop+xml"; boundary="{BOUNDARY}"'
+    )
+    if start is not None:
+        content_type += f'; start="<{start}>"'
+    parser = MtomResponseParser(
+        content_type, ContentExtractor(f"{{{ISDS}}}dmEncodedContent", open_sink)
+    )
+    # Small chunks split delimiters and headers
+    for offset in range(0, len(body), 7):
+        parser.feed(body[offset : offset + 7])
+    return parser.finish(), sinks
+
+
+@pytest.mark.parametrize("start", [None, "root@isds"])
+def test_included_part_is_written_to_its_sink(start):
+    document, [sink] = _parse(_body(ROOT_PART, BINARY_PART), start)
+    assert document.tag == "{http://schemas.xmlsoap.org/soap/envelope/}Envelope"
+    assert sink.content == b"\x00binary\xff"
+
+
+def test_root_part_is_chosen_by_start():
+    with pytest.raises(ValueError, match="precedes the root part"):
+        _parse(_body(BINARY_PART, ROOT_PART), start="root@isds")
+
+
+def test_first_part_must_be_root_without_start():
+    with pytest.raises(ValueError, match="is not XML"):
+        _parse(_body(BINARY_PART, ROOT_PART))
+
+
+def test_missing_included_part_fails():
+    with pytest.raises(ValueError, match="no parts for att@isds"):
+        _parse(_body(ROOT_PART))
+
+
+def test_part_not_included_fails():
+    extra = _part("other@isds", "application/octet-stream", b"extra")
+    with pytest.raises(ValueError, match="other@isds is not included"):
+        _parse(_body(ROOT_PART, BINARY_PART, extra))
@@ -0,0 +1,147 @@
+"""Journaled transfers of high-volume attachments.
+
+Only transfers reported as successful are recorded in the journal; error
+statuses are retried and never journaled.
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from schemas import DmFile
+from services import (
+    AsyncBigMessageService,
+    BigMessageService,
+    ISDSError,
+    TransferJournal,
+)
+from services.big_message import _upload_key
+
+WSDL_DIR = Path(__file__).resolve().parent.parent / "wsdl"
+
+OK = {"dmStatusCode": "0000", "dmStatusMessage": "OK"}
+ERROR = {"dmStatusCode": "1226", "dmStatusMessage": "Attachment was not stored"}
+
+
+def _uploaded(att_id):
+    return {
+        "dmAttID": att_id,
+        "dmAttHash1": {"_value_1": "aGFzaDE=", "AttHashAlg": "SHA-256"},
+        "dmAttHash2": {"_value_1": "aGFzaDI=", "AttHashAlg": "SHA-512"},
+        "dmStatus": OK,
+    }
+
+
+UPLOAD_ERROR = {
+    "dmAttID": None,
+    "dmAttHash1": None,
+    "dmAttHash2": None,
+    "dmStatus": ERROR,
+}
+DOWNLOAD_ERROR = {"dmFile": None, "dmStatus": ERROR}
+
+
+def _service(service_class):
+    return service_class(
+        username="user",
+        password="pass",
+        base_url="http://localhost:1/",
+        wsdl_dir=WSDL_DIR,
+    )
+
+
+def _download(open_sink):
+    f = open_sink(0, {"dmFileDescr": "a.txt"})
+    f.write(b"content")
+    f.close()
+    return {"dmFile": {"dmFileDescr": "a.txt", "file_path": f.name}, "dmStatus": OK}
+
+
+@pytest.fixture
+def file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"content")
+    return DmFile(file_path=str(path))
+
+
+def test_upload_error_status_is_retried_and_not_journaled(tmp_path, file):
+    service = _service(BigMessageService)
+    responses = [UPLOAD_ERROR, _uploaded("att-1")]
+    service.upload_attachment = lambda file: responses.pop(0)
+    journal = TransferJournal(tmp_path / "journal.json")
+
+    assert service.upload_attachments([file], journal=journal, retries=1) == [
+        _uploaded("att-1")
+    ]
+    assert journal.get(_upload_key(file)) == _uploaded("att-1")
+
+
+def test_upload_error_status_fails_without_journaling(tmp_path, file):
+    service = _service(BigMessageService)
+    service.upload_attachment = lambda file: UPLOAD_ERROR
+    journal = TransferJournal(tmp_path / "journal.json")
+
+    with pytest.raises(ISDSError, match="1226"):
+        service.upload_attachments([file], journal=journal, retries=1)
+    assert journal.get(_upload_key(file)) is None
+
+
+def test_failed_journal_entries_are_transferred_again(tmp_path, file):
+    service = _service(BigMessageService)
+    service.upload_attachment = lambda file: _uploaded("att-2")
+    service.download_attachment_to = lambda message_id, att_num, open_sink: _download(
+        open_sink
+    )
+    journal = TransferJournal(tmp_path / "journal.json")
+    journal.record(_upload_key(file), UPLOAD_ERROR)
+    journal.record("download:9:1", DOWNLOAD_ERROR)
+
+    assert service.upload_attachments([file], journal=journal) == [_uploaded("att-2")]
+    [downloaded] = service.download_attachments_to("9", [1], tmp_path, journal=journal)
+    assert Path(downloaded["dmFile"]["file_path"]).read_bytes() == b"content"
+
+
+def test_download_error_status_is_retried_and_not_journaled(tmp_path):
+    service = _service(BigMessageService)
+    responses = [DOWNLOAD_ERROR]
+
+    def download_attachment_to(message_id, att_num, open_sink):
+        return responses.pop(0) if responses else _download(open_sink)
+
+    service.download_attachment_to = download_attachment_to
+    journal = TransferJournal(tmp_path / "journal.json")
+
+    [downloaded] = service.download_attachments_to(
+        "9", [1], tmp_path, journal=journal, retries=1
+    )
+    assert downloaded["dmFile"]["file_path"] == str(tmp_path / "9_1_a.txt")
+    assert journal.get("download:9:1") == downloaded
+
+
+def test_async_error_statuses_are_retried_and_not_journaled(tmp_path, file):
+    service = _service(AsyncBigMessageService)
+    uploads = [UPLOAD_ERROR, _uploaded("att-1")]
+    downloads = [DOWNLOAD_ERROR]
+
+    async def upload_attachment(file):
+        return uploads.pop(0)
+
+    async def download_attachment_to(message_id, att_num, open_sink):
+        return downloads.pop(0) if downloads else _download(open_sink)
+
+    service.upload_attachment = upload_attachment
+    service.download_attachment_to = download_attachment_to
+    journal = TransferJournal(tmp_path / "journal.json")
+
+    async def main():
+        uploaded = await service.upload_attachments([file], journal=journal, retries=1)
+        downloaded = await service.download_attachments_to(
+            "9", [1], tmp_path, journal=journal, retries=1
+        )
+        return uploaded, downloaded
+
+    uploaded, [downloaded] = asyncio.run(main())
+    assert uploaded == [_uploaded("att-1")]
+    assert journal.get(_upload_key(file)) == _uploaded("att-1")
+    assert journal.get("download:9:1") == downloaded